@@ -13,4 +13,8 @@ else
   echo "Image cvdp-cadence-base already exists. Skipping build."
 fi
 
+# Stage the shared VCD utilities so vcd_to_text.py can read raw dumps and waveform stores
+rm -rf vcd_util
+cp -r ../../../vcd_util ./vcd_util
+
 docker build -f Dockerfile-agent -t cvdp-example-agent --no-cache .
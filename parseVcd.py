@@ -1,4 +1,13 @@
-from vcdvcd import VCDVCD
+from vcd_util.wave_store import open_store
+from vcd_util.wave_chunks import DEFAULT_MAX_CHARS, DEFAULT_MAX_TRANSITIONS, iter_chunks
+from vcd_util.wave_index import WaveformIndex
+from vcd_util.query_router import QueryRouter
+from rag_util.embedding_cache import CachedEmbeddings, EmbeddingCache
+from rag_util.embed_pipeline import EmbeddingPipeline, load_sentence_model
+from rag_util.chroma_util import not_stored, upserter
+from rag_util.incremental import MANIFEST_NAME, update_vector_store
+from rag_util.hybrid_retriever import HybridRetriever
+from rag_util.doc_store import open_document_store
 import json
 import requests
 from langchain_ollama import OllamaLLM, OllamaEmbeddings
@@ -16,11 +25,20 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_community.vectorstores import FAISS
 
 from tqdm import tqdm
-import pickle
+import os
+import sys
 
 EMBEDDING_MODEL_NAME = "nomic-embed-text"
 MODEL_NAME = "deepseek-reasoner"
 API_KEY="my-api-key"
+VCD_PATH = "dump.vcd"
+SENTENCE_MODEL_NAME = "all-MiniLM-L6-v2"
+CHROMA_DIR = "chroma_data"
+EMBEDDING_CACHE_DIR = "embedding_cache"
+DOCUMENTS_DB = "documents.db"
+# Re-embed every chunk from the document store instead of refreshing the
+# changed signals only
+FULL_REBUILD = False
 
 def llama(greet, prompt):
     print('Waiting for answer from llama3...\n')
@@ -47,52 +65,92 @@ def deepseek(greet, prompt):
 
     print(response.choices[0].message.content)
 
-def load_and_chunk_vcd_data(vcd_file_path: str):
-    vcd = VCDVCD(vcd_file_path)
-    documents = []
-    for signal_name in tqdm(vcd.signals):
-        signal_content = json.dumps([{"time": x[0], "value": x[1]} for x in vcd[signal_name].tv], indent=2)
+def iter_vcd_documents(vcd_file_path: str, window=None, max_transitions=DEFAULT_MAX_TRANSITIONS,
+                       max_chars=DEFAULT_MAX_CHARS):
+    """
+    Yields every signal as time-windowed, run-length encoded chunk Documents.
+
+    Args:
+        vcd_file_path (str): Raw dump or waveform store written by vcd_util/wave_store.py.
+        window (int): Optional fixed window length in ticks.
+        max_transitions (int): Maximum value changes per chunk.
+        max_chars (int): Maximum chunk text size, keep it within the embedding model's token limit.
+    """
+    with open_store(vcd_file_path) as store:
+        for text, metadata in iter_chunks(store, window, max_transitions, max_chars):
+            metadata["source"] = vcd_file_path
+            yield Document(page_content=text, metadata=metadata)
+
+def load_and_chunk_vcd_data(vcd_file_path: str, **chunk_args):
+    return list(tqdm(iter_vcd_documents(vcd_file_path, **chunk_args)))
+
+def open_vector_store(persist_directory=CHROMA_DIR, device=None, batch_size=64, workers=None):
+    """
+    Opens the persistent "vcd" Chroma collection and the pipeline that fills it.
+
+    Args:
+        device (str): "cuda", "mps" or "cpu"; picked automatically when None.
+        batch_size (int): Documents per encode/upsert batch.
+        workers (int): Encoder threads, see EmbeddingPipeline.
+    """
+    # embedding_model = OllamaEmbeddings(model="nomic-embed-text")
+    model = load_sentence_model(SENTENCE_MODEL_NAME, device)
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, SENTENCE_MODEL_NAME)
+    vectorstore = Chroma(
+        embedding_function=CachedEmbeddings(model, cache, batch_size),
+        collection_name="vcd",
+        persist_directory=persist_directory
+    )
+    return vectorstore, EmbeddingPipeline(model, cache, batch_size=batch_size, workers=workers)
 
-        doc = Document(
-            page_content=f"signal_name: {signal_name}, signal_content: {signal_content}",
-            metadata={"source": vcd_file_path, "signal_name": signal_name}
-        )
-        documents.append(doc)
-    return documents
+def setup_vector_store(documents, persist_directory=CHROMA_DIR, **pipeline_args):
+    """
+    Embeds documents into the persistent "vcd" Chroma collection.
 
-def setup_vector_store(documents):
-    # embedding_model = OllamaEmbeddings(model="nomic-embed-text")
-    # embedding_model = SentenceTransformer(model_name_or_path="all-MiniLM-L6-v2", device="cuda")
-    model = SentenceTransformer("all-MiniLM-L6-v2", device="cuda")
-    
-    texts = [doc.page_content for doc in documents]
-    embedding_model = model.encode(texts, batch_size=64, show_progress_bar=True)
+    documents may be any iterable (e.g. iter_vcd_documents) and is consumed
+    in bounded batches, so peak memory does not grow with the dump. Embeddings
+    come from the on-disk cache in EMBEDDING_CACHE_DIR, so only new or changed
+    chunks are encoded, and only chunks missing from the collection are
+    upserted. Documents are identified by the hash of their content and
+    metadata.
+    """
+    vectorstore, pipeline = open_vector_store(persist_directory, **pipeline_args)
 
     print("Creating and populating vector database...")
-    vectorstore = Chroma.from_texts(
-            texts=texts,
-            embedding=embedding_model,
-            metadatas=[doc.metadata for doc in documents],
-            collection_name="vcd",
-            persist_directory="chroma_data"
-        )
-    # vectorstore = Chroma.from_documents(
-    #     documents=documents,
-    #     embedding=embedding_model,
-    #     collection_name="vcd",
-    #     persist_directory="chroma_data"
-    # )
-    print("Vector database populated.")
+    stats = pipeline.run(documents, upserter(vectorstore), keep=not_stored(vectorstore))
+    print(f"Vector database populated: {stats['written']} new chunks, {stats['encoded']} encoded, "
+          f"{stats['docs_per_s']:.1f} docs/s.")
     return vectorstore
 
-def setup_rag_chain(vectorstore):
+def refresh_vector_store(vcd_file_path, persist_directory=CHROMA_DIR, window=None,
+                         max_transitions=DEFAULT_MAX_TRANSITIONS, max_chars=DEFAULT_MAX_CHARS, **pipeline_args):
+    """
+    Incrementally re-indexes a (re-simulated) dump.
+
+    Only signals whose change list differs from the manifest stored in
+    persist_directory are re-chunked and upserted; chunks that disappeared
+    are deleted from the collection.
+    """
+    vectorstore, pipeline = open_vector_store(persist_directory, **pipeline_args)
+    chunk_args = {"window": window, "max_transitions": max_transitions, "max_chars": max_chars}
+    with open_store(vcd_file_path) as store:
+        stats = update_vector_store(vectorstore, pipeline, store, vcd_file_path,
+                                    os.path.join(persist_directory, MANIFEST_NAME), chunk_args)
+    print(f"Vector database refreshed: {stats['changed']} signals changed, {stats['removed']} removed, "
+          f"{stats['unchanged']} unchanged ({stats['tails']} with a new end time), "
+          f"{stats['deleted_chunks']} stale chunks deleted.")
+    return vectorstore
+
+def setup_rag_chain(vectorstore, t0=None, t1=None):
     llm = ChatDeepSeek(
         model=MODEL_NAME,
         # export DEEPSEEK_API_KEY=<api_key>
     )
 
-    # Define the retriever
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 10}) # Retrieve top 10 most relevant chunks
+    # Define the retriever: signal names in the question are resolved exactly,
+    # then BM25 and vector rankings are fused. Retrieve top 10 most relevant chunks,
+    # optionally only chunks overlapping the [t0, t1] time window (in ticks)
+    retriever = HybridRetriever.from_vectorstore(vectorstore, k=10, t0=t0, t1=t1)
 
     # Define the prompt template for the LLM
     # The `context` variable will be populated by the retrieved documents
@@ -113,36 +171,33 @@ def setup_rag_chain(vectorstore):
     return rag_chain
 
 if __name__ == "__main__":
-    
-    
-    
-    # documents = load_and_chunk_vcd_data('dump.vcd')
 
-    # TODO make loading an exitising documents array easier
-    # with open('documents.pkl', 'wb') as f:
-    #     pickle.dump(documents, f)
-
-    with open('documents.pkl', 'rb') as f:
-       documents = pickle.load(f)
-
-    vectorstore = setup_vector_store(documents)
+    # prompt = "Please tell me the exact time when the reset rst_ni signal is deasserted"
+    # prompt = "How does the hw_top.dut.u_hdcom28_top.cpu_core.instr* interface work?"
+    prompt = "at time 4250ns what is the value of instr_rdata_i"
 
-    # TODO Make reloading an existing DB easier
-    #embedding_model = OllamaEmbeddings(model="nomic-embed-text")
-    #vectorstore = Chroma(
-    #    embedding_function=embedding_model,
-    #    collection_name="vcd", 
-    #    persist_directory="chroma_data"
-    #)
+    # Exact questions (value at time, edges, toggle counts) are answered
+    # straight from the waveform, only open-ended ones go through the RAG chain
+    router = QueryRouter(WaveformIndex.open(VCD_PATH))
+    answer = router.route(prompt)
+    if answer is not None:
+        print("Waveform Answer:")
+        print(answer)
+        sys.exit(0)
+
+    if FULL_REBUILD:
+        # The chunk store is regenerated automatically whenever dump.vcd
+        # changes and is read lazily
+        documents = open_document_store(DOCUMENTS_DB, VCD_PATH, iter_vcd_documents)
+        vectorstore = setup_vector_store(documents)
+    else:
+        # Only signals that changed since the last run are re-chunked and re-embedded
+        vectorstore = refresh_vector_store(VCD_PATH)
 
     rag = setup_rag_chain(vectorstore)
 
     print("\n--- RAG System Ready ---")
 
-    # prompt = "Please tell me the exact time when the reset rst_ni signal is deasserted"
-    # prompt = "How does the hw_top.dut.u_hdcom28_top.cpu_core.instr* interface work?"
-    prompt = "at time 4250ns what is the value of instr_rdata_i"
-
     print("Searching and generating response...\n")
     response = rag.invoke({"input": prompt})
 
@@ -0,0 +1 @@
+"""Embedding and vector store helpers for the parseVcd.py RAG pipeline."""
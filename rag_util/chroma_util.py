@@ -0,0 +1,30 @@
+"""Small helpers for writing precomputed embeddings into a langchain Chroma store."""
+
+# Chroma rejects very large id lists in one call.
+MAX_BATCH_SIZE = 4096
+
+
+def not_stored(vectorstore):
+    """Returns a keep(ids) predicate that is False for ids already in the collection."""
+    def keep(ids):
+        existing = set(vectorstore.get(ids=ids, include=[])["ids"])
+        return [i not in existing for i in ids]
+    return keep
+
+
+def upserter(vectorstore):
+    """Returns a sink(ids, docs, vectors) that upserts documents with their vectors."""
+    def upsert(ids, docs, vectors):
+        vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=vectors.tolist(),
+            metadatas=[doc.metadata for doc in docs],
+            documents=[doc.page_content for doc in docs],
+        )
+    return upsert
+
+
+def delete_ids(vectorstore, ids):
+    ids = list(ids)
+    for start in range(0, len(ids), MAX_BATCH_SIZE):
+        vectorstore.delete(ids=ids[start:start + MAX_BATCH_SIZE])
@@ -0,0 +1,145 @@
+"""
+Lazily loaded, versioned document store replacing documents.pkl.
+
+Chunk Documents are kept in a SQLite file, one row per chunk with the
+zlib-compressed page_content and JSON metadata, indexed by signal name.
+Iterating the store streams rows from a cursor, and lookups by signal name
+or time window only read the matching rows.
+
+The store records the size and mtime of the VCD it was built from, plus
+the chunking parameters, so open_document_store() rebuilds it
+automatically when either changes.
+"""
+
+import json
+import os
+import sqlite3
+import zlib
+
+from langchain_core.documents import Document
+
+STORE_FORMAT = 2
+
+_INSERT_BATCH = 1000
+
+
+def source_fingerprint(path):
+    """Returns {"size", "mtime_ns"} of a dump."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class DocumentStore:
+    """Read access to a document store file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self.meta = {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM meta")}
+        if self.meta.get("format") != STORE_FORMAT:
+            raise ValueError(f"Unsupported document store format in {path}")
+
+    @classmethod
+    def build(cls, path, documents, source, chunking=None):
+        """
+        Writes documents to a new store at path, replacing any existing one.
+
+        Args:
+            documents (iterable): Chunk Documents, consumed lazily.
+            source (str): VCD the documents were generated from.
+            chunking (dict): Parameters the chunks were generated with.
+        """
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        db = sqlite3.connect(tmp_path)
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute("CREATE TABLE docs (id INTEGER PRIMARY KEY, signal_name TEXT, t_start INTEGER, "
+                   "t_end INTEGER, metadata TEXT, content BLOB)")
+        batch = []
+        for doc in documents:
+            meta = doc.metadata
+            batch.append((meta.get("signal_name"), meta.get("t_start"), meta.get("t_end"),
+                          json.dumps(meta), zlib.compress(doc.page_content.encode())))
+            if len(batch) == _INSERT_BATCH:
+                db.executemany("INSERT INTO docs (signal_name, t_start, t_end, metadata, content) "
+                               "VALUES (?, ?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            db.executemany("INSERT INTO docs (signal_name, t_start, t_end, metadata, content) "
+                           "VALUES (?, ?, ?, ?, ?)", batch)
+        db.execute("CREATE INDEX docs_signal ON docs (signal_name)")
+        meta = {"format": STORE_FORMAT, "source": source, "source_fingerprint": source_fingerprint(source),
+                "chunking": chunking}
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        db.commit()
+        db.close()
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def is_fresh(self, source, chunking=None):
+        """True if the store was built from this exact dump with these chunking parameters."""
+        if self.meta.get("source") != source or self.meta.get("chunking") != chunking:
+            return False
+        recorded = self.meta.get("source_fingerprint") or {}
+        try:
+            current = source_fingerprint(source)
+        except OSError:
+            return False
+        # A re-simulated dump can keep its size, so any mtime change counts;
+        # sampling its content would miss changes in the middle of the file
+        return current["size"] == recorded.get("size") and current["mtime_ns"] == recorded.get("mtime_ns")
+
+    @staticmethod
+    def _document(metadata, content):
+        return Document(page_content=zlib.decompress(content).decode(), metadata=json.loads(metadata))
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def __iter__(self):
+        for metadata, content in self._db.execute("SELECT metadata, content FROM docs ORDER BY id"):
+            yield self._document(metadata, content)
+
+    def signal_names(self):
+        return [name for (name,) in self._db.execute("SELECT DISTINCT signal_name FROM docs")]
+
+    def by_signal(self, signal_name):
+        """Returns the chunks of one signal in time order."""
+        rows = self._db.execute("SELECT metadata, content FROM docs WHERE signal_name = ? ORDER BY id",
+                                (signal_name,))
+        return [self._document(metadata, content) for metadata, content in rows]
+
+    def in_window(self, t0, t1):
+        """Yields the chunks overlapping [t0, t1]."""
+        rows = self._db.execute("SELECT metadata, content FROM docs WHERE t_start <= ? AND t_end >= ? ORDER BY id",
+                                (t1, t0))
+        for metadata, content in rows:
+            yield self._document(metadata, content)
+
+    def close(self):
+        self._db.close()
+
+
+def open_document_store(path, source, build_documents, chunking=None):
+    """
+    Opens the document store at path, (re)building it when missing or stale.
+
+    Args:
+        path (str): Store file, e.g. "documents.db".
+        source (str): VCD the documents come from.
+        build_documents (callable): build_documents(source) -> iterable of
+            Documents, only called when the store has to be rebuilt.
+        chunking (dict): Chunking parameters; a change triggers a rebuild.
+    """
+    if os.path.exists(path):
+        try:
+            store = DocumentStore(path)
+        except (sqlite3.DatabaseError, ValueError):
+            store = None
+        if store is not None:
+            if store.is_fresh(source, chunking):
+                return store
+            store.close()
+        print(f"{path} is stale, rebuilding from {source}")
+    return DocumentStore.build(path, build_documents(source), source, chunking)
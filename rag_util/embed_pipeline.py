@@ -0,0 +1,229 @@
+"""
+Batched, pipelined document embedding.
+
+Documents are pulled from any iterable (e.g. the chunk generator) in
+batches of `batch_size` and pass through three stages connected by bounded
+queues, so at most a few batches are ever in memory:
+
+    prep thread      groups documents, drops duplicates and the ones already
+                     stored, and tokenises the texts missing from the embedding cache
+    encoder threads  run the model forward pass on tokenised batches
+    caller thread    merges cached vectors, fills the cache and hands each
+                     batch to a sink (e.g. a Chroma upsert)
+
+Tokenising batch n+1 overlaps with encoding batch n, and torch releases the
+GIL during the forward pass, so the stages run concurrently.
+"""
+
+import hashlib
+import json
+import queue
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 64
+
+_DONE = object()
+
+
+def document_id(key, metadata):
+    """
+    Store id of a document: its content key (EmbeddingCache.key) combined
+    with its metadata, so a document whose metadata changed is written again.
+    """
+    return hashlib.sha256(f"{key}\0{json.dumps(metadata, sort_keys=True)}".encode()).hexdigest()
+
+
+def detect_device():
+    """Returns "cuda" or "mps" when available, "cpu" otherwise."""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def load_sentence_model(model_name, device=None):
+    """Loads a SentenceTransformer on `device`, or on the best available one."""
+    from sentence_transformers import SentenceTransformer
+
+    device = device or detect_device()
+    print(f"Loading {model_name} on {device}")
+    return SentenceTransformer(model_name, device=device)
+
+
+class EmbeddingPipeline:
+    """
+    Streams documents through tokenisation and encoding into a sink.
+
+    Args:
+        model: SentenceTransformer (anything with tokenize() and a forward
+            call returning "sentence_embedding").
+        cache (EmbeddingCache): Vectors already cached are not recomputed.
+        batch_size (int): Documents per batch.
+        workers (int): Encoder threads. One is usually best on CPU, where torch
+            already parallelises each forward pass.
+        queue_size (int): Batches allowed to wait between two stages.
+    """
+
+    def __init__(self, model, cache, batch_size=DEFAULT_BATCH_SIZE, workers=None, queue_size=4):
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = workers or (2 if str(getattr(model, "device", "cpu")).startswith("cuda") else 1)
+        self.queue_size = queue_size
+
+    def _encode(self, features):
+        import torch
+
+        device = self.model.device
+        features = {k: v.to(device) if hasattr(v, "to") else v for k, v in features.items()}
+        with torch.no_grad():
+            vectors = self.model(features)["sentence_embedding"]
+        return vectors.float().cpu().numpy()
+
+    def _prep(self, documents, keep, tokenized, errors, stop):
+        try:
+            batch = []
+            for doc in documents:
+                batch.append(doc)
+                if len(batch) == self.batch_size:
+                    if not self._prep_batch(batch, keep, tokenized, stop):
+                        return
+                    batch = []
+            if batch:
+                self._prep_batch(batch, keep, tokenized, stop)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(self.workers):
+                _put(tokenized, _DONE, stop)
+
+    def _prep_batch(self, batch, keep, tokenized, stop):
+        """Tokenises one batch and queues it; returns False once the run is stopping."""
+        unique = {}
+        for doc in batch:
+            key = self.cache.key(doc.page_content)
+            unique.setdefault(document_id(key, doc.metadata), (key, doc))
+        ids = list(unique)
+        if keep is not None:
+            ids = [doc_id for doc_id, flag in zip(ids, keep(ids)) if flag]
+        if not ids:
+            return True
+        keys = [unique[doc_id][0] for doc_id in ids]
+        batch = [unique[doc_id][1] for doc_id in ids]
+        # Documents differing only in metadata share one vector, encode it once
+        missing, pending = [], set()
+        for i, key in enumerate(keys):
+            if key not in self.cache and key not in pending:
+                pending.add(key)
+                missing.append(i)
+        features = self.model.tokenize([batch[i].page_content for i in missing]) if missing else None
+        return _put(tokenized, (batch, ids, keys, missing, features), stop)
+
+    def _encoder(self, tokenized, encoded, errors, stop):
+        try:
+            while not stop.is_set():
+                item = _get(tokenized, stop)
+                if item is _DONE:
+                    break
+                batch, ids, keys, missing, features = item
+                vectors = self._encode(features) if missing else None
+                if not _put(encoded, (batch, ids, keys, missing, vectors), stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(encoded, _DONE, stop)
+
+    def run(self, documents, sink, keep=None):
+        """
+        Embeds documents and passes them to sink batch by batch.
+
+        Identical documents in one batch are written once. If a stage fails,
+        the others are stopped and its exception is re-raised.
+
+        Args:
+            documents (iterable): LangChain Documents, consumed lazily.
+            sink (callable): sink(ids, documents, vectors) for every batch; ids
+                are document_id()s, vectors an (n, dim) float32 array.
+            keep (callable): Optional keep(ids) -> list of bools, False for
+                documents that should be dropped (e.g. already in the store).
+
+        Returns:
+            dict with the number of documents written, encoded, and docs/s.
+        """
+        tokenized = queue.Queue(self.queue_size)
+        encoded = queue.Queue(self.queue_size)
+        errors = []
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._prep, args=(documents, keep, tokenized, errors, stop), daemon=True)]
+        threads += [threading.Thread(target=self._encoder, args=(tokenized, encoded, errors, stop), daemon=True)
+                    for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        start = time.perf_counter()
+        written = encoded_count = 0
+        running = self.workers
+        try:
+            while running and not stop.is_set():
+                item = _get(encoded, stop)
+                if item is _DONE:
+                    running -= 1
+                    continue
+                batch, ids, keys, missing, vectors = item
+                if missing:
+                    self.cache.add([keys[i] for i in missing], vectors)
+                    encoded_count += len(missing)
+                sink(ids, batch, self.cache.get(keys))
+                written += len(batch)
+                elapsed = time.perf_counter() - start
+                print(f"\rEmbedded {written} docs ({written / elapsed:.1f} docs/s)", end="", flush=True)
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            if stop.is_set():
+                # Unblock stages waiting on a full queue
+                for q in (tokenized, encoded):
+                    while not q.empty():
+                        q.get_nowait()
+            for thread in threads:
+                thread.join()
+            print()
+        if errors:
+            raise errors[0]
+        elapsed = time.perf_counter() - start
+        return {"written": written, "encoded": encoded_count,
+                "docs_per_s": written / elapsed if elapsed > 0 else 0.0}
+
+
+def _put(q, item, stop, poll=0.1):
+    """Puts item on a bounded queue, giving up once stop is set; returns whether it was queued."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=poll)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop, poll=0.1):
+    """Gets an item from q, or _DONE once stop is set and nothing is left."""
+    while True:
+        try:
+            return q.get(timeout=poll)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
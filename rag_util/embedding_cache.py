@@ -0,0 +1,147 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are keyed by sha256(model name + page_content) and stored per model
+under `<cache_dir>/<model>/`:
+
+    meta.json     model name and vector dimension
+    keys.txt      one hex key per line, line number = matrix row
+    vectors.f32   float32 matrix of shape (rows, dim), memory-mapped on read
+
+Both files are append-only. Vectors are written before their keys, so a run
+interrupted midway can leave whole or partial rows without a key; they are
+truncated away on the next load, before anything is appended.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+
+def content_key(model_name, text):
+    """Returns the cache key of a text under a given embedding model."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk map from (model name, text) to its embedding vector."""
+
+    def __init__(self, cache_dir, model_name):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, re.sub(r"[^\w.-]", "_", model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self._meta_path = os.path.join(self.path, "meta.json")
+        self._keys_path = os.path.join(self.path, "keys.txt")
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self.dim = None
+        self._rows = {}
+        self._count = 0
+        self._matrix = None
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = json.load(f)["dim"]
+            self._load()
+
+    def _load(self):
+        """Reads the key index and cuts both files back to the rows they agree on."""
+        row_bytes = 4 * self.dim
+        complete = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        keys = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path) as f:
+                keys = [line[:-1] for line in f if line.endswith("\n")]
+        self._count = min(complete, len(keys))
+        for row, key in enumerate(keys[:self._count]):
+            self._rows.setdefault(key, row)
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(self._count * row_bytes)
+        with open(self._keys_path, "a") as f:
+            f.truncate(sum(len(key.encode()) + 1 for key in keys[:self._count]))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def key(self, text):
+        return content_key(self.model_name, text)
+
+    def _vectors(self):
+        if self._matrix is None:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._count, self.dim))
+        return self._matrix
+
+    def get(self, keys):
+        """Returns the cached vectors of keys as an (n, dim) array; all keys must be present."""
+        rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+        return np.asarray(self._vectors()[rows])
+
+    def add(self, keys, vectors):
+        """Appends vectors for keys that are not cached yet."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self._meta_path, "w") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+        fresh = {}
+        for i, key in enumerate(keys):
+            if key not in self._rows:
+                fresh.setdefault(key, i)
+        if not fresh:
+            return
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors[list(fresh.values())].tobytes())
+        with open(self._keys_path, "a") as f:
+            for key in fresh:
+                self._rows[key] = self._count
+                self._count += 1
+                f.write(key + "\n")
+        self._matrix = None
+
+    def embed(self, texts, encode):
+        """
+        Embeds texts, calling encode only for the ones not cached yet.
+
+        Args:
+            texts (list): Texts to embed.
+            encode (callable): Maps a list of texts to an (n, dim) array.
+
+        Returns:
+            (n, dim) float32 array in the order of texts.
+        """
+        keys = [self.key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows:
+                missing.setdefault(key, text)
+        if missing:
+            self.add(list(missing), encode(list(missing.values())))
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self.get(keys)
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings backed by a SentenceTransformer and an EmbeddingCache."""
+
+    def __init__(self, model, cache, batch_size=64):
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def _encode(self, texts):
+        return self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=len(texts) > self.batch_size)
+
+    def embed_documents(self, texts):
+        return self.cache.embed(texts, self._encode).tolist()
+
+    def embed_query(self, text):
+        # Questions rarely repeat, keep them out of the cache
+        return self.model.encode([text])[0].tolist()
@@ -0,0 +1,219 @@
+"""
+Hybrid lexical + vector retrieval over waveform chunks.
+
+Pure vector similarity routinely misses the signal a question names
+explicitly. HybridRetriever first resolves the signal names and wildcard
+patterns in the question exactly, against a trie of the hierarchical names
+in the collection; when any resolve, both searches are restricted to those
+signals' chunks. It then ranks chunks with BM25 over their text and with the
+vector store, and fuses the two rankings with reciprocal rank fusion.
+"""
+
+import fnmatch
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from vcd_util.query_router import name_tokens
+from vcd_util.wave_chunks import time_filter
+
+# Constant of reciprocal rank fusion, 60 is the value from the original paper.
+RRF_K = 60
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_$]+")
+_LEAF = object()
+
+
+def tokenize(text):
+    """Lower-cased word tokens; dotted names contribute each segment."""
+    return [w.lower() for w in _WORD_RE.findall(text)]
+
+
+class SignalTrie:
+    """Trie over dotted signal names, one level per hierarchy segment."""
+
+    def __init__(self, names=()):
+        self.root = {}
+        # segment -> trie nodes reached through that segment, for patterns
+        # that start below the top of the hierarchy
+        self._segments = defaultdict(list)
+        for name in names:
+            self.insert(name)
+
+    def insert(self, name):
+        node = self.root
+        for part in name.split("."):
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+                self._segments[part].append(child)
+            node = child
+        node[_LEAF] = name
+
+    @staticmethod
+    def _children(node, part):
+        if any(c in part for c in "*?["):
+            return [child for key, child in node.items() if key is not _LEAF and fnmatch.fnmatchcase(key, part)]
+        child = node.get(part)
+        return [child] if child is not None else []
+
+    @staticmethod
+    def _collect(node, out):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is _LEAF:
+                    out.append(child)
+                else:
+                    stack.append(child)
+
+    def match(self, pattern):
+        """
+        Resolves a dotted name, scope or glob to the signal names it covers.
+
+        The first segment may match at any depth, so "cpu_core.instr*" finds
+        hw_top.dut.u_hdcom28_top.cpu_core.instr_rdata_i. A pattern naming a
+        scope returns every signal below it.
+        """
+        parts = pattern.split(".")
+        first = parts[0]
+        if any(c in first for c in "*?["):
+            nodes = [n for seg, ns in self._segments.items() if fnmatch.fnmatchcase(seg, first) for n in ns]
+        else:
+            nodes = list(self._segments.get(first, ()))
+        for part in parts[1:]:
+            nodes = [child for node in nodes for child in self._children(node, part)]
+        names = []
+        for node in nodes:
+            self._collect(node, names)
+        return sorted(set(names))
+
+
+class BM25:
+    """Okapi BM25 over pre-tokenised documents, with an inverted index."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for doc_index, tokens in enumerate(documents):
+            self.lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((doc_index, tf))
+        n = len(self.lengths)
+        self.avgdl = sum(self.lengths) / n if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+
+    def scores(self, query_tokens, candidates=None):
+        """Returns {doc_index: score}, optionally only for a candidate set."""
+        scores = defaultdict(float)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, tf in self.postings[term]:
+                if candidates is not None and doc_index not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_index] / self.avgdl)
+                scores[doc_index] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Exact name resolution, then BM25 and vector rankings fused with RRF.
+
+    Build it with HybridRetriever.from_vectorstore(vectorstore), which loads
+    the chunk texts and metadata of the collection once for the lexical side.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    documents: list
+    bm25: Any
+    trie: Any
+    by_signal: dict
+    k: int = 10
+    fetch_k: int = 50
+    t0: Optional[int] = None
+    t1: Optional[int] = None
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, k=10, fetch_k=50, t0=None, t1=None):
+        data = vectorstore.get(include=["documents", "metadatas"])
+        documents = [Document(page_content=text, metadata=meta or {})
+                     for text, meta in zip(data["documents"], data["metadatas"])]
+        by_signal = defaultdict(list)
+        for doc_index, doc in enumerate(documents):
+            by_signal[doc.metadata.get("signal_name")].append(doc_index)
+        return cls(
+            vectorstore=vectorstore,
+            documents=documents,
+            bm25=BM25([tokenize(doc.page_content) for doc in documents]),
+            trie=SignalTrie(name for name in by_signal if name),
+            by_signal=dict(by_signal),
+            k=k,
+            fetch_k=fetch_k,
+            t0=t0,
+            t1=t1,
+        )
+
+    def resolve_names(self, query):
+        """Signal names explicitly referenced (by name, scope or glob) in a query."""
+        precise, plain = name_tokens(query)
+        for candidates in (precise, plain):
+            names = []
+            for token in candidates:
+                if len(token) > 2 and token.startswith("/") and token.endswith("/"):
+                    regex = re.compile(token[1:-1])
+                    names += [name for name in self.by_signal if name and regex.search(name)]
+                else:
+                    names += self.trie.match(token)
+            if names:
+                return sorted(set(names))
+        return []
+
+    def _in_window(self, doc):
+        if self.t0 is None:
+            return True
+        t1 = self.t0 if self.t1 is None else self.t1
+        return doc.metadata.get("t_start", 0) <= t1 and doc.metadata.get("t_end", 0) >= self.t0
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        names = self.resolve_names(query)
+        candidates = None
+        filters = []
+        if names:
+            candidates = {i for name in names for i in self.by_signal.get(name, ())}
+            filters.append({"signal_name": {"$in": names}})
+        if self.t0 is not None:
+            filters.append(time_filter(self.t0, self.t1))
+
+        lexical = self.bm25.scores(tokenize(query), candidates)
+        lexical_ranked = [self.documents[i] for i, _ in sorted(lexical.items(), key=lambda kv: -kv[1])
+                          if self._in_window(self.documents[i])][:self.fetch_k]
+
+        search_filter = None
+        if len(filters) == 1:
+            search_filter = filters[0]
+        elif filters:
+            search_filter = {"$and": filters}
+        vector_ranked = self.vectorstore.similarity_search(query, k=self.fetch_k, filter=search_filter)
+
+        fused = defaultdict(float)
+        docs = {}
+        for ranking in (lexical_ranked, vector_ranked):
+            for rank, doc in enumerate(ranking):
+                fused[doc.page_content] += 1.0 / (RRF_K + rank + 1)
+                docs.setdefault(doc.page_content, doc)
+        best = sorted(fused, key=lambda text: -fused[text])[:self.k]
+        return [docs[text] for text in best]
@@ -0,0 +1,150 @@
+"""
+Incremental refresh of the vector store after a re-simulation.
+
+A manifest stored next to the Chroma collection records, for every signal,
+a digest of its change list and the ids of the chunks indexed for it. On the
+next run only signals whose digest changed are re-chunked; their new chunks
+are upserted and chunks that no longer exist are deleted. Unchanged signals
+are never rendered, embedded or touched in the collection.
+
+The end time of the dump only shows in each signal's summary chunk and in
+the chunks of its last time segment (see wave_chunks.signal_chunks), which
+the manifest keeps apart as the signal's "tail". When a re-simulation only
+moves the end time, unchanged signals re-render their tail alone.
+
+Chunk ids hash the content together with the metadata (see
+embed_pipeline.document_id), so a metadata change such as a new source path
+reaches the collection. Vectors are cached by content, so a changed signal
+whose chunks partly match the old ones only re-embeds the chunks that differ.
+
+Hierarchy chunks (one per scope, see wave_chunks.scope_chunks) are cheap to
+render and are rebuilt on every run; the manifest keeps their ids so chunks
+of removed scopes are deleted.
+"""
+
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document
+
+from rag_util.chroma_util import delete_ids, not_stored, upserter
+from rag_util.embed_pipeline import document_id
+from vcd_util.wave_chunks import DEFAULT_MAX_CHARS, iter_scope_chunks, signal_chunks
+
+MANIFEST_NAME = "vcd_manifest.json"
+# Bumped whenever the chunk text changes, so existing indexes are re-chunked.
+MANIFEST_FORMAT = 6
+
+
+def signal_digest(store, signal_id):
+    """Hashes a signal's declaration and its time/value columns."""
+    header = store.header
+    digest = hashlib.sha1()
+    digest.update(f"{header.signal_name(signal_id)}|{header.signal_width(signal_id)}|"
+                  f"{header.signal_type(signal_id)}|{header.timescale}".encode())
+    digest.update(store.times(signal_id).tobytes())
+    digest.update(store.packed_values(signal_id).tobytes())
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"format": MANIFEST_FORMAT, "chunking": None, "signals": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        # Re-chunk everything, but keep the old ids so their chunks are deleted
+        return {"format": MANIFEST_FORMAT, "chunking": None, "signals": manifest.get("signals", {}),
+                "scopes": manifest.get("scopes", [])}
+    return manifest
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def update_vector_store(vectorstore, pipeline, store, source, manifest_path, chunk_args):
+    """
+    Brings the collection in line with `store`, touching only changed signals.
+
+    Args:
+        vectorstore (Chroma): Collection to update.
+        pipeline (EmbeddingPipeline): Embeds and upserts new chunks.
+        store (WaveStore): Freshly converted waveform.
+        source (str): Dump path recorded in chunk metadata.
+        manifest_path (str): Manifest file next to the collection.
+        chunk_args (dict): window / max_transitions / max_chars; changing them
+            (or the source path) re-chunks every signal.
+
+    Returns:
+        dict with counts of changed, removed and unchanged signals, of
+        unchanged signals whose tail was re-rendered, of scope chunks and of
+        deleted chunks.
+    """
+    manifest = load_manifest(manifest_path)
+    previous = manifest["signals"]
+    end_time = store.end_time
+    old = previous if manifest["chunking"] == chunk_args and manifest.get("source") == source else {}
+    moved_end = manifest.get("end_time") != end_time
+    cache = pipeline.cache
+
+    signals = {}
+    changed = []
+    retail = []
+    for signal_id in range(store.header.num_signals):
+        name = store.header.signal_name(signal_id)
+        digest = signal_digest(store, signal_id)
+        entry = old.get(name)
+        if entry is None or entry["digest"] != digest:
+            signals[name] = {"digest": digest, "ids": [], "tail": []}
+            changed.append(signal_id)
+        elif moved_end:
+            signals[name] = {"digest": digest, "ids": entry["ids"], "tail": []}
+            retail.append(signal_id)
+        else:
+            signals[name] = entry
+
+    scope_ids = []
+
+    def chunk_documents(chunks, ids):
+        for text, metadata in chunks:
+            metadata["source"] = source
+            ids.append(document_id(cache.key(text), metadata))
+            yield Document(page_content=text, metadata=metadata)
+
+    def documents():
+        yield from chunk_documents(
+            iter_scope_chunks(store, chunk_args.get("max_chars", DEFAULT_MAX_CHARS), end_time), scope_ids)
+        for signal_id in changed:
+            entry = signals[store.header.signal_name(signal_id)]
+            yield from chunk_documents(
+                signal_chunks(store, signal_id, end_time=end_time, section="head", **chunk_args), entry["ids"])
+        for signal_id in changed + retail:
+            entry = signals[store.header.signal_name(signal_id)]
+            yield from chunk_documents(
+                signal_chunks(store, signal_id, end_time=end_time, section="tail", **chunk_args), entry["tail"])
+
+    pipeline.run(documents(), upserter(vectorstore), keep=not_stored(vectorstore))
+
+    def chunk_ids(entries):
+        return {i for entry in entries for i in entry["ids"] + entry.get("tail", [])}
+
+    live = chunk_ids(signals.values()) | set(scope_ids)
+    stale = chunk_ids(previous.values()) | set(manifest.get("scopes", ()))
+    stale -= live
+    delete_ids(vectorstore, stale)
+
+    save_manifest(manifest_path, {"format": MANIFEST_FORMAT, "chunking": chunk_args, "source": source,
+                                  "end_time": end_time, "signals": signals, "scopes": scope_ids})
+    return {
+        "changed": len(changed),
+        "removed": len(set(previous) - set(signals)),
+        "unchanged": len(signals) - len(changed),
+        "tails": len(retail),
+        "scope_chunks": len(scope_ids),
+        "deleted_chunks": len(stale),
+    }
@@ -0,0 +1 @@
+"""Yosys netlist extraction and graph utilities."""
@@ -0,0 +1,110 @@
+"""
+Throughput benchmark for the netlist readers.
+
+Usage:
+    python -m synthesis.benchmark [netlist.dot] [--cells 50000] [--json netlist.json]
+
+Without a DOT file a synthetic Yosys `show` style netlist is generated in a
+temporary directory. The networkx/pydot path that dot_to_json.py used before
+is timed too when both packages are installed, and --json times the Yosys
+JSON netlist reader on a netlist of the same design.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from synthesis.dot_parser import iter_dot
+from synthesis.yosys_json import read_netlist
+
+
+def write_synthetic_dot(path, num_cells=50000, seed=0):
+    """
+    Writes a DOT netlist shaped like the output of Yosys `show`: record label
+    cells with input and output ports, bit select nodes, constants and ports.
+
+    Args:
+        path (str): Output path.
+        num_cells (int): Number of cells.
+        seed (int): Random seed, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write('digraph "top" {\nlabel="top";\nrankdir="LR";\nremincross=true;\n')
+        for i in range(num_cells // 20 + 1):
+            f.write(f'n{i} [ shape=octagon, label="in_{i}", color="black", fontcolor="black" ];\n')
+        for i in range(num_cells):
+            f.write(f'c{i} [ shape=record, label="{{{{<p0> A|<p1> B}}|$and_{i}\\n$and|{{<p2> Y}}}}" ];\n')
+            if i % 4 == 0:
+                f.write(f'x{i} [ shape=record, style=rounded, label="<s0> {i % 8}:{i % 8} - 0:0 " ];\n')
+            if i % 16 == 0:
+                f.write(f'v{i} [ label="1\'0" ];\n')
+        for i in range(num_cells):
+            for port in ("p0", "p1"):
+                source = rng.randrange(i) if i else 0
+                if i % 4 == 0 and port == "p1":
+                    f.write(f"x{i}:e -> c{i}:{port}:w [arrowhead=odiamond, arrowtail=odiamond, dir=both];\n")
+                elif source == i:
+                    f.write(f"n0:e -> c{i}:{port}:w;\n")
+                else:
+                    f.write(f"c{source}:p2:e -> c{i}:{port}:w [color=\"black\", label=\"\"];\n")
+        f.write("}\n")
+
+
+def _measure(label, path, func):
+    size_mb = os.path.getsize(path) / (1 << 20)
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.2f} s  {size_mb / elapsed:8.1f} MB/s  ({count} records)")
+    return elapsed
+
+
+def bench_streaming(path):
+    return _measure("dot_parser", path, lambda: sum(1 for _ in iter_dot(path)))
+
+
+def bench_pydot(path):
+    try:
+        from networkx.drawing.nx_pydot import read_dot
+    except ImportError:
+        print("networkx/pydot not installed, skipping the pydot baseline")
+        return None
+
+    def run():
+        graph = read_dot(path)
+        return graph.number_of_nodes() + graph.number_of_edges()
+
+    return _measure("networkx + pydot", path, run)
+
+
+def bench_yosys_json(path):
+    return _measure("yosys json", path, lambda: read_netlist(path).num_edges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DOT reader throughput benchmark.")
+    parser.add_argument("dot", nargs="?", help="DOT file to read, a synthetic one is generated otherwise")
+    parser.add_argument("--cells", type=int, default=50000, help="Cells of the synthetic netlist")
+    parser.add_argument("--json", help="Yosys JSON netlist to time as well")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.dot
+        if path is None:
+            path = os.path.join(tmp, "synthetic.dot")
+            print(f"Generating synthetic netlist {path}...")
+            write_synthetic_dot(path, args.cells)
+        print(f"Input: {path} ({os.path.getsize(path) / (1 << 20):.1f} MB)")
+        streaming = bench_streaming(path)
+        baseline = bench_pydot(path)
+        if baseline:
+            print(f"{'':<24} speed-up {baseline / streaming:.2f}x")
+    if args.json:
+        print(f"Input: {args.json} ({os.path.getsize(args.json) / (1 << 20):.1f} MB)")
+        bench_yosys_json(args.json)
+
+
+if __name__ == "__main__":
+    main()
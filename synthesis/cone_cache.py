@@ -0,0 +1,244 @@
+"""
+Logic cone service with an on-disk cache keyed by design and target.
+
+Answering "what drives wb_inta_o?" used to mean running logic_cone.ys, which
+reads and synthesises all of the RTL again. ConeService hashes the RTL file
+set (paths and contents) plus the top module. It runs the Yosys prep once
+per distinct hash, keeps the prepared netlist and its graph in a cache
+entry, and stores every computed cone in that entry too:
+
+    <cache_dir>/<top>-<file set hash>-<content hash>/
+        netlist.json     Yosys write_json output
+        graph.npz        NetlistGraph arrays, loaded without parsing the JSON
+        cones/<key>.json one computed cone; key = target + query options
+
+An RTL edit changes the content hash, so the next query prepares a new
+entry and drops the entries of older versions of the same file set. The
+cache is kept under its size limit like the waveform cache, least recently
+used entries first.
+
+Configuration (environment):
+    CONE_CACHE_DIR        cache directory, default ~/.cache/wavellm/cones
+    CONE_CACHE_MAX_BYTES  size limit, default 2 GiB
+
+Usage:
+    python -m synthesis.cone_cache wb_inta_o [--script synthesis/logic_cone.ys] [--depth 3]
+    python -m synthesis.cone_cache clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from synthesis.netlist_graph import Cone, NetlistGraph
+from synthesis.yosys_json import read_netlist, run_prep, script_sources
+from vcd_util.wave_cache import evict
+
+CACHE_DIR_ENV = "CONE_CACHE_DIR"
+CACHE_SIZE_ENV = "CONE_CACHE_MAX_BYTES"
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "wavellm", "cones")
+DEFAULT_MAX_BYTES = 2 << 30
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logic_cone.ys")
+
+# Bumped when the entry layout or the graph construction changes
+CACHE_FORMAT = 1
+
+NETLIST_FILE = "netlist.json"
+GRAPH_FILE = "graph.npz"
+CONES_DIR = "cones"
+
+_TMP_MARK = ".tmp-"
+
+
+def cache_dir():
+    return os.path.expanduser(os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR))
+
+
+def max_cache_bytes():
+    return int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_MAX_BYTES))
+
+
+def _file_set_prefix(sources, top, flatten):
+    paths = "\n".join(sorted(os.path.abspath(source) for source in sources))
+    digest = hashlib.sha1(f"{top}\n{flatten}\n{paths}".encode()).hexdigest()[:12]
+    return f"{top}-{digest}"
+
+
+def design_hash(sources, top, flatten=False):
+    """Hash of an RTL file set's paths and contents, the top module and the prep options."""
+    digest = hashlib.sha256(f"{CACHE_FORMAT}\n{top}\n{flatten}\n".encode())
+    for source in sorted(sources, key=os.path.abspath):
+        digest.update(os.path.abspath(source).encode() + b"\n")
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cone_key(target, direction="in", **options):
+    """Cache key of one cone query."""
+    query = {"target": target, "direction": direction, **options}
+    return hashlib.sha1(json.dumps(query, sort_keys=True).encode()).hexdigest()[:20]
+
+
+class ConeService:
+    """
+    Serves cone queries of one design from the cache, preparing it on a miss.
+
+    Args:
+        sources (list of str): RTL files.
+        top (str): Top module.
+        flatten (bool): Flatten the hierarchy during prep, so cones cross
+            module boundaries.
+        directory (str): Cache directory, defaults to cache_dir().
+    """
+
+    def __init__(self, sources, top, flatten=False, directory=None):
+        self.sources = list(sources)
+        self.top = top
+        self.flatten = flatten
+        self.directory = directory or cache_dir()
+        self.design_hash = design_hash(self.sources, top, flatten)
+        self.entry_name = f"{_file_set_prefix(self.sources, top, flatten)}-{self.design_hash[:16]}"
+        self.entry_path = os.path.join(self.directory, self.entry_name)
+        self._graph = None
+        self._cones = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_script(cls, script_path=DEFAULT_SCRIPT, top=None, flatten=False, directory=None):
+        """Service for the RTL file set and top module a Yosys script such as logic_cone.ys reads."""
+        sources, script_top = script_sources(script_path)
+        top = top or script_top
+        if not top:
+            raise ValueError(f"{script_path} does not set a top module, pass one")
+        return cls(sources, top, flatten, directory)
+
+    @property
+    def netlist_path(self):
+        return os.path.join(self.entry_path, NETLIST_FILE)
+
+    def _prepare(self):
+        """Runs the Yosys prep into a new entry."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.entry_path}{_TMP_MARK}{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_path, CONES_DIR))
+        netlist_path = run_prep(self.sources, self.top, os.path.join(tmp_path, NETLIST_FILE), self.flatten)
+        read_netlist(netlist_path, self.top).graph().save(os.path.join(tmp_path, GRAPH_FILE))
+        try:
+            os.rename(tmp_path, self.entry_path)
+        except OSError:
+            # Another process prepared the same design first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self._drop_stale()
+        evict(self.directory, max_cache_bytes(), keep=[self.entry_path])
+
+    def _drop_stale(self):
+        """Removes the entries of earlier versions of the same file set."""
+        prefix = _file_set_prefix(self.sources, self.top, self.flatten) + "-"
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name != self.entry_name and _TMP_MARK not in name:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    @property
+    def graph(self):
+        """The design's NetlistGraph, prepared with Yosys on the first use of a new design hash."""
+        if self._graph is None:
+            graph_path = os.path.join(self.entry_path, GRAPH_FILE)
+            if not os.path.exists(graph_path):
+                self._prepare()
+            else:
+                os.utime(self.entry_path)
+            self._graph = NetlistGraph.load(graph_path)
+        return self._graph
+
+    def cone(self, target, direction="in", depth=None, stop_at_registers=False, port=None, bit=None, bits=False):
+        """
+        Fan-in or fan-out cone of a node or net, see NetlistGraph.cone().
+
+        Repeated queries are served from memory or from the cache entry.
+        """
+        options = {"depth": depth, "stop_at_registers": stop_at_registers, "port": port, "bit": bit, "bits": bits}
+        key = cone_key(target, direction, **options)
+        cone = self._cones.get(key)
+        if cone is not None:
+            self.hits += 1
+            return cone
+        graph = self.graph
+        cone_path = os.path.join(self.entry_path, CONES_DIR, f"{key}.json")
+        if os.path.exists(cone_path):
+            with open(cone_path, encoding="utf-8") as f:
+                data = json.load(f)
+            cone = Cone(graph, np.array(data["nodes"], dtype=np.int64), np.array(data["depths"], dtype=np.int32),
+                        np.array(data["edges"], dtype=np.int64))
+            self.hits += 1
+        else:
+            cone = graph.cone(target, direction, **options)
+            self.misses += 1
+            data = {"target": target, "direction": direction, "options": options, "nodes": cone.nodes.tolist(),
+                    "depths": cone.depths.tolist(), "edges": cone.edges.tolist()}
+            tmp_path = f"{cone_path}{_TMP_MARK}{os.getpid()}"
+            os.makedirs(os.path.dirname(cone_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, cone_path)
+        self._cones[key] = cone
+        return cone
+
+    def fanin(self, target, **options):
+        return self.cone(target, "in", **options)
+
+    def fanout(self, target, **options):
+        return self.cone(target, "out", **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached logic cone queries of an RTL design.")
+    parser.add_argument("targets", nargs="+", help="Signals (ports, cells or nets); 'clear' empties the cache")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="Yosys script naming the RTL files and top module")
+    parser.add_argument("--sources", nargs="+", help="RTL files, instead of --script")
+    parser.add_argument("--top", help="Top module")
+    parser.add_argument("--flatten", action="store_true", help="Flatten the hierarchy during prep")
+    parser.add_argument("--fanout", action="store_true", help="Fan-out instead of fan-in cones")
+    parser.add_argument("--depth", type=int, help="Maximum number of levels")
+    parser.add_argument("--stop-at-registers", action="store_true", help="Do not search through registers")
+    parser.add_argument("--bit", type=int, help="Start from this bit of the target")
+    parser.add_argument("--summary", action="store_true", help="Only print the size of each cone")
+    args = parser.parse_args()
+
+    directory = cache_dir()
+    if args.targets == ["clear"]:
+        shutil.rmtree(directory, ignore_errors=True)
+        print(f"Removed {directory}")
+        return
+    if args.sources:
+        if not args.top:
+            parser.error("--sources needs --top")
+        service = ConeService(args.sources, args.top, args.flatten)
+    else:
+        service = ConeService.from_script(args.script, args.top, args.flatten)
+
+    start = time.perf_counter()
+    graph = service.graph
+    print(f"Design {service.top} ({service.design_hash[:16]}): {graph.num_nodes} nodes, {graph.num_edges} edges "
+          f"in {time.perf_counter() - start:.2f} s")
+    for target in args.targets:
+        start = time.perf_counter()
+        cone = service.cone(target, "out" if args.fanout else "in", depth=args.depth,
+                            stop_at_registers=args.stop_at_registers, bit=args.bit)
+        print(f"\n{target}: {len(cone)} nodes, {len(cone.edges)} edges ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        if not args.summary:
+            for node_id, name, node_type, level in cone.records():
+                print(f"  {'  ' * min(level, 8)}{node_id} {name or '-'} [{node_type}] @{level}")
+    print(f"\n{service.hits} cached, {service.misses} computed, cache entry {service.entry_path}")
+
+
+if __name__ == "__main__":
+    main()
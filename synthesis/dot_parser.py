@@ -0,0 +1,227 @@
+"""
+Streaming parser for the DOT subset Yosys `show` writes.
+
+Yosys emits one statement per line: graph attributes, node statements with
+(record) labels, `a:port -> b:port` edges and, for multi-module views,
+`subgraph cluster_*` blocks. iter_dot() tokenises the file line by line with
+one regular expression and yields DotNode / DotEdge records as soon as each
+statement is complete, without building a syntax tree, so memory stays flat
+and a netlist picture of any size is read in one pass.
+
+Attribute values are unquoted (an escaped quote becomes a quote), other
+escapes such as the `\\n` inside record labels are kept as written.
+Statements may still span lines, e.g. a quoted label holding a raw newline.
+
+Usage:
+    for record in iter_dot("cone.dot"):
+        if isinstance(record, DotEdge):
+            print(record.source, record.source_port, "->", record.target)
+"""
+
+import re
+
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|->|--|[{}\[\];,=]|[^\s{}\[\];,="]+', re.S)
+# The common case of one plain `a:p -> b:q [k="v", ...];` edge per line
+_EDGE_LINE_RE = re.compile(r'\s*([\w.$:]+)\s*->\s*([\w.$:]+)\s*(?:\[((?:[^\]"]|"(?:[^"\\]|\\.)*")*)\])?\s*;?\s*$')
+_ATTR_RE = re.compile(r'([\w.]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^\s,;"]+)')
+_KEYWORDS = {"graph", "digraph", "strict", "subgraph", "node", "edge"}
+
+
+class DotNode:
+    """A node statement, or a node only referenced by edges and bare mentions (declared=False)."""
+
+    __slots__ = ("id", "attrs", "cluster", "declared")
+
+    def __init__(self, node_id, attrs, cluster=None, declared=True):
+        self.id = node_id
+        self.attrs = attrs
+        self.cluster = cluster
+        self.declared = declared
+
+    def __repr__(self):
+        return f"DotNode({self.id!r}, {self.attrs.get('label', '')!r})"
+
+
+class DotEdge:
+    """
+    One edge. Ports are everything after the first ':' of an endpoint,
+    e.g. "p71:w" for `c77:p71:w`, as networkx's read_dot reported them.
+    """
+
+    __slots__ = ("source", "source_port", "target", "target_port", "attrs", "cluster")
+
+    def __init__(self, source, source_port, target, target_port, attrs, cluster=None):
+        self.source = source
+        self.source_port = source_port
+        self.target = target
+        self.target_port = target_port
+        self.attrs = attrs
+        self.cluster = cluster
+
+    def __repr__(self):
+        return f"DotEdge({self.source!r} -> {self.target!r})"
+
+
+def _unquote(token):
+    if token.startswith('"'):
+        return token[1:-1].replace('\\"', '"')
+    return token
+
+
+def _split_endpoint(token):
+    node, _, port = _unquote(token).partition(":")
+    return node, port
+
+
+def _attributes(tokens, i):
+    """Parses `[k=v, k=v; ...]` starting at tokens[i] == "["; returns (attrs, index after "]")."""
+    attrs = {}
+    i += 1
+    while i < len(tokens) and tokens[i] != "]":
+        if tokens[i] in (",", ";"):
+            i += 1
+            continue
+        key = _unquote(tokens[i])
+        if i + 2 < len(tokens) and tokens[i + 1] == "=":
+            attrs[key] = _unquote(tokens[i + 2])
+            i += 3
+        else:
+            attrs[key] = "true"
+            i += 1
+    return attrs, i + 1
+
+
+def _complete(text):
+    """True when a statement has no open quote or attribute list."""
+    unquoted = _STRING_RE.sub("", text)
+    return '"' not in unquoted and unquoted.count("[") <= unquoted.count("]")
+
+
+class DotParser:
+    """
+    Incremental DOT parser; feed() takes lines and returns the records
+    completed by them.
+
+    Attributes:
+        name (str): Graph name.
+        attrs (dict): Top level graph attributes (label, rankdir, ...).
+    """
+
+    def __init__(self):
+        self.name = None
+        self.attrs = {}
+        self._clusters = []
+        self._pending = ""
+        self._declared = set()
+        self._referenced = {}
+
+    @property
+    def cluster(self):
+        return self._clusters[-1] if self._clusters else None
+
+    def feed(self, line):
+        if not self._pending:
+            match = _EDGE_LINE_RE.match(line)
+            if match:
+                return [self._edge(*match.groups())]
+        text = self._pending + line
+        if not _complete(text):
+            self._pending = text
+            return []
+        self._pending = ""
+        records = []
+        tokens = _TOKEN_RE.findall(text)
+        start = 0
+        for i, token in enumerate(tokens):
+            # A statement ends at ';', a brace or the end of the line
+            if token in (";", "{", "}"):
+                self._statement(tokens[start:i + (token == "{")], records)
+                if token == "}" and self._clusters:
+                    self._clusters.pop()
+                start = i + 1
+        self._statement(tokens[start:], records)
+        return records
+
+    def close(self):
+        """Returns DotNodes for the endpoints never declared by a node statement."""
+        return [DotNode(node_id, {}, cluster, declared=False)
+                for node_id, cluster in self._referenced.items() if node_id not in self._declared]
+
+    def _edge(self, source, target, attr_text):
+        attrs = {key: _unquote(value) for key, value in _ATTR_RE.findall(attr_text)} if attr_text else {}
+        source, _, source_port = source.partition(":")
+        target, _, target_port = target.partition(":")
+        cluster = self.cluster
+        self._referenced.setdefault(source, cluster)
+        self._referenced.setdefault(target, cluster)
+        return DotEdge(source, source_port, target, target_port, attrs, cluster)
+
+    def _statement(self, tokens, records):
+        if not tokens:
+            return
+        first = tokens[0]
+        if tokens[-1] == "{":
+            if first == "subgraph":
+                self._clusters.append(_unquote(tokens[1]) if len(tokens) > 2 else "")
+            elif first in ("digraph", "graph", "strict"):
+                self.name = _unquote(tokens[-2]) if len(tokens) > 2 and tokens[-2] not in _KEYWORDS else ""
+            else:
+                # Anonymous subgraph, e.g. { rank=same; a; b }
+                self._clusters.append(self.cluster or "")
+            return
+        if first in ("node", "edge", "graph"):
+            return
+        if len(tokens) >= 3 and tokens[1] == "=":
+            if not self._clusters:
+                self.attrs[_unquote(first)] = _unquote(tokens[2])
+            return
+        if len(tokens) > 1 and tokens[1] in ("->", "--"):
+            endpoints = []
+            i = 0
+            while i < len(tokens) and tokens[i] != "[":
+                if tokens[i] not in ("->", "--"):
+                    endpoints.append(_split_endpoint(tokens[i]))
+                i += 1
+            attrs = _attributes(tokens, i)[0] if i < len(tokens) else {}
+            for (source, source_port), (target, target_port) in zip(endpoints, endpoints[1:]):
+                records.append(DotEdge(source, source_port, target, target_port, attrs, self.cluster))
+            for node_id, _ in endpoints:
+                self._referenced.setdefault(node_id, self.cluster)
+            return
+        node_id = _split_endpoint(first)[0]
+        if len(tokens) == 1:
+            # Bare mentions, e.g. in rank groups, leave the node to its own statement
+            self._referenced.setdefault(node_id, self.cluster)
+            return
+        attrs = _attributes(tokens, 1)[0] if tokens[1] == "[" else {}
+        if node_id not in self._declared:
+            self._declared.add(node_id)
+            records.append(DotNode(node_id, attrs, self.cluster))
+
+
+def iter_dot(path):
+    """Yields DotNode and DotEdge records of a DOT file in file order, undeclared nodes last."""
+    parser = DotParser()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield from parser.feed(line)
+    yield from parser.close()
+
+
+def read_dot(path):
+    """
+    Reads a whole DOT file.
+
+    Returns:
+        (nodes, edges, parser): lists of DotNode and DotEdge records, and the
+        parser holding the graph name and attributes.
+    """
+    parser = DotParser()
+    nodes, edges = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for record in parser.feed(line):
+                (edges if isinstance(record, DotEdge) else nodes).append(record)
+    nodes.extend(parser.close())
+    return nodes, edges, parser
@@ -0,0 +1,381 @@
+"""
+Bulk export of a netlist graph to Neo4j.
+
+Two routes, both fed with the nodes/edges rows of the dot_to_json.py schema
+(from its CSVs or from a Yosys JSON netlist):
+
+    write_admin_import()  writes header files and partitioned data files in
+                          the layout `neo4j-admin database import full`
+                          expects, one partition per worker process, and
+                          returns the import command. This is the fast
+                          route for a new database.
+    load_batched()        loads into a running instance through the Python
+                          driver: rows are sent as $rows parameters of
+                          UNWIND queries, batch_size rows per transaction,
+                          with `concurrency` writer threads.
+
+Nodes get the label Node plus Port, Cell, Constant or BitSelect and the
+properties id, name and type; edges become CONNECTS relationships with
+source_port and target_port. MemoryGraph stands in for a driver in tests.
+
+Usage:
+    python -m synthesis.neo4j_export i2c_master_top.json --admin-import neo4j_import [--partitions 8]
+    python -m synthesis.neo4j_export cone.dot --uri bolt://localhost:7687 --user neo4j [--batch-size 10000]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import shlex
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from synthesis.netlist_graph import csv_paths
+
+NODE_LABEL = "Node"
+RELATIONSHIP_TYPE = "CONNECTS"
+NODE_HEADER = [f"id:ID({NODE_LABEL})", "name", "type", ":LABEL"]
+EDGE_HEADER = [f":START_ID({NODE_LABEL})", f":END_ID({NODE_LABEL})", "source_port", "target_port", ":TYPE"]
+DEFAULT_BATCH_SIZE = 10000
+PASSWORD_ENV = "NEO4J_PASSWORD"
+
+_TYPE_LABELS = {"port": "Port", "constant": "Constant", "bit select": "BitSelect"}
+
+CONSTRAINT_QUERY = f"CREATE CONSTRAINT netlist_node_id IF NOT EXISTS FOR (n:{NODE_LABEL}) REQUIRE n.id IS UNIQUE"
+NODE_QUERY = ("UNWIND $rows AS row MERGE (n:" + NODE_LABEL + " {{id: row.id}}) "
+              "SET n:{label}, n.name = row.name, n.type = row.type")
+EDGE_QUERY = (f"UNWIND $rows AS row MATCH (a:{NODE_LABEL} {{id: row.source}}) MATCH (b:{NODE_LABEL} {{id: row.target}}) "
+              f"CREATE (a)-[:{RELATIONSHIP_TYPE} {{source_port: row.source_port, target_port: row.target_port}}]->(b)")
+
+
+def node_label(node_type):
+    """Second label of a node, by its dot_to_json.py type."""
+    return _TYPE_LABELS.get(node_type, "Cell")
+
+
+def netlist_rows(path, top=None):
+    """
+    Nodes and edges rows of a netlist.
+
+    Args:
+        path (str): Yosys JSON netlist, or a DOT file (or base name) whose
+            CSVs dot_to_json.py wrote.
+        top (str): Module of a JSON netlist.
+
+    Returns:
+        (nodes, edges): lists of (id, name, type) and (source, target,
+        source_port, target_port) tuples.
+    """
+    if path.endswith(".json"):
+        from synthesis.yosys_json import read_netlist
+
+        netlist = read_netlist(path, top)
+        return list(zip(netlist.ids, netlist.names, netlist.types)), netlist.edge_rows()
+    nodes_csv, edges_csv = csv_paths(path)
+    with open(nodes_csv, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        # Port-qualified ids are endpoints older exports listed as nodes
+        nodes = [tuple(row) for row in reader if ":" not in row[0]]
+    with open(edges_csv, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        edges = [tuple(row) for row in reader]
+    return nodes, edges
+
+
+# Rows handed to forked writer processes, which inherit them instead of
+# receiving a pickled copy
+_SHARED_ROWS = {}
+
+
+def _partitions(length, count):
+    size = max(-(-length // count), 1)
+    return [(start, min(start + size, length)) for start in range(0, length, size)] or [(0, 0)]
+
+
+def _write_nodes(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows((node_id, name, node_type, f"{NODE_LABEL};{node_label(node_type)}")
+                                for node_id, name, node_type in rows)
+    return len(rows)
+
+
+def _write_edges(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(row + (RELATIONSHIP_TYPE,) for row in rows)
+    return len(rows)
+
+
+_WRITERS = {"nodes": _write_nodes, "edges": _write_edges}
+
+
+def _write_shared(kind, path, start, stop):
+    return _WRITERS[kind](path, _SHARED_ROWS[kind][start:stop])
+
+
+def admin_import_command(out_dir, database="neo4j"):
+    """neo4j-admin (5.x) command importing the files write_admin_import() wrote to out_dir."""
+    files = lambda kind: ",".join([os.path.join(out_dir, f"{kind}_header.csv"),
+                                   os.path.join(out_dir, rf"{kind}_part\d+\.csv")])
+    return ["neo4j-admin", "database", "import", "full", f"--nodes={files('nodes')}",
+            f"--relationships={files('edges')}", "--overwrite-destination", database]
+
+
+def write_admin_import(nodes, edges, out_dir, partitions=8, workers=None, database="neo4j"):
+    """
+    Writes nodes and edges as neo4j-admin import files.
+
+    Each kind gets a header file and `partitions` data files
+    ({kind}_part000.csv, ...), written by a pool of worker processes.
+
+    Args:
+        nodes, edges (list of tuple): Rows, see netlist_rows().
+        out_dir (str): Output directory, created if needed.
+        partitions (int): Data files per kind.
+        workers (int): Worker processes, defaults to the CPU count; 1 writes
+            in this process.
+        database (str): Database the returned command imports into.
+
+    Returns:
+        The neo4j-admin command to run, as an argument list.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for kind, header in (("nodes", NODE_HEADER), ("edges", EDGE_HEADER)):
+        with open(os.path.join(out_dir, f"{kind}_header.csv"), "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(header)
+        for stale in os.listdir(out_dir):
+            if re.fullmatch(rf"{kind}_part\d+\.csv", stale):
+                os.remove(os.path.join(out_dir, stale))
+    rows = {"nodes": nodes, "edges": edges}
+    jobs = [(kind, os.path.join(out_dir, f"{kind}_part{i:03d}.csv"), start, stop)
+            for kind in ("nodes", "edges") for i, (start, stop) in enumerate(_partitions(len(rows[kind]), partitions))]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        for kind, path, start, stop in jobs:
+            _WRITERS[kind](path, rows[kind][start:stop])
+    elif "fork" in multiprocessing.get_all_start_methods():
+        _SHARED_ROWS.update(rows)
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+                for future in [pool.submit(_write_shared, *job) for job in jobs]:
+                    future.result()
+        finally:
+            _SHARED_ROWS.clear()
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_WRITERS[kind], path, rows[kind][start:stop])
+                       for kind, path, start, stop in jobs]
+            for future in futures:
+                future.result()
+    return admin_import_command(out_dir, database)
+
+
+def _batches(rows, batch_size, fields):
+    for i in range(0, len(rows), batch_size):
+        yield [dict(zip(fields, row)) for row in rows[i:i + batch_size]]
+
+
+def _write_batch(tx, query, rows, label):
+    if label is None:
+        tx.run(query, rows=rows).consume()
+    else:
+        # Cypher cannot take a label as a parameter, it is in the query text;
+        # $label is unused there and tells MemoryGraph which one it is
+        tx.run(query, rows=rows, label=label).consume()
+
+
+def _run_batches(driver, database, query, batches, concurrency, label=None):
+    """Runs one write transaction per batch, `concurrency` at a time; returns the rows written."""
+    local = threading.local()
+    sessions = []
+    lock = threading.Lock()
+
+    def run(batch):
+        # Sessions are not thread safe, each writer thread keeps its own
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = driver.session(database=database)
+            with lock:
+                sessions.append(session)
+        session.execute_write(_write_batch, query, batch, label)
+        return len(batch)
+
+    written = 0
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            pending = set()
+            for batch in batches:
+                # Keep a bounded number of batches in flight
+                if len(pending) >= 2 * concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    written += sum(future.result() for future in done)
+                pending.add(pool.submit(run, batch))
+            written += sum(future.result() for future in pending)
+    finally:
+        for session in sessions:
+            session.close()
+    return written
+
+
+def load_batched(driver, nodes, edges, batch_size=DEFAULT_BATCH_SIZE, concurrency=4, database=None):
+    """
+    Loads nodes and edges into a running database with batched UNWIND queries.
+
+    Nodes are merged on their id (backed by a uniqueness constraint, created
+    first) and all loaded before any relationship; relationships are
+    created, so a design is loaded once into a database. Concurrent
+    relationship batches may lock the same nodes, the driver's
+    execute_write retries the transactions that deadlock.
+
+    Args:
+        driver: neo4j.Driver, or a MemoryGraph.
+        nodes, edges (list of tuple): Rows, see netlist_rows().
+        batch_size (int): Rows per transaction.
+        concurrency (int): Writer threads.
+        database (str): Target database, the default one when None.
+
+    Returns:
+        (nodes written, relationships written)
+    """
+    with driver.session(database=database) as session:
+        session.run(CONSTRAINT_QUERY).consume()
+    by_label = {}
+    for row in nodes:
+        by_label.setdefault(node_label(row[2]), []).append(row)
+    node_count = 0
+    for label, rows in by_label.items():
+        node_count += _run_batches(driver, database, NODE_QUERY.format(label=label),
+                                   _batches(rows, batch_size, ("id", "name", "type")), concurrency, label)
+    edge_count = _run_batches(driver, database, EDGE_QUERY,
+                              _batches(edges, batch_size, ("source", "target", "source_port", "target_port")),
+                              concurrency)
+    return node_count, edge_count
+
+
+class _Result:
+    def consume(self):
+        return None
+
+
+class _MemorySession:
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, label=None, **params):
+        self._graph.run(query, params, label)
+        return _Result()
+
+    def execute_write(self, work, *args):
+        return work(self, *args)
+
+
+class MemoryGraph:
+    """
+    In-process stand-in for a neo4j driver, for tests and dry runs.
+
+    It understands the queries load_batched() sends and keeps the result in
+    `nodes` (id -> properties, with a "labels" set) and `relationships`
+    (list of (source id, target id, properties)).
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.relationships = []
+        self.constraints = set()
+        self.transactions = 0
+        self._lock = threading.Lock()
+
+    def session(self, database=None):
+        return _MemorySession(self)
+
+    def close(self):
+        pass
+
+    def run(self, query, params, label=None):
+        """Applies one query; label is the second node label of a NODE_QUERY."""
+        with self._lock:
+            self.transactions += 1
+            if query == CONSTRAINT_QUERY:
+                self.constraints.add(query)
+                return
+            if label is not None and query == NODE_QUERY.format(label=label):
+                for row in params["rows"]:
+                    node = self.nodes.setdefault(row["id"], {"id": row["id"], "labels": {NODE_LABEL}})
+                    node["labels"].add(label)
+                    node.update(name=row["name"], type=row["type"])
+                return
+            if query == EDGE_QUERY:
+                for row in params["rows"]:
+                    # MATCH drops rows whose endpoints do not exist
+                    if row["source"] in self.nodes and row["target"] in self.nodes:
+                        self.relationships.append((row["source"], row["target"], {
+                            "source_port": row["source_port"], "target_port": row["target_port"]}))
+                return
+            raise ValueError(f"MemoryGraph does not understand {query!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a netlist graph to Neo4j.")
+    parser.add_argument("netlist", help="Yosys JSON netlist, or a DOT file converted by dot_to_json.py")
+    parser.add_argument("--top", help="Module of the JSON netlist")
+    parser.add_argument("--admin-import", metavar="DIR", help="Write neo4j-admin import files to DIR")
+    parser.add_argument("--partitions", type=int, default=8, help="Data files per kind for --admin-import")
+    parser.add_argument("--workers", type=int, help="Processes writing the --admin-import files")
+    parser.add_argument("--uri", help="Load into a running instance, e.g. bolt://localhost:7687")
+    parser.add_argument("--memory", action="store_true", help="Load into the in-memory stand-in (dry run)")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", default=os.environ.get(PASSWORD_ENV),
+                        help=f"Password, ${PASSWORD_ENV} by default")
+    parser.add_argument("--database", help="Target database")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per transaction")
+    parser.add_argument("--concurrency", type=int, default=4, help="Writer threads")
+    args = parser.parse_args()
+    if not (args.admin_import or args.uri or args.memory):
+        parser.error("Pass --admin-import DIR, --uri or --memory")
+
+    start = time.perf_counter()
+    nodes, edges = netlist_rows(args.netlist, args.top)
+    print(f"Read {len(nodes)} nodes, {len(edges)} edges in {time.perf_counter() - start:.2f} s")
+
+    if args.admin_import:
+        start = time.perf_counter()
+        command = write_admin_import(nodes, edges, args.admin_import, args.partitions, args.workers,
+                                     args.database or "neo4j")
+        print(f"Wrote {args.admin_import} in {time.perf_counter() - start:.2f} s, import with:")
+        print("  " + shlex.join(command))
+    if args.uri or args.memory:
+        if args.memory:
+            driver = MemoryGraph()
+        else:
+            try:
+                from neo4j import GraphDatabase
+            except ImportError:
+                sys.exit("Loading into Neo4j needs the driver: pip install neo4j")
+            driver = GraphDatabase.driver(args.uri, auth=(args.user, args.password))
+        try:
+            start = time.perf_counter()
+            node_count, edge_count = load_batched(driver, nodes, edges, args.batch_size, args.concurrency,
+                                                  args.database)
+            elapsed = time.perf_counter() - start
+            print(f"Loaded {node_count} nodes, {edge_count} relationships in {elapsed:.2f} s "
+                  f"({(node_count + edge_count) / max(elapsed, 1e-9):.0f} rows/s)")
+        finally:
+            driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+Netlist graph in compressed sparse row (CSR) form, for logic cone queries.
+
+The design is loaded once, either from the nodes/edges CSVs written by
+dot_to_json.py or from a Yosys `write_json` netlist, and kept as integer
+arrays: one entry per edge for source, target, ports and bits, plus fan-out
+and fan-in offset tables indexing the edges by source and by target node.
+A cone query is a breadth first search whose frontier is expanded level by
+level with a few NumPy gathers, so a cone costs milliseconds and thousands
+of them can be computed in one process instead of one Yosys run each.
+
+Edges point from driver to load. Graphs read from Yosys JSON have one edge
+per connected bit, which allows bitwise tracking: with bits=True a cone
+follows individual bits through bitwise cells ($and, $mux, $dff, ...), where
+bit i of the output only depends on bit i of the data inputs, and pulls in
+every bit of their control ports (S, EN, CLK, ...). DOT derived graphs carry
+ports but no bit positions, their cones are always per node.
+
+Usage:
+    python -m synthesis.netlist_graph cone.dot wb_inta_o [--depth 3] [--stop-at-registers]
+    python -m synthesis.netlist_graph design.json 'byte_controller.cr' --fanout --bit 2 --bits
+"""
+
+import argparse
+import csv
+import json
+import re
+import time
+
+import numpy as np
+
+
+# Record port compass points Yosys appends to edge endpoints, e.g. "p71:w".
+_COMPASS = {"n", "ne", "e", "se", "s", "sw", "w", "nw", "c", "_"}
+
+# Cell types (without the leading '$') holding state; cones stop there on request.
+_REGISTER_RE = re.compile(r"dff|dlatch|^_?sr(?:_|$)|^ff$|^mem", re.I)
+
+# Bitwise cell types and their data ports: bit i of the output depends on
+# bit i of each data port, and on every bit of the other (control) ports.
+BITWISE_CELLS = {
+    "not": ("A",), "pos": ("A",), "buf": ("A",),
+    "and": ("A", "B"), "or": ("A", "B"), "xor": ("A", "B"), "xnor": ("A", "B"),
+    "mux": ("A", "B"), "bwmux": ("A", "B", "S"), "tribuf": ("A",),
+    "ff": ("D",), "dff": ("D",), "dffe": ("D",), "adff": ("D",), "adffe": ("D",),
+    "sdff": ("D",), "sdffe": ("D",), "sdffce": ("D",), "aldff": ("D", "AD"), "aldffe": ("D", "AD"),
+    "dffsr": ("D",), "dffsre": ("D",), "dlatch": ("D",), "adlatch": ("D",), "dlatchsr": ("D",),
+}
+
+
+def _port_name(port):
+    """Drops the compass point of a DOT port, "p71:w" -> "p71", "e" -> ""."""
+    parts = port.split(":")
+    if parts[-1] in _COMPASS:
+        parts.pop()
+    return ":".join(parts)
+
+
+def csv_paths(netlist):
+    """Nodes and edges CSV paths dot_to_json.py writes for a DOT file (or its base name)."""
+    base = netlist
+    for suffix in (".dot", "_nodes.csv", "_edges.csv"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return f"{base}_nodes.csv", f"{base}_edges.csv"
+
+
+class Cone:
+    """
+    Result of a cone query.
+
+    Attributes:
+        graph (NetlistGraph): Graph queried.
+        nodes (ndarray): Node indices in the cone, in breadth first order,
+            the start node(s) first.
+        depths (ndarray): Level of each node, 0 for the start.
+        edges (ndarray): Indices of the edges traversed.
+    """
+
+    def __init__(self, graph, nodes, depths, edges):
+        self.graph = graph
+        self.nodes = nodes
+        self.depths = depths
+        self.edges = edges
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def ids(self):
+        return [self.graph.ids[i] for i in self.nodes]
+
+    def records(self):
+        """(id, name, type, depth) of every node in the cone."""
+        graph = self.graph
+        return [(graph.ids[i], graph.names[i], graph.types[i], int(d)) for i, d in zip(self.nodes, self.depths)]
+
+    def connections(self):
+        """(source id, source port, source bit, target id, target port, target bit) of the traversed edges."""
+        graph = self.graph
+        ports = graph.ports
+        return [(graph.ids[graph.edge_source[e]], ports[graph.edge_source_port[e]], int(graph.edge_source_bit[e]),
+                 graph.ids[graph.edge_target[e]], ports[graph.edge_target_port[e]], int(graph.edge_target_bit[e]))
+                for e in self.edges]
+
+
+def _gather(offsets, edge_order, nodes):
+    """
+    Edges of each node in a CSR table.
+
+    Returns:
+        (edges, origin): the edge indices, and for each the position in
+        `nodes` of the node it belongs to.
+    """
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    origin = np.repeat(np.arange(len(nodes)), counts)
+    firsts = np.cumsum(counts) - counts
+    index = np.arange(total) - np.repeat(firsts, counts) + np.repeat(starts, counts)
+    return edge_order[index], origin
+
+
+class NetlistGraph:
+    """
+    Directed netlist graph held as CSR arrays, see the module docstring.
+
+    Build it with from_csv(), from_yosys_json() or from_edges().
+
+    Args:
+        ids, names, types (list of str): Per node id, instance name and cell
+            type (without '$'), as in the dot_to_json.py nodes CSV.
+        ports (list of str): Port names, "" (a node without ports) first.
+        source, target (ndarray): Node indices of each edge's driver and load.
+        source_port, target_port (ndarray): Indices into `ports`.
+        source_bit, target_bit (ndarray): Bit offsets within the ports, -1
+            when unknown.
+        net (ndarray): Net bit id of each edge, -1 when unknown.
+        nets (dict): Net name -> list of net bit ids, for Yosys netlists.
+    """
+
+    def __init__(self, ids, names, types, ports, source, target, source_port, target_port,
+                 source_bit, target_bit, net, nets=None):
+        self.ids = list(ids)
+        self.names = list(names)
+        self.types = list(types)
+        self.ports = list(ports)
+        self._port_index = {port: i for i, port in enumerate(self.ports)}
+        self.nets = nets or {}
+        self._index = {node_id: i for i, node_id in enumerate(self.ids)}
+        self._by_name = {}
+        for i, name in enumerate(self.names):
+            if name:
+                self._by_name.setdefault(name, []).append(i)
+
+        self.edge_source = np.asarray(source, dtype=np.int32)
+        self.edge_target = np.asarray(target, dtype=np.int32)
+        self.edge_source_port = np.asarray(source_port, dtype=np.int32)
+        self.edge_target_port = np.asarray(target_port, dtype=np.int32)
+        self.edge_source_bit = np.asarray(source_bit, dtype=np.int32)
+        self.edge_target_bit = np.asarray(target_bit, dtype=np.int32)
+        self.edge_net = np.asarray(net, dtype=np.int64)
+
+        n = len(self.ids)
+        self.out_order = np.argsort(self.edge_source, kind="stable").astype(np.int32)
+        self.out_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_source, minlength=n), out=self.out_offsets[1:])
+        self.in_order = np.argsort(self.edge_target, kind="stable").astype(np.int32)
+        self.in_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_target, minlength=n), out=self.in_offsets[1:])
+
+        type_names = sorted(set(self.types))
+        type_index = {t: i for i, t in enumerate(type_names)}
+        self.node_type = np.array([type_index[t] for t in self.types], dtype=np.int32)
+        self.is_register = np.array([bool(_REGISTER_RE.search(t)) for t in self.types], dtype=bool)
+        # data_port[type, port]: the port is a data input of a bitwise cell type
+        self.data_port = np.zeros((len(type_names), len(self.ports)), dtype=bool)
+        for t, type_name in enumerate(type_names):
+            for port in BITWISE_CELLS.get(type_name.lstrip("$_").lower(), ()):
+                if port in self._port_index:
+                    self.data_port[t, self._port_index[port]] = True
+
+        self._net_edges = None
+
+    @property
+    def num_nodes(self):
+        return len(self.ids)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_source)
+
+    def save(self, path):
+        """Writes the graph to one .npz file, reloaded with load() without parsing the netlist again."""
+        meta = {"ids": self.ids, "names": self.names, "types": self.types, "ports": self.ports, "nets": self.nets}
+        np.savez(path, meta=np.array(json.dumps(meta)), source=self.edge_source, target=self.edge_target,
+                 source_port=self.edge_source_port, target_port=self.edge_target_port,
+                 source_bit=self.edge_source_bit, target_bit=self.edge_target_bit, net=self.edge_net)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["ids"], meta["names"], meta["types"], meta["ports"], data["source"], data["target"],
+                       data["source_port"], data["target_port"], data["source_bit"], data["target_bit"],
+                       data["net"], meta["nets"])
+
+    @classmethod
+    def from_edges(cls, ids, names, types, edges, nets=None):
+        """
+        Builds a graph from a list of (source, target, source_port,
+        target_port, source_bit, target_bit, net) edge tuples, with port
+        names rather than indices.
+        """
+        port_index = {"": 0}
+        columns = list(zip(*edges)) if edges else [()] * 7
+        source, target, source_port, target_port, source_bit, target_bit, net = columns
+        source_port = [port_index.setdefault(p, len(port_index)) for p in source_port]
+        target_port = [port_index.setdefault(p, len(port_index)) for p in target_port]
+        return cls(ids, names, types, list(port_index), source, target, source_port, target_port,
+                   source_bit, target_bit, net, nets)
+
+    @classmethod
+    def from_csv(cls, nodes_csv, edges_csv):
+        """
+        Loads the nodes/edges CSVs written by dot_to_json.py.
+
+        Edge endpoints missing from the nodes CSV are added as untyped nodes;
+        port-qualified rows such as "x0:e", which older networkx based
+        exports listed as nodes, are skipped.
+        """
+        ids, names, types = [], [], []
+        index = {}
+
+        def node(node_id, name="", node_type=""):
+            i = index.get(node_id)
+            if i is None:
+                i = index[node_id] = len(ids)
+                ids.append(node_id)
+                names.append(name)
+                types.append(node_type)
+            return i
+
+        with open(nodes_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if ":" not in row["id"]:
+                    node(row["id"], row["name"], row["type"])
+        edges = []
+        with open(edges_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                edges.append((node(row["source"]), node(row["target"]), _port_name(row["source_port"]),
+                              _port_name(row["target_port"]), -1, -1, -1))
+        return cls.from_edges(ids, names, types, edges)
+
+    @classmethod
+    def from_yosys_json(cls, path, top=None):
+        """
+        Loads one module of a Yosys `write_json` netlist, see
+        synthesis/yosys_json.py.
+
+        Args:
+            path (str): Netlist JSON.
+            top (str): Module to load, the one marked as top (or the only
+                one) by default.
+        """
+        from synthesis.yosys_json import read_netlist
+
+        return read_netlist(path, top).graph()
+
+    def find(self, target):
+        """
+        Node indices for a node id or instance/port name.
+
+        Returns:
+            List of node indices, empty when nothing matches.
+        """
+        if target in self._index:
+            return [self._index[target]]
+        return list(self._by_name.get(target, ()))
+
+    def _net_start(self, name, bit):
+        bits = self.nets.get(name)
+        if bits is None:
+            return None
+        if bit is not None:
+            bits = bits[bit:bit + 1]
+        if self._net_edges is None:
+            order = np.argsort(self.edge_net, kind="stable")
+            self._net_edges = (order, self.edge_net[order])
+        order, sorted_nets = self._net_edges
+        bits = np.asarray(bits, dtype=np.int64)
+        lo = np.searchsorted(sorted_nets, bits, side="left")
+        hi = np.searchsorted(sorted_nets, bits, side="right")
+        edges = np.concatenate([order[a:b] for a, b in zip(lo, hi)] or [np.zeros(0, dtype=np.int64)])
+        # The net is not a node: its drivers (or loads) are the first level
+        return np.zeros(0, dtype=np.int64), edges
+
+    def _start(self, target, port, bit, direction):
+        """Start nodes and the first edges of a query."""
+        if isinstance(target, (int, np.integer)):
+            nodes = [int(target)]
+        else:
+            nodes = self.find(target)
+            if not nodes:
+                net = self._net_start(target, bit)
+                if net is None:
+                    raise KeyError(f"No node or net named {target!r}")
+                return net
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if direction == "in":
+            edges, origin = _gather(self.in_offsets, self.in_order, nodes)
+            pin_port, pin_bit = self.edge_target_port, self.edge_target_bit
+        else:
+            edges, origin = _gather(self.out_offsets, self.out_order, nodes)
+            pin_port, pin_bit = self.edge_source_port, self.edge_source_bit
+        if port is None and bit is None:
+            return nodes, edges
+        # Without a port, pick the node's unnamed pins, i.e. the bits of a
+        # module port or constant; cells fall through to the far side below
+        port = port or ""
+        port_id = self._port_index.get(port)
+        if port_id is None:
+            raise KeyError(f"No port named {port!r}")
+        on_port = pin_port[edges] == port_id
+        if on_port.any():
+            # A port on the near side of the search: start with its own pins
+            keep = on_port if bit is None else on_port & (pin_bit[edges] == bit)
+            return nodes, edges[keep]
+        # A port on the far side, e.g. the output Y of a fan-in query: enter
+        # the node through it
+        arrival = np.full(len(nodes), -1 if bit is None else bit, dtype=np.int64)
+        arrival_port = np.full(len(nodes), port_id, dtype=np.int64)
+        return nodes, edges[self._keep(edges, origin, nodes, arrival, arrival_port, direction)]
+
+    def _keep(self, edges, origin, nodes, arrival_bit, arrival_port, direction):
+        """Bitwise filter of the edges expanded from nodes entered at (arrival_port, arrival_bit)."""
+        node_types = self.node_type[nodes[origin]]
+        bits = arrival_bit[origin]
+        if direction == "in":
+            # Output bit b of a bitwise cell needs bit b of its data inputs only
+            data = self.data_port[node_types, self.edge_target_port[edges]]
+            return ~data | (bits < 0) | (self.edge_target_bit[edges] == bits)
+        # Input bit b on a data port only reaches output bit b
+        data = self.data_port[node_types, arrival_port[origin]]
+        return ~data | (bits < 0) | (self.edge_source_bit[edges] == bits)
+
+    def cone(self, target, direction="in", depth=None, stop_at_registers=False, port=None, bit=None, bits=False):
+        """
+        Computes the fan-in or fan-out cone of a node or net.
+
+        Args:
+            target (str or int): Node id, instance or port name, node index,
+                or (Yosys netlists) a net name.
+            direction (str): "in" for the fan-in (drivers), "out" for the
+                fan-out (loads).
+            depth (int): Maximum number of levels, unlimited when None.
+            stop_at_registers (bool): Include registers reached but do not
+                search through them.
+            port (str): Only start from this port of the target; a port on
+                the far side (e.g. the output of a fan-in query) selects the
+                inputs feeding it.
+            bit (int): Only start from this bit of the port, or of the net.
+            bits (bool): Track bits through bitwise cells (needs a Yosys
+                netlist); implied by `bit`.
+
+        Returns:
+            Cone.
+        """
+        inward = direction == "in"
+        ends = self.edge_source if inward else self.edge_target
+        offsets, order = (self.in_offsets, self.in_order) if inward else (self.out_offsets, self.out_order)
+        end_port = self.edge_source_port if inward else self.edge_target_port
+        end_bit = self.edge_source_bit if inward else self.edge_target_bit
+        bits = bits or bit is not None
+
+        nodes, frontier = self._start(target, port, bit, direction)
+        levels = np.full(self.num_nodes, -1, dtype=np.int32)
+        levels[nodes] = 0
+        reached_order = [nodes]
+        traversed = []
+        visited_edges = np.zeros(self.num_edges, dtype=bool) if bits else None
+        level = 1
+        while len(frontier) and (depth is None or level <= depth):
+            if bits:
+                frontier = np.unique(frontier)
+                frontier = frontier[~visited_edges[frontier]]
+                visited_edges[frontier] = True
+            traversed.append(frontier)
+            reached = np.unique(ends[frontier])
+            new = reached[levels[reached] < 0]
+            levels[new] = level
+            reached_order.append(new)
+            if bits:
+                # Expand each (node, port, bit) pin the frontier arrived at once
+                pins = np.unique(np.stack([ends[frontier], end_port[frontier], end_bit[frontier]]), axis=1)
+                expand, arrival_port, arrival_bit = pins.astype(np.int64)
+            else:
+                expand = new.astype(np.int64)
+                arrival_port = arrival_bit = np.full(len(expand), -1, dtype=np.int64)
+            if stop_at_registers and len(expand):
+                through = ~self.is_register[expand]
+                expand, arrival_port, arrival_bit = expand[through], arrival_port[through], arrival_bit[through]
+            frontier, origin = _gather(offsets, order, expand)
+            if bits and len(frontier):
+                frontier = frontier[self._keep(frontier, origin, expand, arrival_bit, arrival_port, direction)]
+            level += 1
+
+        cone_nodes = np.concatenate(reached_order).astype(np.int64)
+        depths = levels[cone_nodes]
+        edges = np.unique(np.concatenate(traversed)) if traversed else np.zeros(0, dtype=np.int64)
+        return Cone(self, cone_nodes, depths, edges)
+
+    def fanin(self, target, **options):
+        """Fan-in cone of a node or net, see cone()."""
+        return self.cone(target, "in", **options)
+
+    def fanout(self, target, **options):
+        """Fan-out cone of a node or net, see cone()."""
+        return self.cone(target, "out", **options)
+
+    def cones(self, targets, direction="in", **options):
+        """Yields (target, Cone) for many targets, e.g. every output port."""
+        for target in targets:
+            yield target, self.cone(target, direction, **options)
+
+
+def load_netlist(path, top=None):
+    """Opens a Yosys JSON netlist, or the CSVs dot_to_json.py wrote for a DOT file, as a NetlistGraph."""
+    if path.endswith(".json"):
+        return NetlistGraph.from_yosys_json(path, top)
+    return NetlistGraph.from_csv(*csv_paths(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-in / fan-out cones of a netlist.")
+    parser.add_argument("netlist", help="Yosys JSON netlist, or a DOT file converted by dot_to_json.py")
+    parser.add_argument("targets", nargs="+", help="Node ids, cell/port names or net names")
+    parser.add_argument("--top", help="Module of the JSON netlist")
+    parser.add_argument("--fanout", action="store_true", help="Fan-out instead of fan-in cones")
+    parser.add_argument("--depth", type=int, help="Maximum number of levels")
+    parser.add_argument("--stop-at-registers", action="store_true", help="Do not search through registers")
+    parser.add_argument("--port", help="Start from this port of the target")
+    parser.add_argument("--bit", type=int, help="Start from this bit of the port or net")
+    parser.add_argument("--bits", action="store_true", help="Track bits through bitwise cells")
+    parser.add_argument("--summary", action="store_true", help="Only print the size of each cone")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = load_netlist(args.netlist, args.top)
+    print(f"Loaded {graph.num_nodes} nodes, {graph.num_edges} edges in {time.perf_counter() - start:.3f} s")
+    start = time.perf_counter()
+    cones = list(graph.cones(args.targets, "out" if args.fanout else "in", depth=args.depth,
+                             stop_at_registers=args.stop_at_registers, port=args.port, bit=args.bit,
+                             bits=args.bits))
+    elapsed = time.perf_counter() - start
+    for target, cone in cones:
+        print(f"\n{target}: {len(cone)} nodes, {len(cone.edges)} edges")
+        if not args.summary:
+            for node_id, name, node_type, level in cone.records():
+                print(f"  {'  ' * min(level, 8)}{node_id} {name or '-'} [{node_type}] @{level}")
+    print(f"\n{len(cones)} cones in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Yosys `write_json` netlists as the synthesis input.
+
+run_prep() runs Yosys once per design (read_verilog, hierarchy, prep, memory,
+opt, as logic_cone.ys does) and writes the netlist JSON. read_netlist() loads
+one module of it with a streaming JSON reader: the file is walked member by
+member and only one port, cell or net description is decoded at a time, so
+the cell/port/net graph is built without holding the JSON document.
+
+The netlist keeps bit-level connectivity (one edge per connected bit, from
+its driver to each load) and exports the nodes/edges CSVs in the schema
+dot_to_json.py writes for `show` output:
+
+    nodes  id, name, type    n* module ports ("port"), c* cells (type
+                             without '$', instance name shortened like
+                             `show` does, "$and$top.v:12$96" -> "96"),
+                             v* constants ("constant", e.g. "3'010")
+    edges  source, target, source_port, target_port
+                             one row per connected port pair, with the
+                             real port names ("A", "Y", ...) instead of
+                             record field ids
+
+Usage:
+    python -m synthesis.yosys_json --script synthesis/logic_cone.ys
+    python -m synthesis.yosys_json rtl/i2cmaster/*.v --top i2c_master_top [-o netlist.json]
+    python -m synthesis.yosys_json netlist.json [--top i2c_master_top]
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+from synthesis.netlist_graph import NetlistGraph
+
+YOSYS_ENV = "YOSYS"
+
+# Constant bits in port connections; every other bit is a net bit id.
+_CONSTANT_BITS = frozenset("01xz")
+
+_WHITESPACE_RE = re.compile(r"[ \t\r\n]*")
+_CHUNK_SIZE = 1 << 20
+
+
+class JsonStream:
+    """
+    Pull reader over a JSON text file.
+
+    members() walks an object key by key; for each key the caller reads the
+    value, either whole with value() or by walking it with members(), before
+    asking for the next key.
+    """
+
+    def __init__(self, f, chunk_size=_CHUNK_SIZE):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        data = self._file.read(size)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_size):
+                raise ValueError("Unexpected end of JSON")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r}, found {self._buffer[self._pos:self._pos + 20]!r}")
+        self._pos += 1
+
+    def value(self):
+        """Decodes the next value."""
+        self._peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number running into the end of the buffer may continue
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # The value continues past the buffer, read ahead (doubling, so
+            # a large value is decoded a bounded number of times)
+            self._fill(size)
+            size *= 2
+
+    def members(self):
+        """Yields the keys of the next object, see the class docstring."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}', found {char!r}")
+
+
+def _short_name(name):
+    # `show` prints auto generated names by their counter, "$and$top.v:12$96" -> "$96"
+    return name.rsplit("$", 1)[-1] if name.startswith("$") else name
+
+
+def _is_top(attributes):
+    value = attributes.get("top", 0)
+    try:
+        return bool(int(str(value), 2))
+    except ValueError:
+        return False
+
+
+class YosysNetlist:
+    """
+    Cell/port/net graph of one module of a Yosys JSON netlist.
+
+    Pins are collected per port connection while the module is streamed and
+    matched to their drivers with NumPy once it is complete (connect()).
+
+    Attributes:
+        module (str): Module name.
+        attributes (dict): Module attributes.
+        ids, names, types (list of str): Nodes, as in the dot_to_json.py
+            nodes CSV.
+        ports (list of str): Port names, indexed by the edge port columns.
+        edge_source, edge_target, edge_source_port, edge_target_port,
+        edge_source_bit, edge_target_bit, edge_net (ndarray): One entry per
+            connected bit, see NetlistGraph.
+        nets (dict): Net name -> net bit ids.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.attributes = {}
+        self.ids = []
+        self.names = []
+        self.types = []
+        self.ports = [""]
+        self.nets = {}
+        self._port_index = {"": 0}
+        # Per port connection: node, port, number of bits, drives, loads;
+        # and the net bits of all connections back to back (-1 for constants)
+        self._pins = ([], [], [], [], [])
+        self._bits = []
+        self._constant_edges = []
+
+    @property
+    def is_top(self):
+        return _is_top(self.attributes)
+
+    def _add_node(self, prefix, name, node_type):
+        self.ids.append(f"{prefix}{len(self.ids)}")
+        self.names.append(name)
+        self.types.append(node_type)
+        return len(self.ids) - 1
+
+    def _port_id(self, port):
+        port_id = self._port_index.get(port)
+        if port_id is None:
+            port_id = self._port_index[port] = len(self.ports)
+            self.ports.append(port)
+        return port_id
+
+    def _connect(self, node, port, bits, drives, loads):
+        port_id = self._port_id(port)
+        if not _CONSTANT_BITS.isdisjoint(bits):
+            if loads:
+                # One constant node per connection, named like `show` names them
+                constants = [(offset, bit) for offset, bit in enumerate(bits) if isinstance(bit, str)]
+                value = "".join(bit for _, bit in reversed(constants))
+                driver = self._add_node("v", f"{len(constants)}'{value}", "constant")
+                for const_bit, (offset, _) in enumerate(constants):
+                    self._constant_edges.append((driver, node, 0, port_id, const_bit, offset, -1))
+            bits = [-1 if isinstance(bit, str) else bit for bit in bits]
+        for column, value in zip(self._pins, (node, port_id, len(bits), drives, loads)):
+            column.append(value)
+        self._bits.extend(bits)
+
+    def add_port(self, name, port):
+        node = self._add_node("n", name, "port")
+        direction = port.get("direction", "inout")
+        # A module input drives its net, an output loads it
+        self._connect(node, "", port["bits"], direction != "output", direction != "input")
+
+    def add_cell(self, name, cell):
+        cell_type = cell["type"]
+        node = self._add_node("c", _short_name(name), cell_type[1:] if cell_type.startswith("$") else cell_type)
+        directions = cell.get("port_directions", {})
+        for port, bits in cell.get("connections", {}).items():
+            direction = directions.get(port, "inout")
+            self._connect(node, port, bits, direction != "input", direction != "output")
+
+    def add_net(self, name, net):
+        self.nets[name] = [bit for bit in net["bits"] if not isinstance(bit, str)]
+
+    def connect(self):
+        """Builds the driver -> load edge arrays, once every port and cell is added."""
+        nodes, ports, widths, drives, loads = (np.array(column, dtype=np.int64) for column in self._pins)
+        bits = np.array(self._bits, dtype=np.int64)
+        pin_node = np.repeat(nodes, widths)
+        pin_port = np.repeat(ports, widths)
+        pin_offset = np.arange(len(bits)) - np.repeat(np.cumsum(widths) - widths, widths)
+        connected = bits >= 0
+        driver_pins = np.flatnonzero(np.repeat(drives.astype(bool), widths) & connected)
+        load_pins = np.flatnonzero(np.repeat(loads.astype(bool), widths) & connected)
+
+        # Join every load pin to the driver pins of its net bit
+        driver_pins = driver_pins[np.argsort(bits[driver_pins], kind="stable")]
+        driver_bits = bits[driver_pins]
+        lo = np.searchsorted(driver_bits, bits[load_pins], side="left")
+        counts = np.searchsorted(driver_bits, bits[load_pins], side="right") - lo
+        load = np.repeat(load_pins, counts)
+        firsts = np.cumsum(counts) - counts
+        driver = driver_pins[np.arange(len(load)) - np.repeat(firsts, counts) + np.repeat(lo, counts)]
+        # An inout pin does not drive itself
+        keep = (pin_node[driver] != pin_node[load]) | (pin_port[driver] != pin_port[load])
+        driver, load = driver[keep], load[keep]
+
+        constant = np.array(self._constant_edges, dtype=np.int64).reshape(-1, 7)
+        self.edge_source = np.concatenate([pin_node[driver], constant[:, 0]])
+        self.edge_target = np.concatenate([pin_node[load], constant[:, 1]])
+        self.edge_source_port = np.concatenate([pin_port[driver], constant[:, 2]])
+        self.edge_target_port = np.concatenate([pin_port[load], constant[:, 3]])
+        self.edge_source_bit = np.concatenate([pin_offset[driver], constant[:, 4]])
+        self.edge_target_bit = np.concatenate([pin_offset[load], constant[:, 5]])
+        self.edge_net = np.concatenate([bits[load], constant[:, 6]])
+        self._pins = ([], [], [], [], [])
+        self._bits = []
+        self._constant_edges = []
+
+    @property
+    def num_edges(self):
+        return len(self.edge_source)
+
+    def load(self, stream):
+        """Reads the module object at the current position of a JsonStream."""
+        handlers = {"ports": self.add_port, "cells": self.add_cell, "netnames": self.add_net}
+        for section in stream.members():
+            handler = handlers.get(section)
+            if handler is not None:
+                for name in stream.members():
+                    handler(name, stream.value())
+            elif section == "attributes":
+                self.attributes = stream.value()
+            else:
+                stream.value()
+        self.connect()
+        return self
+
+    def graph(self):
+        """The netlist as a NetlistGraph, for cone queries."""
+        return NetlistGraph(self.ids, self.names, self.types, self.ports, self.edge_source, self.edge_target,
+                            self.edge_source_port, self.edge_target_port, self.edge_source_bit,
+                            self.edge_target_bit, self.edge_net, self.nets)
+
+    def edge_rows(self):
+        """Edges CSV rows: one (source, target, source_port, target_port) per connected port pair, in order."""
+        num_nodes, num_ports = len(self.ids), len(self.ports)
+        key = ((self.edge_source * num_nodes + self.edge_target) * num_ports + self.edge_source_port) * num_ports \
+            + self.edge_target_port
+        first = np.sort(np.unique(key, return_index=True)[1])
+        ids, ports = self.ids, self.ports
+        return [(ids[source], ids[target], ports[source_port], ports[target_port])
+                for source, target, source_port, target_port in zip(
+                    self.edge_source[first].tolist(), self.edge_target[first].tolist(),
+                    self.edge_source_port[first].tolist(), self.edge_target_port[first].tolist())]
+
+    def write_csv(self, base):
+        """
+        Writes {base}_nodes.csv and {base}_edges.csv in the dot_to_json.py schema.
+
+        Returns:
+            (nodes_csv_path, edges_csv_path)
+        """
+        nodes_csv_path, edges_csv_path = f"{base}_nodes.csv", f"{base}_edges.csv"
+        with open(nodes_csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "name", "type"])
+            writer.writerows(zip(self.ids, self.names, self.types))
+        with open(edges_csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["source", "target", "source_port", "target_port"])
+            writer.writerows(self.edge_rows())
+        return nodes_csv_path, edges_csv_path
+
+
+def read_netlist(path, top=None):
+    """
+    Streams one module out of a Yosys JSON netlist.
+
+    Args:
+        path (str): Netlist JSON.
+        top (str): Module to load; by default the one carrying the top
+            attribute (set by `hierarchy -top`), or the only module.
+
+    Returns:
+        YosysNetlist.
+    """
+    found = []
+    with open(path, encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.members():
+            if key != "modules":
+                stream.value()
+                continue
+            for name in stream.members():
+                if top is not None and name != top:
+                    stream.value()
+                    continue
+                netlist = YosysNetlist(name).load(stream)
+                if top is not None or netlist.is_top:
+                    return netlist
+                found.append(netlist)
+    if top is None and len(found) == 1:
+        return found[0]
+    if top is not None:
+        raise KeyError(f"No module {top!r} in {path}")
+    raise ValueError(f"Cannot tell the top module of {path}, pass it explicitly")
+
+
+def yosys_executable():
+    """
+    Path of the yosys binary, $YOSYS or the one on PATH.
+
+    Raises:
+        FileNotFoundError: Yosys is not installed.
+    """
+    executable = os.environ.get(YOSYS_ENV) or shutil.which("yosys")
+    if not executable:
+        raise FileNotFoundError(f"yosys not found, add the OSS CAD Suite bin directory to PATH "
+                                f"or set {YOSYS_ENV}")
+    return executable
+
+
+def prep_script(sources, top, json_path, flatten=False):
+    """The Yosys commands run_prep() runs, as one `-p` string."""
+    commands = [f'read_verilog -sv "{source}"' for source in sources]
+    commands.append(f"hierarchy -top {top}")
+    commands.append(f"prep -top {top}" + (" -flatten" if flatten else ""))
+    commands += ["memory", "opt", f'write_json "{json_path}"']
+    return "; ".join(commands)
+
+
+def run_prep(sources, top, json_path, flatten=False):
+    """
+    Synthesises RTL sources with `prep` and writes the netlist JSON.
+
+    Args:
+        sources (list of str): Verilog / SystemVerilog files.
+        top (str): Top module.
+        json_path (str): Output netlist.
+        flatten (bool): Flatten the hierarchy into the top module.
+
+    Returns:
+        json_path.
+
+    Raises:
+        FileNotFoundError: Yosys is not installed.
+        ValueError: Yosys failed; the message holds the end of its log.
+    """
+    result = subprocess.run([yosys_executable(), "-q", "-p", prep_script(sources, top, json_path, flatten)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        log = (result.stderr or result.stdout).strip().splitlines()
+        raise ValueError(f"yosys failed on {top}: " + "\n".join(log[-20:]))
+    return json_path
+
+
+def script_sources(script_path):
+    """
+    Reads the RTL file set and top module of a Yosys script such as logic_cone.ys.
+
+    Relative paths are resolved against the working directory, or else
+    against the repository root the script sits in.
+
+    Returns:
+        (sources, top): list of file paths and the module of `hierarchy -top`
+        (None when the script does not set one).
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(script_path)))
+    sources, top = [], None
+    with open(script_path, encoding="utf-8") as f:
+        for line in f:
+            for command in line.split("#", 1)[0].split(";"):
+                words = command.split()
+                if not words:
+                    continue
+                if words[0] in ("read_verilog", "read"):
+                    for word in words[1:]:
+                        if word.startswith("-"):
+                            continue
+                        if not os.path.isabs(word) and not os.path.exists(word):
+                            word = os.path.join(root, word)
+                        sources.append(word)
+                elif words[0] == "hierarchy" and "-top" in words:
+                    top = words[words.index("-top") + 1]
+    return sources, top
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesise RTL with Yosys prep and export the netlist graph.")
+    parser.add_argument("inputs", nargs="*", help="Verilog sources, or one netlist JSON")
+    parser.add_argument("--script", help="Take the sources and top module from a Yosys script")
+    parser.add_argument("--top", help="Top module")
+    parser.add_argument("--flatten", action="store_true", help="Flatten the hierarchy")
+    parser.add_argument("-o", "--output", help="Netlist JSON to write, <top>.json by default")
+    parser.add_argument("--csv", help="Base name of the nodes/edges CSVs, next to the JSON by default")
+    args = parser.parse_args()
+
+    sources, top = list(args.inputs), args.top
+    if args.script:
+        script_files, script_top = script_sources(args.script)
+        sources += script_files
+        top = top or script_top
+    if len(sources) == 1 and sources[0].endswith(".json"):
+        json_path = sources[0]
+    else:
+        if not sources or not top:
+            parser.error("Verilog sources and a top module are needed (or --script)")
+        json_path = args.output or f"{top}.json"
+        start = time.perf_counter()
+        run_prep(sources, top, json_path, args.flatten)
+        print(f"yosys prep: {json_path} in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    netlist = read_netlist(json_path, top)
+    elapsed = time.perf_counter() - start
+    print(f"Read module {netlist.module}: {len(netlist.ids)} nodes, {netlist.num_edges} bit edges, "
+          f"{len(netlist.nets)} nets in {elapsed:.3f} s")
+    for path in netlist.write_csv(args.csv or os.path.splitext(json_path)[0]):
+        print(f"✅ Successfully created {path}")
+
+
+if __name__ == "__main__":
+    main()
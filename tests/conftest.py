@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from rag_util.embed_pipeline import EmbeddingPipeline
+from synthesis.dot_to_json import parse_dot_to_csv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONE_DOT = os.path.join(REPO_DIR, "cone.dot")
+
+
+@pytest.fixture
+def cone_dot_source():
+    """The checked-in cone.dot itself, for read-only tests."""
+    return CONE_DOT
+
+
+@pytest.fixture
+def cone_dot(tmp_path):
+    """Copy of the checked-in cone.dot with the CSVs dot_to_json.py writes next to it."""
+    path = str(tmp_path / "cone.dot")
+    shutil.copy(CONE_DOT, path)
+    parse_dot_to_csv(path)
+    return path
+
+
+class FakeModel:
+    """Stands in for a SentenceTransformer: tokenize() and a forward call embedding a text as [len, 1]."""
+
+    device = "cpu"
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.calls = 0
+        self.encoded = 0
+
+    def tokenize(self, texts):
+        return {"texts": list(texts)}
+
+    def __call__(self, features):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("CUDA out of memory")
+        self.encoded += len(features["texts"])
+        return {"sentence_embedding": np.array([[len(t), 1] for t in features["texts"]], dtype=np.float32)}
+
+
+class FakePipeline(EmbeddingPipeline):
+    def _encode(self, features):
+        return self.model(features)["sentence_embedding"]
+
+
+@pytest.fixture
+def fake_pipeline():
+    """Factory of EmbeddingPipelines over a FakeModel failing after `fail_after` batches."""
+    def make(cache, fail_after=None, **options):
+        return FakePipeline(FakeModel(fail_after), cache, **options)
+    return make
@@ -0,0 +1,47 @@
+import os
+
+from langchain_core.documents import Document
+
+from rag_util.doc_store import DocumentStore, open_document_store
+
+
+def chunks(source):
+    with open(source) as f:
+        text = f.read()
+    return [Document(page_content=f"{text} a", metadata={"signal_name": "top.a", "t_start": 0, "t_end": 10}),
+            Document(page_content=f"{text} b", metadata={"signal_name": "top.b", "t_start": 10, "t_end": 20})]
+
+
+def test_store_round_trip(tmp_path):
+    source = tmp_path / "dump.vcd"
+    source.write_text("v1")
+    store = DocumentStore.build(str(tmp_path / "docs.db"), chunks(str(source)), str(source), {"window": 5})
+    assert len(store) == 2
+    assert [doc.page_content for doc in store] == ["v1 a", "v1 b"]
+    assert [doc.metadata["signal_name"] for doc in store.in_window(12, 30)] == ["top.b"]
+    assert store.by_signal("top.a")[0].metadata["t_end"] == 10
+    assert store.is_fresh(str(source), {"window": 5})
+    assert not store.is_fresh(str(source), {"window": 6})
+
+
+def test_same_size_rewrite_is_stale(tmp_path):
+    source = tmp_path / "dump.vcd"
+    source.write_text("v1")
+    path = str(tmp_path / "docs.db")
+    built = []
+
+    def build(vcd):
+        built.append(vcd)
+        return chunks(vcd)
+
+    open_document_store(path, str(source), build).close()
+    open_document_store(path, str(source), build).close()
+    assert len(built) == 1
+
+    # Same size, different content in the middle
+    source.write_text("v2")
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+    store = open_document_store(path, str(source), build)
+    assert len(built) == 2
+    assert [doc.page_content for doc in store] == ["v2 a", "v2 b"]
@@ -0,0 +1,68 @@
+import csv
+import re
+
+from synthesis.dot_parser import DotEdge, DotNode, iter_dot, read_dot
+from synthesis.dot_to_json import classify_node
+from synthesis.netlist_graph import csv_paths
+
+
+def test_cone_dot_records(cone_dot_source):
+    nodes, edges, parser = read_dot(cone_dot_source)
+    with open(cone_dot_source) as f:
+        lines = f.read().splitlines()
+    node_lines = [line for line in lines if re.match(r"\w+ \[", line)]
+    edge_lines = [line for line in lines if "->" in line]
+    assert [node.id for node in nodes] == [line.split()[0] for line in node_lines]
+    assert all(node.declared for node in nodes)
+    expected = [tuple(line.split(" [")[0].rstrip(";").split(" -> ")) for line in edge_lines]
+
+    def endpoint(node_id, port):
+        return f"{node_id}:{port}" if port else node_id
+
+    assert [(endpoint(e.source, e.source_port), endpoint(e.target, e.target_port)) for e in edges] == expected
+
+    by_id = {node.id: node for node in nodes}
+    assert by_id["c77"].attrs["label"] == "{{<p71> A|<p72> B}|$107\\n$and|{<p73> Y}}"
+    assert by_id["c77"].attrs["shape"] == "record"
+    assert by_id["n51"].attrs["label"] == "arst_i"
+    first = edges[0]
+    assert (first.source, first.source_port, first.target, first.target_port) == ("x0", "e", "c77", "p71:w")
+    assert first.attrs["arrowhead"] == "odiamond" and first.attrs["label"] == ""
+
+
+def test_iter_dot_matches_read_dot(cone_dot_source):
+    nodes, edges, _ = read_dot(cone_dot_source)
+    records = list(iter_dot(cone_dot_source))
+    assert [r.id for r in records if isinstance(r, DotNode)] == [n.id for n in nodes]
+    assert len([r for r in records if isinstance(r, DotEdge)]) == len(edges)
+
+
+def test_cone_dot_csv(cone_dot):
+    nodes_csv, edges_csv = csv_paths(cone_dot)
+    with open(nodes_csv, newline="") as f:
+        rows = {row["id"]: (row["name"], row["type"]) for row in csv.DictReader(f)}
+    assert rows["c77"] == ("107", "and")
+    assert rows["n51"] == ("arst_i", "port")
+    assert rows["x0"] == classify_node("x0", "<s0> 7:7 - 0:0 ")
+    with open(edges_csv, newline="") as f:
+        assert len(list(csv.DictReader(f))) == 270
+
+
+def test_statements_spanning_lines_and_clusters(tmp_path):
+    path = tmp_path / "multi.dot"
+    path.write_text('digraph "top" {\n'
+                    'subgraph cluster_u0 {\n'
+                    'a [ label="first\nsecond", shape=box ];\n'
+                    'b [ label="say \\"hi\\"" ];\n'
+                    '}\n'
+                    'a:p1:e -> b:w;\n'
+                    'a -> c;\n'
+                    '}\n')
+    nodes, edges, _ = read_dot(str(path))
+    by_id = {node.id: node for node in nodes}
+    assert by_id["a"].attrs["label"] == "first\nsecond"
+    assert by_id["a"].cluster == "cluster_u0"
+    assert by_id["b"].attrs["label"] == 'say "hi"'
+    assert not by_id["c"].declared
+    assert [(e.source, e.source_port, e.target, e.target_port) for e in edges] == [
+        ("a", "p1:e", "b", "w"), ("a", "", "c", "")]
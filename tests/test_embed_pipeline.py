@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+from langchain_core.documents import Document
+
+from rag_util.embed_pipeline import document_id
+from rag_util.embedding_cache import EmbeddingCache
+
+
+def documents(n):
+    return [Document(page_content=f"doc {i}") for i in range(n)]
+
+
+def run_with_timeout(func, timeout=10):
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not return"
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def test_run_writes_every_document_once(tmp_path, fake_pipeline):
+    cache = EmbeddingCache(str(tmp_path), "fake")
+    pipeline = fake_pipeline(cache, batch_size=4)
+    written = []
+    stats = pipeline.run(documents(10), lambda ids, batch, vectors: written.extend(ids))
+    assert stats["written"] == stats["encoded"] == 10
+    assert sorted(written) == sorted(document_id(cache.key(f"doc {i}"), {}) for i in range(10))
+
+
+def test_duplicates_within_a_batch_are_dropped(tmp_path, fake_pipeline):
+    cache = EmbeddingCache(str(tmp_path), "fake")
+    pipeline = fake_pipeline(cache, batch_size=8)
+    batches = []
+    pipeline.run([Document(page_content="a"), Document(page_content="a"), Document(page_content="b")],
+                 lambda ids, batch, vectors: batches.append((ids, vectors)))
+    (ids, vectors), = batches
+    assert ids == [document_id(cache.key("a"), {}), document_id(cache.key("b"), {})]
+    assert vectors.shape == (2, 2)
+
+
+def test_metadata_changes_the_id_but_not_the_vector(tmp_path, fake_pipeline):
+    cache = EmbeddingCache(str(tmp_path), "fake")
+    pipeline = fake_pipeline(cache, batch_size=8)
+    batches = []
+    stats = pipeline.run([Document(page_content="a", metadata={"source": "1.vcd"}),
+                          Document(page_content="a", metadata={"source": "2.vcd"})],
+                         lambda ids, batch, vectors: batches.append((ids, vectors)))
+    (ids, vectors), = batches
+    assert len(set(ids)) == 2 and stats["encoded"] == 1
+    assert (vectors[0] == vectors[1]).all()
+
+
+def test_keep_filters_documents(tmp_path, fake_pipeline):
+    cache = EmbeddingCache(str(tmp_path), "fake")
+    pipeline = fake_pipeline(cache, batch_size=4)
+    stored = {document_id(cache.key("doc 0"), {}), document_id(cache.key("doc 5"), {})}
+    written = []
+    pipeline.run(documents(8), lambda ids, batch, vectors: written.extend(ids),
+                 keep=lambda ids: [i not in stored for i in ids])
+    assert len(written) == 6 and not stored & set(written)
+
+
+def test_encoder_failure_is_raised(tmp_path, fake_pipeline):
+    cache = EmbeddingCache(str(tmp_path), "fake")
+    # Small batches and queues, so the prep thread is blocked on a full queue when the encoder fails
+    pipeline = fake_pipeline(cache, fail_after=1, batch_size=1, queue_size=1)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        run_with_timeout(lambda: pipeline.run(documents(50), lambda ids, batch, vectors: None))
+
+
+def test_sink_failure_is_raised(tmp_path, fake_pipeline):
+    cache = EmbeddingCache(str(tmp_path), "fake")
+    pipeline = fake_pipeline(cache, batch_size=1, queue_size=1)
+
+    def sink(ids, batch, vectors):
+        raise ValueError("upsert failed")
+
+    with pytest.raises(ValueError, match="upsert failed"):
+        run_with_timeout(lambda: pipeline.run(documents(50), sink))
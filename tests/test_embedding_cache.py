@@ -0,0 +1,60 @@
+import numpy as np
+
+from rag_util.embedding_cache import EmbeddingCache
+
+
+def test_reload_returns_stored_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model/a")
+    cache.add(["a", "b"], [[1, 2], [3, 4]])
+    cache = EmbeddingCache(str(tmp_path), "model/a")
+    assert len(cache) == 2
+    np.testing.assert_array_equal(cache.get(["b", "a"]), [[3, 4], [1, 2]])
+
+
+def test_orphan_rows_are_truncated_on_load(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.add(["a"], [[1, 2]])
+    with open(cache._vectors_path, "ab") as f:
+        # A whole row and half a row without keys, as left by an interrupted add()
+        f.write(np.array([9, 9, 9], dtype=np.float32).tobytes())
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.add(["b"], [[5, 6]])
+    np.testing.assert_array_equal(cache.get(["a", "b"]), [[1, 2], [5, 6]])
+    cache = EmbeddingCache(str(tmp_path), "m")
+    np.testing.assert_array_equal(cache.get(["a", "b"]), [[1, 2], [5, 6]])
+
+
+def test_unterminated_key_line_is_dropped(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.add(["a"], [[1, 2]])
+    with open(cache._keys_path, "a") as f:
+        f.write("par")
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.add(["b"], [[5, 6]])
+    cache = EmbeddingCache(str(tmp_path), "m")
+    assert "par" not in cache
+    np.testing.assert_array_equal(cache.get(["b"]), [[5, 6]])
+
+
+def test_duplicate_keys_in_one_add(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.add(["a", "a"], [[1, 2], [1, 2]])
+    cache.add(["b"], [[3, 4]])
+    np.testing.assert_array_equal(cache.get(["b", "a"]), [[3, 4], [1, 2]])
+    cache = EmbeddingCache(str(tmp_path), "m")
+    assert len(cache) == 2
+    np.testing.assert_array_equal(cache.get(["b"]), [[3, 4]])
+
+
+def test_embed_encodes_only_missing_texts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 0] for t in texts], dtype=np.float32)
+
+    cache.embed(["x", "yy", "x"], encode)
+    vectors = cache.embed(["yy", "zzz"], encode)
+    assert calls == [["x", "yy"], ["zzz"]]
+    np.testing.assert_array_equal(vectors, [[2, 0], [3, 0]])
@@ -0,0 +1,95 @@
+import numpy as np
+
+from rag_util.hybrid_retriever import RRF_K, BM25, HybridRetriever, SignalTrie, tokenize
+
+# (text, metadata, embedding); the query embeds to [1, 0]
+CHUNKS = [
+    ("signal_name: top.cpu.instr_rdata_i\nt=0..10: 0x5→0x6\nt=10..20: 0x6→0x5",
+     {"signal_name": "top.cpu.instr_rdata_i", "t_start": 0, "t_end": 20}, [0.8, 0.6]),
+    ("signal_name: top.cpu.instr_rdata_i\nt=20..30: 0x5→0x7",
+     {"signal_name": "top.cpu.instr_rdata_i", "t_start": 20, "t_end": 30}, [0.6, 0.8]),
+    ("signal_name: top.cpu.instr_rdata_i\nt=30..40: 0x7",
+     {"signal_name": "top.cpu.instr_rdata_i", "t_start": 30, "t_end": 40}, [1.0, 0.0]),
+    ("signal_name: top.cpu.data_o\nt=0..40: 0x5 0x5 0x5, value changes instr_rdata_i",
+     {"signal_name": "top.cpu.data_o", "t_start": 0, "t_end": 40}, [1.0, 0.0]),
+    ("signal_name: top.clk\nt=0..40: 0↔1 every 5 (8 changes)",
+     {"signal_name": "top.clk", "t_start": 0, "t_end": 40}, [0.0, 1.0]),
+]
+
+
+class FakeDocument:
+    def __init__(self, text, metadata):
+        self.page_content = text
+        self.metadata = metadata
+
+
+class FakeVectorStore:
+    """get() and similarity_search() over fixed embeddings, with the filters the retriever builds."""
+
+    def get(self, include):
+        return {"documents": [text for text, _, _ in CHUNKS], "metadatas": [meta for _, meta, _ in CHUNKS]}
+
+    def similarity_search(self, query, k, filter=None):
+        self.last_filter = filter
+        hits = [(np.dot([1.0, 0.0], vector), FakeDocument(text, meta)) for text, meta, vector in CHUNKS
+                if self._matches(meta, filter)]
+        # Stable sort: equal scores keep their collection order
+        return [doc for _, doc in sorted(hits, key=lambda hit: -hit[0])][:k]
+
+    def _matches(self, meta, condition):
+        if condition is None:
+            return True
+        if "$and" in condition:
+            return all(self._matches(meta, c) for c in condition["$and"])
+        (field, test), = condition.items()
+        (op, value), = test.items()
+        return {"$in": lambda: meta[field] in value, "$lte": lambda: meta[field] <= value,
+                "$gte": lambda: meta[field] >= value}[op]()
+
+
+def rrf(*ranks):
+    return sum(1.0 / (RRF_K + rank) for rank in ranks)
+
+
+def test_signal_trie():
+    trie = SignalTrie(["top.cpu.instr_rdata_i", "top.cpu.data_o", "top.clk"])
+    assert trie.match("instr_rdata_i") == ["top.cpu.instr_rdata_i"]
+    assert trie.match("cpu") == ["top.cpu.data_o", "top.cpu.instr_rdata_i"]
+    assert trie.match("cpu.d*") == ["top.cpu.data_o"]
+    assert trie.match("missing") == []
+
+
+def test_bm25_prefers_rarer_and_more_frequent_terms():
+    bm25 = BM25([tokenize(text) for text, _, _ in CHUNKS])
+    scores = bm25.scores(tokenize("0x5"))
+    assert sorted(scores, key=lambda i: -scores[i]) == [3, 0, 1]
+    assert set(bm25.scores(tokenize("0x5"), candidates={0, 1})) == {0, 1}
+
+
+def test_named_signal_chunks_come_first():
+    vectorstore = FakeVectorStore()
+    retriever = HybridRetriever.from_vectorstore(vectorstore, k=3)
+    query = "when is instr_rdata_i 0x5"
+    assert retriever.resolve_names(query) == ["top.cpu.instr_rdata_i"]
+    docs = retriever.invoke(query)
+    # data_o scores best on both sides, but is not the signal asked about
+    assert vectorstore.last_filter == {"signal_name": {"$in": ["top.cpu.instr_rdata_i"]}}
+    # BM25 ranks chunk 0 (two 0x5) > 1 (one) > 2 (none); vectors rank 2 > 0 > 1
+    fused = {0: rrf(1, 2), 1: rrf(2, 3), 2: rrf(3, 1)}
+    assert fused[0] > fused[2] > fused[1]
+    assert [doc.page_content for doc in docs] == [CHUNKS[i][0] for i in (0, 2, 1)]
+
+
+def test_fusion_without_names_and_time_window():
+    vectorstore = FakeVectorStore()
+    retriever = HybridRetriever.from_vectorstore(vectorstore, k=2)
+    docs = retriever.invoke("which chunks hold 0x5")
+    assert vectorstore.last_filter is None
+    # BM25: 3, 0, 1; vectors: 2, 3, 0, 1, 4 (ties in collection order)
+    assert rrf(1, 2) > rrf(2, 3) > rrf(3, 4)
+    assert [doc.page_content for doc in docs] == [CHUNKS[3][0], CHUNKS[0][0]]
+
+    windowed = HybridRetriever.from_vectorstore(vectorstore, k=5, t0=25, t1=35)
+    docs = windowed.invoke("instr_rdata_i")
+    assert "$and" in vectorstore.last_filter
+    assert sorted(doc.metadata["t_start"] for doc in docs) == [20, 30]
@@ -0,0 +1,82 @@
+from rag_util.embedding_cache import EmbeddingCache
+from rag_util.incremental import update_vector_store
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+HEADER = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 8 " data $end
+$var wire 1 # en $end
+$upscope $end
+$enddefinitions $end
+"""
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        for doc_id, metadata, document in zip(ids, metadatas, documents):
+            self.rows[doc_id] = (document, metadata)
+
+
+class FakeVectorStore:
+    """The parts of a langchain Chroma store chroma_util uses."""
+
+    def __init__(self):
+        self._collection = FakeCollection()
+
+    def get(self, ids, include):
+        return {"ids": [i for i in ids if i in self._collection.rows]}
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self._collection.rows.pop(doc_id, None)
+
+
+def write_dump(path, end, data_changes):
+    lines = [HEADER, "#0", "0!", 'b0 "', "0#"]
+    for t in range(5, end + 1, 5):
+        lines.append(f"#{t}")
+        lines.append(f"{(t // 5) % 2}!")
+        if t in data_changes:
+            lines.append(f'b{data_changes[t]:b} "')
+    path.write_text("\n".join(lines) + "\n")
+    return WaveStore(convert_vcd(str(path), str(path) + ".wave"))
+
+
+def update(make_pipeline, tmp_path, vectorstore, store, source, name="manifest.json"):
+    pipeline = make_pipeline(EmbeddingCache(str(tmp_path / "cache"), "fake"), batch_size=16)
+    chunk_args = {"window": None, "max_transitions": 4, "max_chars": 1000}
+    stats = update_vector_store(vectorstore, pipeline, store, source, str(tmp_path / name), chunk_args)
+    return stats, pipeline.model.encoded
+
+
+def test_incremental_update_matches_a_full_rebuild(tmp_path, fake_pipeline):
+    vectorstore = FakeVectorStore()
+    store = write_dump(tmp_path / "v1.vcd", 100, {20: 3, 40: 7})
+    stats, _ = update(fake_pipeline, tmp_path, vectorstore, store, "dump.vcd")
+    assert stats["changed"] == 3
+
+    # Re-simulated for longer: clk changes, data does not, en never changes
+    store = write_dump(tmp_path / "v2.vcd", 120, {20: 3, 40: 7})
+    stats, encoded = update(fake_pipeline, tmp_path, vectorstore, store, "dump.vcd")
+    assert (stats["changed"], stats["unchanged"], stats["tails"]) == (1, 2, 2)
+
+    fresh = FakeVectorStore()
+    update(fake_pipeline, tmp_path, fresh, store, "dump.vcd", name="fresh.json")
+    assert vectorstore._collection.rows == fresh._collection.rows
+
+    # Nothing changed: nothing is rendered or encoded
+    stats, encoded = update(fake_pipeline, tmp_path, vectorstore, store, "dump.vcd")
+    assert (stats["changed"], stats["tails"], stats["deleted_chunks"], encoded) == (0, 0, 0, 0)
+
+
+def test_metadata_change_reaches_the_store(tmp_path, fake_pipeline):
+    vectorstore = FakeVectorStore()
+    store = write_dump(tmp_path / "v1.vcd", 50, {20: 3})
+    update(fake_pipeline, tmp_path, vectorstore, store, "a.vcd")
+    stats, encoded = update(fake_pipeline, tmp_path, vectorstore, store, "b.vcd")
+    assert encoded == 0
+    assert {metadata["source"] for _, metadata in vectorstore._collection.rows.values()} == {"b.vcd"}
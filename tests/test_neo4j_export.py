@@ -0,0 +1,52 @@
+import csv
+import glob
+import os
+
+import pytest
+
+from synthesis.neo4j_export import (NODE_LABEL, RELATIONSHIP_TYPE, MemoryGraph, load_batched, netlist_rows,
+                                    node_label, write_admin_import)
+
+
+def read_admin_files(out_dir, kind):
+    with open(os.path.join(out_dir, f"{kind}_header.csv"), newline="") as f:
+        header = next(csv.reader(f))
+    rows = []
+    for path in sorted(glob.glob(os.path.join(out_dir, f"{kind}_part*.csv"))):
+        with open(path, newline="") as f:
+            rows.extend(csv.reader(f))
+    return header, rows
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_admin_import_files_round_trip(cone_dot, tmp_path, workers):
+    nodes, edges = netlist_rows(cone_dot)
+    out_dir = str(tmp_path / "import")
+    command = write_admin_import(nodes, edges, out_dir, partitions=3, workers=workers)
+    assert command[:4] == ["neo4j-admin", "database", "import", "full"]
+
+    header, rows = read_admin_files(out_dir, "nodes")
+    assert header == [f"id:ID({NODE_LABEL})", "name", "type", ":LABEL"]
+    assert [tuple(row[:3]) for row in rows] == nodes
+    for node_id, name, node_type, labels in rows:
+        assert labels.split(";") == [NODE_LABEL, node_label(node_type)]
+
+    header, rows = read_admin_files(out_dir, "edges")
+    assert header[-1] == ":TYPE"
+    assert [tuple(row[:4]) for row in rows] == [tuple(edge) for edge in edges]
+    assert {row[4] for row in rows} == {RELATIONSHIP_TYPE}
+
+
+def test_memory_graph_load(cone_dot):
+    nodes, edges = netlist_rows(cone_dot)
+    graph = MemoryGraph()
+    node_count, edge_count = load_batched(graph, nodes, edges, batch_size=100, concurrency=3)
+    assert node_count == len(graph.nodes) == len(nodes)
+    ids = {node[0] for node in nodes}
+    loadable = [edge for edge in edges if edge[0] in ids and edge[1] in ids]
+    assert edge_count == len(edges)
+    assert len(graph.relationships) == len(loadable)
+    node_id, name, node_type = nodes[0]
+    assert graph.nodes[node_id] == {"id": node_id, "name": name, "type": node_type,
+                                    "labels": {NODE_LABEL, node_label(node_type)}}
+    assert graph.constraints
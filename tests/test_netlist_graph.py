@@ -0,0 +1,84 @@
+import csv
+from collections import deque
+
+import pytest
+
+from synthesis.netlist_graph import NetlistGraph, csv_paths, load_netlist
+
+
+def reference_levels(cone_dot, start, direction="in", depth=None):
+    """Plain breadth first search over the edges CSV: {node id: level}."""
+    _, edges_csv = csv_paths(cone_dot)
+    neighbours = {}
+    with open(edges_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            near, far = (row["target"], row["source"]) if direction == "in" else (row["source"], row["target"])
+            neighbours.setdefault(near, set()).add(far)
+    levels = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if depth is not None and levels[node] == depth:
+            continue
+        for other in neighbours.get(node, ()):
+            if other not in levels:
+                levels[other] = levels[node] + 1
+                queue.append(other)
+    return levels
+
+
+@pytest.mark.parametrize("direction, depth", [("in", None), ("in", 2), ("out", None), ("out", 3)])
+def test_cone_matches_breadth_first_search(cone_dot, direction, depth):
+    graph = load_netlist(cone_dot)
+    start = "n66" if direction == "in" else "n51"
+    cone = graph.cone(start, direction, depth=depth)
+    assert {node_id: level for node_id, _, _, level in cone.records()} == reference_levels(
+        cone_dot, start, direction, depth)
+    assert cone.ids()[0] == start
+    assert list(cone.depths) == sorted(cone.depths)
+
+
+def test_cone_by_port_name(cone_dot):
+    graph = load_netlist(cone_dot)
+    assert graph.find("wb_inta_o") == graph.find("n66")
+    assert graph.fanin("wb_inta_o").ids() == graph.fanin("n66").ids()
+    with pytest.raises(KeyError):
+        graph.fanin("no_such_port")
+
+
+def test_stop_at_registers(cone_dot):
+    graph = load_netlist(cone_dot)
+    cone = graph.fanin("wb_inta_o", stop_at_registers=True)
+    # wb_inta_o is driven straight by a register, which ends the search
+    assert [(node_id, node_type, level) for node_id, _, node_type, level in cone.records()] == [
+        ("n66", "port", 0), ("c110", "adff", 1)]
+    assert len(graph.fanin("wb_inta_o")) > len(cone)
+
+
+def test_save_and_load(cone_dot, tmp_path):
+    graph = load_netlist(cone_dot)
+    path = str(tmp_path / "cone.npz")
+    graph.save(path)
+    loaded = NetlistGraph.load(path)
+    assert loaded.ids == graph.ids
+    assert loaded.fanin("wb_inta_o").records() == graph.fanin("wb_inta_o").records()
+
+
+def test_bitwise_cone():
+    # a[1:0] & b[1:0] -> y[1:0], with a one bit select line s muxing y
+    ids = ["a", "b", "s", "and", "mux", "y"]
+    types = ["port", "port", "port", "$and", "$mux", "port"]
+    edges = [(0, 3, "", "A", 0, 0, 0), (0, 3, "", "A", 1, 1, 1),
+             (1, 3, "", "B", 0, 0, 2), (1, 3, "", "B", 1, 1, 3),
+             (3, 4, "Y", "A", 0, 0, 4), (3, 4, "Y", "A", 1, 1, 5),
+             (2, 4, "", "S", 0, 0, 6),
+             (4, 5, "Y", "", 0, 0, 7), (4, 5, "Y", "", 1, 1, 8)]
+    graph = NetlistGraph.from_edges(ids, ids, types, edges)
+    per_node = graph.fanin("y")
+    assert sorted(per_node.ids()) == sorted(ids)
+    cone = graph.fanin("y", bit=1)
+    # Bit 1 of y only needs bit 1 of the AND inputs, plus the whole select
+    assert sorted(cone.connections()) == sorted([
+        ("a", "", 1, "and", "A", 1), ("b", "", 1, "and", "B", 1),
+        ("and", "Y", 1, "mux", "A", 1), ("s", "", 0, "mux", "S", 0),
+        ("mux", "Y", 1, "y", "", 1)])
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from vcd_util.parallel_parse import parse_parallel, shard_ranges
+from vcd_util.vcd_reader import VcdReader
+from vcd_util.wave_store import collect_changes
+
+
+def write_dump(path, steps=2000, seed=1):
+    rng = random.Random(seed)
+    lines = ["$timescale 1ns $end", "$scope module top $end", "$var wire 1 ! clk $end",
+             "$var wire 8 \" count $end", "$var wire 100 # wide $end", "$var real 64 $ level $end",
+             "$var wire 1 % rarely $end", "$upscope $end", "$enddefinitions $end",
+             "#0", "$dumpvars", "0!", "b0 \"", "bx #", "r0 $", "0%", "$end"]
+    for step in range(1, steps):
+        lines.append(f"#{step * 5}")
+        lines.append(f"{step % 2}!")
+        if step % 2:
+            lines.append(f"b{format(step // 2 % 256, 'b')} \"")
+        if rng.random() < 0.2:
+            lines.append("b" + "".join(rng.choice("01xz") for _ in range(100)) + " #")
+        if rng.random() < 0.1:
+            lines.append(f"r{rng.random():.6f} $")
+        if step == steps // 2:
+            lines.append("1%")
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.mark.parametrize("workers", [2, 3, 5])
+def test_parallel_matches_single_process(tmp_path, workers):
+    path = tmp_path / "dump.vcd"
+    write_dump(path)
+    assert len(shard_ranges(str(path), workers, min_size=1024)) == workers
+
+    with VcdReader(str(path)) as reader:
+        header = reader.header
+        times, values = collect_changes(header, reader.changes())
+    parallel_header, parallel_times, parallel_values = parse_parallel(str(path), workers, min_size=1024)
+
+    assert parallel_header.to_dict() == header.to_dict()
+    assert [bytes(t) for t in parallel_times] == [bytes(t) for t in times]
+    assert [bytes(v) for v in parallel_values] == [bytes(v) for v in values]
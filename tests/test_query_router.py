@@ -0,0 +1,76 @@
+import pytest
+
+from vcd_util.query_router import QueryRouter, match_signals
+from vcd_util.wave_index import WaveformIndex
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+DUMP = """$timescale 1ns $end
+$scope module hw_top $end
+$scope module cpu_core $end
+$var wire 1 ! clk $end
+$var wire 1 " rst_ni $end
+$var wire 32 # instr_rdata_i [31:0] $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+0"
+b0 #
+#1
+1!
+#2
+0!
+#3
+1!
+1"
+b101 #
+#4
+0!
+"""
+
+
+@pytest.fixture
+def router(tmp_path):
+    path = tmp_path / "dump.vcd"
+    path.write_text(DUMP)
+    return QueryRouter(WaveformIndex(WaveStore(convert_vcd(str(path), str(path) + ".wave"))))
+
+
+def test_match_signals_with_bit_range(router):
+    index = router.index
+    data = index.resolve("instr_rdata_i")
+    assert match_signals(index, "instr_rdata_i[31:0]") == [data]
+    assert match_signals(index, "cpu_core.instr_rdata_i[31:0]") == [data]
+    assert match_signals(index, "instr_rdata_i[7:0]") == []
+    assert match_signals(index, "instr_*") == [data]
+
+
+def test_value_at(router):
+    assert router.route("What is the value of instr_rdata_i at 3ns?") == "hw_top.cpu_core.instr_rdata_i = 0x5 at 3ns"
+    assert router.route("value of instr_rdata_i[31:0] at 2ns") == "hw_top.cpu_core.instr_rdata_i = 0x0 at 2ns"
+
+
+def test_value_at_rounded_time(router):
+    answer = router.route("What is the value of instr_rdata_i at 2.7ns?").splitlines()
+    assert answer == ["hw_top.cpu_core.instr_rdata_i = 0x5 at 3ns",
+                      "(2.7ns is not a multiple of the 1ns timescale, rounded to 3ns)"]
+    # 2000ps is exactly 2 ticks: no note
+    assert router.route("value of instr_rdata_i at 2000ps") == "hw_top.cpu_core.instr_rdata_i = 0x0 at 2ns"
+
+
+def test_edges(router):
+    assert router.route("When is rst_ni deasserted?") == "hw_top.cpu_core.rst_ni deasserted (rising edge) at 3ns"
+    assert router.route("When does clk fall after 2ns?") == "hw_top.cpu_core.clk fall (falling edge) at 4ns"
+    assert router.route("When does rst_ni fall?") == "hw_top.cpu_core.rst_ni has no falling edge"
+
+
+def test_toggles(router):
+    assert router.route("How many times does clk toggle?") == "hw_top.cpu_core.clk changes value 4 times"
+    assert router.route("How many times does clk toggle from 2ns to 3ns?") == (
+        "hw_top.cpu_core.clk changes value 2 times from 2ns to 3ns")
+
+
+def test_unrecognised_questions(router):
+    assert router.route("Why does the core stall?") is None
+    assert router.route("What is the value of no_such_signal at 3ns?") is None
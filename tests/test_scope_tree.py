@@ -0,0 +1,114 @@
+import json
+import os
+
+from vcd_util.scope_tree import HIERARCHY_FILE, ScopeTree
+from vcd_util.vcd_reader import parse_header_bytes
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+DUMP = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$scope module dut $end
+$var wire 8 " data [7:0] $end
+$scope module core0 $end
+$scope task fetch $end
+$var reg 32 # pc $end
+$upscope $end
+$var wire 1 ! clk $end
+$upscope $end
+$scope module core1 $end
+$var reg 32 $ pc $end
+$var real 64 % temp $end
+$upscope $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b0 "
+b0 #
+b0 $
+r0 %
+#1
+1!
+"""
+
+
+def build_tree():
+    return ScopeTree.from_header(parse_header_bytes(DUMP.encode()))
+
+
+def names(vars_):
+    return [var.name for var in vars_]
+
+
+def test_build():
+    tree = build_tree()
+    assert tree.num_scopes == 5
+    assert list(tree.root.children) == ["top"]
+    assert list(tree.scope("top.dut").children) == ["core0", "core1"]
+    assert tree.scope("top.dut.core0.fetch").kind == "task"
+    assert tree.scope("top.dut.core0").kind == "module"
+    assert tree.scope("top.missing") is None
+    data = tree.scope("top.dut").vars[0]
+    assert (data.width, data.bit_range) == (8, "[7:0]")
+    # clk in core0 is an alias of top.clk
+    clk = tree.scope("top").vars[0]
+    assert names(tree.aliases(clk.signal_id)) == ["top.clk", "top.dut.core0.clk"]
+
+
+def test_walk_and_children():
+    tree = build_tree()
+    assert [(scope.path, level) for scope, level in tree.walk()] == [
+        ("", 0), ("top", 1), ("top.dut", 2), ("top.dut.core0", 3),
+        ("top.dut.core0.fetch", 4), ("top.dut.core1", 3)]
+    dut = tree.scope("top.dut")
+    assert [(scope.path, level) for scope, level in tree.walk(dut, depth=1)] == [
+        ("top.dut", 0), ("top.dut.core0", 1), ("top.dut.core1", 1)]
+    assert tree.scope("top.dut.core0").children["fetch"] is tree.scope("top.dut.core0.fetch")
+
+
+def test_find_scopes():
+    tree = build_tree()
+
+    def paths(pattern, anywhere=False):
+        return [scope.path for scope in tree.find_scopes(pattern, anywhere)]
+
+    assert paths("top.dut") == ["top.dut"]
+    assert paths("top.dut.core*") == ["top.dut.core0", "top.dut.core1"]
+    assert paths("top.**.fetch") == ["top.dut.core0.fetch"]
+    assert paths("core1", anywhere=True) == ["top.dut.core1"]
+    assert paths("core1") == []
+    assert paths("") == [""]
+
+
+def test_signals():
+    tree = build_tree()
+    assert names(tree.signals("top.dut.*", min_width=32)) == [
+        "top.dut.core0.fetch.pc", "top.dut.core1.pc", "top.dut.core1.temp"]
+    assert names(tree.signals("top.dut.*", var_type="reg", depth=0)) == ["top.dut.core1.pc"]
+    assert names(tree.signals("top", max_width=1)) == ["top.clk", "top.dut.core0.clk"]
+    # Overlapping matches list each scope once
+    assert names(tree.signals("top.**.core0")) == ["top.dut.core0.clk", "top.dut.core0.fetch.pc"]
+
+
+def test_listing():
+    tree = build_tree()
+    assert tree.listing("top.dut.core1") == "top.dut.core1 (module)\n  pc [reg 32]\n  temp [real 64]"
+    assert tree.listing(depth=2, signals=False) == "top (module)\n  dut (module)\n    core0 (module)\n    core1 (module)"
+
+
+def test_persist_and_reload(tmp_path):
+    tree = build_tree()
+    reloaded = ScopeTree.from_dict(json.loads(json.dumps(tree.to_dict())))
+    assert reloaded.to_dict() == tree.to_dict()
+    assert reloaded.listing(depth=None) == tree.listing(depth=None)
+    assert [(var.name, var.scope, var.code, var.signal_id, var.bit_range) for var in reloaded.signals()] == \
+        [(var.name, var.scope, var.code, var.signal_id, var.bit_range) for var in tree.signals()]
+    assert names(reloaded.aliases(0)) == names(tree.aliases(0))
+
+    path = tmp_path / "dump.vcd"
+    path.write_text(DUMP)
+    store_path = convert_vcd(str(path), str(path) + ".wave")
+    assert os.path.exists(os.path.join(store_path, HIERARCHY_FILE))
+    assert WaveStore(store_path).scope_tree.to_dict() == tree.to_dict()
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from vcd_util.value_codec import (CODE_X, CODE_Z, REAL, SCALAR, WIDE, WORD, decode, decode_bits, encode_bits,
+                                  encode_wide, encode_word, encoding_for, pack_codes, text_at, unpack_codes,
+                                  wide_size, word_text)
+
+
+def test_encoding_for():
+    assert encoding_for("wire", 1) == SCALAR
+    assert encoding_for("reg", 64) == WORD
+    assert encoding_for("wire", 65) == WIDE
+    assert encoding_for("real", 64) == REAL
+
+
+@pytest.mark.parametrize("value, width, expected", [
+    ("101", 3, "101"),
+    ("101", 8, "00000101"),
+    ("x1", 4, "xxx1"),
+    ("z0", 4, "zzz0"),
+    ("1x0z", 4, "1x0z"),
+    ("0110", 2, "10"),
+    ("X1", 3, "xx1"),
+    ("u-1", 3, "xx1"),
+])
+def test_bits_round_trip(value, width, expected):
+    assert decode_bits(np.frombuffer(encode_bits(value, width), dtype=np.uint8)) == expected
+
+
+@pytest.mark.parametrize("width", [2, 7, 32, 64])
+def test_word_round_trip(width):
+    rng = np.random.default_rng(width)
+    for _ in range(50):
+        text = "".join(rng.choice(list("01xz"), size=width))
+        bits, mask = encode_word(text, width)
+        assert word_text(bits, mask, width) == text
+        column = np.array([[bits, mask]], dtype=np.uint64)
+        assert text_at(WORD, column, 0, width) == text
+        assert decode_bits(decode(WORD, column, width)[0]) == text
+
+
+def test_word_extension():
+    assert word_text(*encode_word("1", 4), 4) == "0001"
+    assert word_text(*encode_word("z1", 4), 4) == "zzz1"
+    assert word_text(*encode_word("x", 4), 4) == "xxxx"
+
+
+@pytest.mark.parametrize("width", [65, 100, 130])
+def test_wide_round_trip(width):
+    rng = np.random.default_rng(width)
+    texts = ["".join(rng.choice(list("01xz"), size=width)) for _ in range(10)]
+    column = np.frombuffer(b"".join(encode_wide(text, width) for text in texts), dtype=np.uint8)
+    column = column.reshape(len(texts), wide_size(width))
+    assert [text_at(WIDE, column, i, width) for i in range(len(texts))] == texts
+    assert [decode_bits(row) for row in decode(WIDE, column, width)] == texts
+
+
+def test_pack_codes_round_trip():
+    codes = np.array([0, 1, CODE_X, CODE_Z, 1, 0, 1], dtype=np.uint8)
+    packed = pack_codes(codes)
+    assert len(packed) == 2
+    np.testing.assert_array_equal(unpack_codes(packed)[:len(codes)], codes)
+    assert "".join(text_at(SCALAR, codes, i, 1) for i in range(len(codes))) == "01xz101"
+
+
+def test_real_text():
+    assert text_at(REAL, np.array([1.5, 3.0]), 1, 64) == "3.0"
@@ -0,0 +1,42 @@
+import sys
+
+import pytest
+
+from vcd_util.vcd_follow import VcdFollower, main
+
+HEADER = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$var wire 4 " b $end
+$upscope $end
+$enddefinitions $end
+"""
+
+
+def test_follow_across_polls(tmp_path):
+    path = tmp_path / "live.vcd"
+    path.write_text(HEADER + "#0\n$dumpvars\n0!\nb0 \"\n$end\n#5\n1!\n$comment\n1! b1111 \"\n")
+    follower = VcdFollower(str(path))
+    assert follower.poll() == {0, 1}
+    with open(path, "a") as f:
+        f.write("0! $end\n#10\nb11 \"\n#1")
+    assert follower.poll() == {1}
+    store = follower.store
+    assert list(store.times(0)) == [0, 5]
+    assert [store.value_text(1, i) for i in range(2)] == ["0000", "0011"]
+    assert store.current_time == 10
+    with open(path, "a") as f:
+        f.write("5\n0!\n")
+    follower.poll()
+    assert list(store.times(0)) == [0, 5, 15]
+
+
+def test_unknown_watched_signal(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "dump.vcd"
+    path.write_text("$timescale 1ns $end\n$scope module top $end\n$var wire 1 ! a $end\n$upscope $end\n"
+                    "$enddefinitions $end\n#0\n0!\n")
+    monkeypatch.setattr(sys, "argv", ["vcd_follow", str(path), "--watch", "missing", "--idle", "0"])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert "Unknown signal 'missing'" in capsys.readouterr().err
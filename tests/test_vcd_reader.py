@@ -0,0 +1,82 @@
+import gzip
+import lzma
+
+import pytest
+
+from vcd_util.vcd_reader import VcdReader, _token_blocks, compression, iter_changes, read_header
+
+DUMP = """$date today $end
+$timescale 1ps $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 16 " count [15:0] $end
+$var real 64 # level $end
+$upscope $end
+$enddefinitions $end
+$dumpvars
+0!
+b0 "
+r0 #
+$end
+""" + "".join(f"#{5 * t}\n{t % 2}!\nb{t:b} \"\nr{t / 4} #\n" for t in range(1, 2000))
+
+
+SMALL_DUMP = b"""$timescale 10ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 12 "# bus $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b101010101010 "#
+$comment spans several blocks $end
+#1234567
+1!
+bxxxxzzzz0000 "#
+#1234568
+0!"""
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_compressed_dumps_match_plain(tmp_path):
+    plain = write(tmp_path, "dump.vcd", DUMP.encode())
+    expected = list(iter_changes(plain))
+    assert compression(plain) is None
+    # Detected by magic bytes, whatever the extension
+    for kind, data in (("gzip", gzip.compress(DUMP.encode())), ("xz", lzma.compress(DUMP.encode()))):
+        path = write(tmp_path, f"{kind}.vcd", data)
+        assert compression(path) == kind
+        with VcdReader(path, block_size=1000) as reader:
+            assert reader.header.to_dict() == read_header(plain).to_dict()
+            assert list(reader.changes()) == expected
+
+
+def test_decoder_error_propagates(tmp_path):
+    data = gzip.compress(DUMP.encode())
+    path = write(tmp_path, "truncated.vcd.gz", data[:len(data) // 2])
+    with pytest.raises(EOFError):
+        list(iter_changes(path))
+
+
+def test_tokens_split_across_blocks(tmp_path):
+    expected = SMALL_DUMP.split()
+    for block_size in range(1, 40):
+        with open(write(tmp_path, "small.vcd", SMALL_DUMP), "rb") as f:
+            assert [token for block in _token_blocks(f, block_size) for token in block] == expected
+
+
+def test_small_blocks_parse_like_one_block(tmp_path):
+    path = write(tmp_path, "small.vcd", SMALL_DUMP)
+    header = read_header(path).to_dict()
+    expected = list(iter_changes(path))
+    assert expected[-1] == (1234568, 0, "0")
+    for block_size in range(1, 40):
+        with VcdReader(path, block_size) as reader:
+            assert reader.header.to_dict() == header
+            assert list(reader.changes()) == expected
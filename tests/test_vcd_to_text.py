@@ -0,0 +1,34 @@
+from vcd_util.vcd_to_text import vcd_to_text
+
+DUMP = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 4 # data $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+1?
+b1 #
+#5
+1!
+b10 @
+"""
+
+
+def convert(tmp_path, **options):
+    path, output = tmp_path / "dump.vcd", tmp_path / "dump.txt"
+    path.write_text(DUMP)
+    vcd_to_text(str(path), str(output), **options)
+    return output.read_text().split("== Value Changes ==\n")[1].split("\n")
+
+
+def test_unknown_signals_are_reported(tmp_path):
+    assert convert(tmp_path) == ["", "Time: 0", "top.clk: 0", "Unknown signal ?: 1", "top.data: 1", "",
+                                 "Time: 5", "top.clk: 1", "Unknown signal @: 10", ""]
+
+
+def test_filters_and_window(tmp_path):
+    assert convert(tmp_path, include=["top.clk"]) == ["", "Time: 0", "top.clk: 0", "", "Time: 5", "top.clk: 1", ""]
+    assert convert(tmp_path, start="3ns") == ["", "Time: 3", "top.clk: 0", "top.data: 1", "",
+                                              "Time: 5", "top.clk: 1", "Unknown signal @: 10", ""]
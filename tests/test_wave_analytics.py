@@ -0,0 +1,46 @@
+import numpy as np
+
+from vcd_util.value_codec import encode_bits
+from vcd_util.wave_analytics import signal_stats, summary_text
+
+
+def codes(*values):
+    return np.array([list(encode_bits(value, len(values[0]))) for value in values], dtype=np.uint8)
+
+
+def test_one_bit_signal():
+    # 0 until 10, 1 until 15, a zero-width 0 at 15, 1 (re-assigned at 20) until 30, 0 until 40
+    stats = signal_stats([0, 10, 15, 15, 20, 30], codes("0", "1", "0", "1", "1", "0"), 40)
+    assert stats["changes"] == 6
+    assert stats["toggles"] == 4
+    assert (stats["first_activity"], stats["last_activity"]) == (10, 30)
+    assert stats["high_time"] == 5 + 15
+    assert stats["duty_cycle"] == 0.5
+    assert (stats["glitches"], stats["first_glitch"]) == (1, 15)
+    assert stats["x_intervals"] == stats["z_intervals"] == []
+    assert summary_text(stats) == "4 toggles, active t=10..30, high 50.0% of the time, 1 glitch, first at t=15"
+
+
+def test_x_and_z_intervals():
+    stats = signal_stats([0, 5, 12], codes("xxxx", "01z1", "0101"), 20)
+    assert stats["toggles"] == 2
+    assert (stats["x_intervals"], stats["x_time"]) == ([[0, 5]], 5)
+    assert (stats["z_intervals"], stats["z_time"]) == ([[5, 12]], 7)
+    assert stats["duty_cycle"] is None
+    assert stats["glitches"] == 0
+    # The 01z1 value is held for 7 ticks
+    assert signal_stats([0, 5, 12], codes("xxxx", "01z1", "0101"), 20, glitch_width=8)["first_glitch"] == 5
+    # Consecutive values with x bits form one interval
+    merged = signal_stats([0, 3, 9], codes("x000", "xx00", "0000"), 10)
+    assert (merged["x_intervals"], merged["x_time"]) == ([[0, 9]], 9)
+    assert summary_text(stats) == "2 toggles, active t=5..12, x during t=0..5, z during t=5..12"
+
+
+def test_real_signal_and_edge_cases():
+    stats = signal_stats([0, 4, 4, 8], np.array([0.5, 1.0, 1.0, 2.0]), 10)
+    assert (stats["changes"], stats["toggles"]) == (4, 2)
+    assert stats["duty_cycle"] is None and stats["x_time"] == 0
+    assert summary_text(signal_stats([3], codes("1"), 10)) == "0 toggles, high 100.0% of the time"
+    assert summary_text(signal_stats([0, 7], codes("0", "1"), 10)) == (
+        "1 toggle, active t=7..7, high 30.0% of the time")
+    assert summary_text(signal_stats([], np.zeros((0, 1), dtype=np.uint8), 10)) == "never assigned"
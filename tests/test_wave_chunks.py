@@ -0,0 +1,86 @@
+import pytest
+
+from vcd_util.wave_chunks import iter_chunks, signal_chunks, time_filter
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+DUMP = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 32 " bus $end
+$var wire 8 # count $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+bx "
+b0 #
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    lines = [DUMP]
+    for t in range(1, 100):
+        lines.append(f"#{5 * t}\n{t % 2}!")
+        if t == 3:
+            lines.append('b1x0 "')
+        if t == 7:
+            lines.append('b101 "')
+        if t % 3 == 0:
+            lines.append(f"b{t:b} #")
+    path = tmp_path / "dump.vcd"
+    path.write_text("\n".join(lines) + "\n")
+    return WaveStore(convert_vcd(str(path), str(path) + ".wave"))
+
+
+def test_chunks_tile_the_time_axis(store):
+    for window in (None, 40):
+        signal_id = store.signal_id("top.count")
+        chunks = list(signal_chunks(store, signal_id, window, max_transitions=5, summary=False))
+        assert len(chunks) > 3
+        assert chunks[0][1]["t_start"] == 0
+        assert chunks[-1][1]["t_end"] == store.end_time == 495
+        for (_, before), (_, after) in zip(chunks, chunks[1:]):
+            assert before["t_end"] == after["t_start"]
+        for text, metadata in chunks:
+            change_times = [int(line[2:].split("..")[0]) for line in text.splitlines()[1:]]
+            assert change_times[0] == metadata["t_start"] and len(change_times) <= 5
+            if window:
+                assert len({t // window for t in change_times}) == 1
+
+
+def test_x_and_z_runs_are_collapsed(store):
+    (text, _), = signal_chunks(store, store.signal_id("top.bus"), summary=False)
+    assert text.splitlines()[1:] == ["t=0..15: x→1x0", "t=15..35: 1x0→0x5", "t=35..495: 0x5"]
+
+
+def test_periodic_runs_are_folded(store):
+    chunks = list(signal_chunks(store, store.signal_id("top.clk"), max_transitions=200, summary=False))
+    assert len(chunks) == 1
+    text, metadata = chunks[0]
+    assert text.splitlines()[1:] == ["t=0..495: 0↔1 every 5 (99 changes)", "t=495..495: 1"]
+    assert (metadata["t_start"], metadata["t_end"]) == (0, 495)
+
+
+def test_max_chars_splits_chunks(store):
+    signal_id = store.signal_id("top.count")
+    (whole, metadata), = signal_chunks(store, signal_id, max_transitions=100, summary=False)
+    parts = list(signal_chunks(store, signal_id, max_transitions=100, max_chars=120, summary=False))
+    assert len(parts) > 1
+    assert all(len(text) <= 120 for text, _ in parts)
+    title = whole.splitlines()[0]
+    assert all(text.splitlines()[0] == title for text, _ in parts)
+    assert sum((text.splitlines()[1:] for text, _ in parts), []) == whole.splitlines()[1:]
+    assert parts[0][1]["t_start"] == metadata["t_start"] and parts[-1][1]["t_end"] == metadata["t_end"]
+    for (_, before), (_, after) in zip(parts, parts[1:]):
+        assert before["t_end"] == after["t_start"]
+
+
+def test_iter_chunks_kinds(store):
+    kinds = [metadata.get("kind") for _, metadata in iter_chunks(store)]
+    assert kinds[0] == "scope"
+    assert kinds.count("summary") == 3
+
+
+def test_time_filter():
+    assert time_filter(10, 20) == {"$and": [{"t_start": {"$lte": 20}}, {"t_end": {"$gte": 10}}]}
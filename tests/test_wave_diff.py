@@ -0,0 +1,47 @@
+import numpy as np
+
+from vcd_util.wave_diff import WaveDiff, first_divergence
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+
+def codes(*values):
+    return np.array([[int(bit) for bit in value] for value in values], dtype=np.uint8)
+
+
+def test_first_divergence_window():
+    times_a, values_a = np.array([0, 10, 20]), codes("00", "01", "11")
+    times_b, values_b = np.array([0, 10, 25]), codes("00", "01", "11")
+    assert first_divergence(times_a, values_a, times_b, values_b) == 20
+    assert first_divergence(times_a, values_a, times_b, values_b, t0=22) == 22
+    assert first_divergence(times_a, values_a, times_b, values_b, t1=15) is None
+
+
+def write_store(path, width):
+    value = "1" * width
+    path.write_text(f"$timescale 1ns $end\n$scope module top $end\n$var wire {width} ! d $end\n"
+                    f"$var wire 1 \" e $end\n$upscope $end\n$enddefinitions $end\n"
+                    f"#0\nb{value} !\n0\"\n#10\n1\"\n#30\nb0 !\n")
+    return WaveStore(convert_vcd(str(path), str(path) + ".wave"))
+
+
+def test_width_mismatch_respects_the_window(tmp_path):
+    diff = WaveDiff(write_store(tmp_path / "a.vcd", 4), write_store(tmp_path / "b.vcd", 8))
+    assert diff.divergence("top.d") == 0
+    assert diff.divergence("top.d", t0=20) == 20
+    assert diff.divergence("top.d", t0=40, t1=50) == 40
+    assert diff.divergence("top.e", t0=20) is None
+    assert diff.run(t0=5) == [(5, "top.d")]
+
+
+def test_finer_candidate_timescale(tmp_path):
+    reference = write_store(tmp_path / "a.vcd", 4)
+    path = tmp_path / "b.vcd"
+    # Same waveform in ps, except d drops 1500ps early
+    path.write_text("$timescale 100ps $end\n$scope module top $end\n$var wire 4 ! d $end\n"
+                    "$var wire 1 \" e $end\n$upscope $end\n$enddefinitions $end\n"
+                    "#0\nb1111 !\n0\"\n#100\n1\"\n#285\nb0 !\n")
+    diff = WaveDiff(reference, WaveStore(convert_vcd(str(path), str(path) + ".wave")))
+    assert (diff.timescale, diff.scale_a, diff.scale_b) == ("100ps", 10, 1)
+    assert diff.run() == [(285, "top.d")]
+    assert diff.snapshot(["top.d", "top.e"], 285) == [("top.d", "1111", "0"), ("top.e", "1", "1")]
+    assert diff.divergence("top.d", t0=300) is None
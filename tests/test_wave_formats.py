@@ -0,0 +1,32 @@
+import math
+import struct
+
+from vcd_util.wave_formats import EvcdReader, detect_format, open_reader
+
+HEADER = "$timescale 1ns $end\n$scope module top $end\n{vars}$upscope $end\n$enddefinitions $end\n"
+
+
+def test_evcd_with_a_large_header(tmp_path):
+    path = tmp_path / "ports.evcd"
+    comment = "$comment " + "x" * 100000 + " $end\n"
+    path.write_text(comment + HEADER.format(vars="$var port 1 <0 p0 $end\n") + "#0\n$dumpports\npD 6 0 <0\n$end\n")
+    assert detect_format(str(path)) == "evcd"
+    with open_reader(str(path)) as reader:
+        assert isinstance(reader, EvcdReader)
+        assert list(reader.changes()) == [(0, 0, "0")]
+
+
+def test_vcd_with_a_large_header(tmp_path):
+    path = tmp_path / "wide.vcd"
+    vars = "".join(f"$var wire 1 <{i} s{i} $end\n" for i in range(5000))
+    path.write_text(HEADER.format(vars=vars) + "#0\n0<0\n")
+    assert detect_format(str(path)) == "vcd"
+
+
+def test_fst_is_detected_by_its_header_block(tmp_path):
+    text = tmp_path / "named.fst"
+    text.write_text(HEADER.format(vars="$var wire 1 ! a $end\n") + "#0\n0!\n")
+    assert detect_format(str(text)) == "vcd"
+    fst = tmp_path / "dump.bin"
+    fst.write_bytes(b"\x00" + (329).to_bytes(8, "big") + bytes(16) + struct.pack("<d", math.e) + bytes(300))
+    assert detect_format(str(fst)) == "fst"
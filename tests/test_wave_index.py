@@ -0,0 +1,90 @@
+import pytest
+
+from vcd_util.wave_index import WaveformIndex
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+DUMP = """$timescale 10ps $end
+$scope module top $end
+$scope module core $end
+$var wire 1 ! clk $end
+$var wire 4 " data $end
+$var real 64 # level $end
+$upscope $end
+$scope module io $end
+$var wire 1 $ clk $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+bx "
+r0.5 #
+1$
+#10
+1!
+b101 "
+#20
+0!
+#25
+b1z "
+r1.25 #
+#30
+1!
+#40
+0!
+0$
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "dump.vcd"
+    path.write_text(DUMP)
+    return WaveformIndex(WaveStore(convert_vcd(str(path), str(path) + ".wave")))
+
+
+def test_resolve(index):
+    assert index.resolve("top.core.data") == index.resolve("data") == index.resolve("core.data")
+    with pytest.raises(KeyError, match="Ambiguous"):
+        index.resolve("clk")
+    with pytest.raises(KeyError, match="Unknown"):
+        index.resolve("missing")
+
+
+def test_value_at(index):
+    assert index.value_at("data", 5) == "xxxx"
+    assert index.value_at("data", 10) == "0101"
+    assert index.value_at("data", 24) == "0101"
+    assert index.value_at("data", 25) == "001z"
+    assert index.value_at("level", 30) == 1.25
+    assert index.value_at("core.clk", "200ps") == "0"
+    assert index.value_at("core.clk", "300ps") == "1"
+    assert index.value_at_many(["data", "level", "io.clk"], [10, 0, 40]) == ["0101", 0.5, "0"]
+
+
+def test_values_in(index):
+    assert index.values_in("core.clk", 15, 30) == [(15, "1"), (20, "0"), (30, "1")]
+
+
+def test_edges_and_toggles(index):
+    assert index.first_edge("core.clk") == 10
+    assert index.first_edge("core.clk", after=10) == 30
+    assert index.first_edge("core.clk", edge="fall") == 20
+    assert index.first_edge("io.clk", edge="rise") is None
+    assert index.first_edge("data", edge="any") == 10
+    assert index.toggle_count("core.clk") == 4
+    assert index.toggle_count("core.clk", 15, 35) == 2
+    assert index.format_time(25) == "250ps"
+
+
+def test_wide_signal(tmp_path):
+    path = tmp_path / "wide.vcd"
+    path.write_text("$timescale 1ns $end\n$scope module top $end\n$var wire 70 ! bus $end\n"
+                    "$upscope $end\n$enddefinitions $end\n"
+                    "#0\nbx !\n#5\nb1 !\n#7\nb11 !\n#9\nb10 !\n")
+    index = WaveformIndex(WaveStore(convert_vcd(str(path), str(path) + ".wave")))
+    assert index.value_at("bus", 6) == "0" * 69 + "1"
+    assert index.value_at_many(["bus", "bus", "bus"], [9, 0, -1]) == ["0" * 68 + "10", "x" * 70, None]
+    assert index.first_edge("bus", edge="rise") == 5
+    assert index.first_edge("bus", edge="fall") == 9
+    assert index.toggle_count("bus") == 3
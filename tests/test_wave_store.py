@@ -0,0 +1,64 @@
+from vcd_util.vcd_reader import VcdReader
+from vcd_util.wave_store import WaveStore, convert_vcd
+
+DUMP = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 4 " data $end
+$var wire 70 # bus $end
+$var real 64 $ level $end
+$var wire 1 % idle $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+bx "
+b1 #
+r0.5 $
+#1
+1!
+#2
+0!
+b1z0 "
+#3
+1!
+bz #
+r1.25 $
+#4
+0!
+b0101 "
+"""
+
+
+def open_dump(tmp_path):
+    path = tmp_path / "dump.vcd"
+    path.write_text(DUMP)
+    return str(path), WaveStore(convert_vcd(str(path), str(path) + ".wave"))
+
+
+def full_width(store, signal_id, value):
+    """The store spells vectors at full width, where the dump left-extends them."""
+    if store.header.signal_type(signal_id) == "real":
+        return repr(float(value))
+    return value.rjust(store.header.signal_width(signal_id), value[0] if value[0] in "xz" else "0")
+
+
+def test_changes_in_time_order(tmp_path):
+    path, store = open_dump(tmp_path)
+    with VcdReader(path) as reader:
+        expected = sorted(((t, signal_id, full_width(store, signal_id, value))
+                           for t, signal_id, value in reader.changes()), key=lambda change: change[:2])
+    with store:
+        assert list(store.changes()) == expected
+        assert list(store.changes({1, 3})) == [change for change in expected if change[1] in (1, 3)]
+
+
+def test_packed_value_ranges(tmp_path):
+    _, store = open_dump(tmp_path)
+    with store:
+        for signal_id in range(store.header.num_signals):
+            count = store.signals[signal_id]["count"]
+            texts = [store.value_text(signal_id, i) for i in range(count)]
+            for start, stop in [(0, None), (1, 3), (3, 3), (2, count + 5), (-2, None)]:
+                assert store.value_texts(signal_id, start, stop) == texts[start:stop]
+                assert len(store.packed_values(signal_id, start, stop)) == len(texts[start:stop])
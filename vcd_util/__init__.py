@@ -0,0 +1 @@
+"""VCD parsing and waveform utilities shared by parseVcd.py and vcd_to_text.py."""
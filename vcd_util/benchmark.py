@@ -0,0 +1,144 @@
+"""
+Throughput benchmark for the VCD readers.
+
+Usage:
+    python -m vcd_util.benchmark [dump.vcd] [--workers 1 4 16]
+
+Without a dump a synthetic one is generated in a temporary directory. The
+parallel parser is timed once per worker count; its speed-up is bounded by
+the number of cores of the machine.
+"""
+
+import argparse
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from vcd_util.parallel_parse import parse_parallel
+from vcd_util.vcd_reader import VcdReader, iter_changes
+from vcd_util.wave_store import collect_changes
+
+
+def _identifier(index):
+    chars = []
+    while True:
+        index, rem = divmod(index, 94)
+        chars.append(chr(33 + rem))
+        if index == 0:
+            return "".join(chars)
+        index -= 1
+
+
+def write_synthetic_vcd(path, num_signals=2000, num_steps=20000, changes_per_step=50, seed=0):
+    """
+    Writes a VCD with a two level hierarchy of 1 and 32 bit signals.
+
+    Args:
+        path (str): Output path.
+        num_signals (int): Number of declared signals.
+        num_steps (int): Number of timestamps.
+        changes_per_step (int): Value changes emitted per timestamp.
+        seed (int): Random seed, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    widths = [1 if i % 4 else 32 for i in range(num_signals)]
+    codes = [_identifier(i) for i in range(num_signals)]
+    with open(path, "w") as f:
+        f.write("$timescale 1ns $end\n$scope module hw_top $end\n$scope module dut $end\n")
+        for i, (width, code) in enumerate(zip(widths, codes)):
+            f.write(f"$var wire {width} {code} sig_{i} $end\n")
+        f.write("$upscope $end\n$upscope $end\n$enddefinitions $end\n#0\n$dumpvars\n")
+        for width, code in zip(widths, codes):
+            f.write(f"0{code}\n" if width == 1 else f"b0 {code}\n")
+        f.write("$end\n")
+        for step in range(1, num_steps):
+            lines = [f"#{step * 10}\n"]
+            for i in rng.sample(range(num_signals), changes_per_step):
+                if widths[i] == 1:
+                    lines.append(f"{rng.randint(0, 1)}{codes[i]}\n")
+                else:
+                    lines.append(f"b{rng.getrandbits(32):b} {codes[i]}\n")
+            f.write("".join(lines))
+
+
+def _measure(label, path, func, size=None):
+    size_mb = (size or os.path.getsize(path)) / (1 << 20)
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.2f} s  {size_mb / elapsed:8.1f} MB/s  ({count} changes)")
+    return elapsed
+
+
+def bench_streaming(path):
+    return _measure("streaming reader", path, lambda: sum(1 for _ in iter_changes(path)))
+
+
+def bench_compressed(path):
+    """Times the streaming reader on a gzip copy of the dump, in uncompressed MB/s."""
+    with tempfile.TemporaryDirectory() as tmp:
+        gz_path = os.path.join(tmp, os.path.basename(path) + ".gz")
+        with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1 << 22)
+        return _measure("streaming reader, gzip", gz_path, lambda: sum(1 for _ in iter_changes(gz_path)),
+                        size=os.path.getsize(path))
+
+
+def bench_collect(path):
+    def run():
+        with VcdReader(path) as reader:
+            times, _ = collect_changes(reader.header, reader.changes())
+        return sum(len(t) for t in times)
+
+    return _measure("columns, 1 process", path, run)
+
+
+def bench_parallel(path, workers):
+    def run():
+        _, times, _ = parse_parallel(path, workers)
+        return sum(len(t) for t in times)
+
+    return _measure(f"columns, {workers} workers", path, run)
+
+
+def bench_vcdvcd(path):
+    try:
+        from vcdvcd import VCDVCD
+    except ImportError:
+        print("vcdvcd not installed, skipping VCDVCD baseline")
+        return None
+
+    def run():
+        vcd = VCDVCD(path)
+        return sum(len(vcd[name].tv) for name in vcd.signals)
+
+    return _measure("VCDVCD", path, run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VCD reader throughput benchmark.")
+    parser.add_argument("vcd", nargs="?", help="Dump to read, a synthetic one is generated otherwise")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16],
+                        help="Worker counts for the parallel parser")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.vcd
+        if path is None:
+            path = os.path.join(tmp, "synthetic.vcd")
+            print(f"Generating synthetic dump {path}...")
+            write_synthetic_vcd(path)
+        print(f"Input: {path} ({os.path.getsize(path) / (1 << 20):.1f} MB, {os.cpu_count()} CPUs)")
+        bench_streaming(path)
+        bench_compressed(path)
+        bench_vcdvcd(path)
+        baseline = bench_collect(path)
+        for workers in args.workers:
+            elapsed = bench_parallel(path, workers)
+            print(f"{'':<24} speed-up {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
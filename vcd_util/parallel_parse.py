@@ -0,0 +1,154 @@
+"""
+Multi-process VCD parsing by byte-range sharding.
+
+The header is parsed once in the calling process. The value change section
+is then cut into roughly equal byte ranges, each starting on a '#<time>'
+line, and every range is parsed by a worker process into per-signal
+columns (see wave_store.collect_changes). Ranges are disjoint and ordered in
+time, so concatenating a signal's columns in range order yields its full
+history in time order.
+
+Compressed dumps and other formats (EVCD, FST) cannot be split by byte
+offset and are parsed in the calling process.
+
+A line starting with '#' inside a $comment of the value change section
+would be taken for a shard boundary; simulators do not emit those.
+
+Usage:
+    python -m vcd_util.wave_store dump.vcd -j 16
+"""
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from vcd_util.value_codec import encoding_for, new_column
+from vcd_util.vcd_reader import (BLOCK_SIZE, VcdHeader, VcdReader, _token_blocks, compression, header_end,
+                                 value_changes)
+from vcd_util.wave_formats import open_reader
+from vcd_util.wave_store import collect_changes, collect_sparse
+
+# Ranges smaller than this are not worth a process of their own.
+MIN_SHARD_SIZE = 1 << 20
+
+_worker_header = None
+
+
+def find_body_offset(path, block_size=BLOCK_SIZE):
+    """Returns the byte offset just past `$enddefinitions $end`."""
+    with open(path, "rb") as f:
+        data = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                raise ValueError(f"No $enddefinitions in {path}")
+            data += block
+            end = header_end(data)
+            if end is not None:
+                return end
+
+
+def _next_timestamp(f, offset, stop, block_size):
+    """Offset of the first '#' that starts a line at or after `offset`, or `stop`."""
+    f.seek(offset - 1)
+    position = offset - 1
+    carry = b""
+    while position < stop:
+        block = carry + f.read(block_size)
+        if len(block) == len(carry):
+            break
+        found = block.find(b"\n#")
+        if found >= 0:
+            return min(position - len(carry) + found + 1, stop)
+        position += len(block) - len(carry)
+        carry = block[-1:]
+    return stop
+
+
+def shard_ranges(path, workers, min_size=MIN_SHARD_SIZE, block_size=BLOCK_SIZE):
+    """
+    Splits the value change section of a VCD into at most `workers` byte ranges.
+
+    Returns:
+        List of (start, stop) offsets; every range but the first starts on a
+        '#<time>' line.
+    """
+    body = find_body_offset(path, block_size)
+    size = os.path.getsize(path)
+    count = max(1, min(workers, (size - body) // min_size))
+    bounds = [body]
+    with open(path, "rb") as f:
+        for i in range(1, count):
+            target = body + (size - body) * i // count
+            if target <= bounds[-1]:
+                continue
+            boundary = _next_timestamp(f, target, size, block_size)
+            if boundary > bounds[-1] and boundary < size:
+                bounds.append(boundary)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class _RangeFile:
+    """File-like view limited to [start, stop), for _token_blocks."""
+
+    def __init__(self, f, start, stop):
+        self._file = f
+        self._remaining = stop - start
+        f.seek(start)
+
+    def read(self, size):
+        data = self._file.read(min(size, self._remaining))
+        self._remaining -= len(data)
+        return data
+
+
+def _init_worker(header_dict):
+    global _worker_header
+    _worker_header = VcdHeader.from_dict(header_dict)
+
+
+def _parse_range(path, start, stop, block_size=BLOCK_SIZE):
+    """Parses one byte range into {signal_id: (times bytes, values bytes)}."""
+    header = _worker_header
+    with open(path, "rb") as f:
+        tokens = chain.from_iterable(_token_blocks(_RangeFile(f, start, stop), block_size))
+        columns = collect_sparse(header, value_changes(tokens, header.codes))
+    return {signal_id: (times.tobytes(), bytes(values)) for signal_id, (times, values) in columns.items()}
+
+
+def parse_parallel(path, workers=None, min_size=MIN_SHARD_SIZE):
+    """
+    Parses a VCD with a pool of worker processes.
+
+    Args:
+        path (str): Input VCD.
+        workers (int): Worker processes, defaults to the CPU count.
+        min_size (int): Smallest byte range handed to one worker.
+
+    Returns:
+        (header, times, values) as produced by wave_store.collect_changes.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open_reader(path) as reader:
+        header = reader.header
+        # Only uncompressed VCD text can be cut at byte offsets
+        if compression(path) is not None or type(reader) is not VcdReader:
+            times, values = collect_changes(header, reader.changes())
+            return header, times, values
+    ranges = shard_ranges(path, workers, min_size)
+    times = [array("q") for _ in range(header.num_signals)]
+    values = [new_column(encoding_for(header.signal_type(i), header.signal_width(i)))
+              for i in range(header.num_signals)]
+    with ProcessPoolExecutor(len(ranges), initializer=_init_worker, initargs=(header.to_dict(),)) as pool:
+        futures = [pool.submit(_parse_range, path, start, stop) for start, stop in ranges]
+        # Collect in range order, which is time order
+        for future in futures:
+            for signal_id, (signal_times, signal_values) in future.result().items():
+                times[signal_id].frombytes(signal_times)
+                if isinstance(values[signal_id], array):
+                    values[signal_id].frombytes(signal_values)
+                else:
+                    values[signal_id] += signal_values
+    return header, times, values
@@ -0,0 +1,252 @@
+"""
+Routes deterministic waveform questions away from the RAG chain.
+
+Questions such as "at time 4250ns what is the value of instr_rdata_i",
+"when is rst_ni deasserted" or "how many times does clk toggle" have exact
+answers in the waveform itself. QueryRouter recognises those shapes, resolves
+the signal names they mention and answers from a WaveformIndex. Anything it
+does not recognise returns None so the caller can fall back to retrieval +
+LLM.
+
+Signal names may be written as a full dotted path, a dotted suffix, a glob
+(hw_top.dut.*.cpu_core.instr*) or a regex wrapped in slashes (/instr_.*_i$/).
+
+Hierarchy questions ("list the signals under hw_top.dut.*.cpu_core with
+width > 1", "which submodules does dut have") are answered from the
+store's scope tree.
+"""
+
+import fnmatch
+import re
+from decimal import Decimal
+
+from vcd_util.vcd_reader import UNIT_EXPONENTS, parse_timescale
+from vcd_util.wave_store import format_value
+
+# Upper bound on the signals listed in one answer for wildcard questions.
+MAX_SIGNALS = 20
+
+_TIME_RE = re.compile(r"\b(\d+(?:\.\d+)?)\s*([munpf]?s)\b")
+_TOKEN_RE = re.compile(r"/[^/\s]+/|[A-Za-z_$][\w$.*?\[\]:]*")
+_ACTIVE_LOW_RE = re.compile(r"(_n|_ni|_no|_b|_l)$")
+_BIT_RANGE_RE = re.compile(r"\[\d+(?::\d+)?\]$")
+
+_TOGGLE_RE = re.compile(r"\bhow many\b.*\b(times|toggles?|transitions|changes|edges)\b"
+                        r"|\b(toggle|transition)\s+count\b|\bnumber of (toggles|transitions|changes)\b")
+_EDGE_RE = re.compile(r"\b(de-?asserted|de-?asserts?|released|asserted|asserts?|rises?|rising|falls?|falling"
+                      r"|goes? (high|low)|posedge|negedge)\b")
+_WHEN_RE = re.compile(r"\b(when|what time|which time)\b")
+_VALUE_RE = re.compile(r"\bvalues?\b")
+_EDGE_NAMES = {"rise": "rising", "fall": "falling"}
+_LIST_RE = re.compile(r"\b(list|show|which|what)\b.*\b(signals|scopes|submodules|modules|instances|hierarchy)\b")
+_SCOPES_RE = re.compile(r"\b(scopes|submodules|modules|instances|hierarchy)\b")
+_WIDTH_RE = re.compile(r"\bwidth\s*(>=|<=|==|>|<|=)\s*(\d+)|\b(wider|narrower) than (\d+)|\b(multi-bit)\b")
+
+# Words that look like identifiers but never name a signal in a question.
+_STOPWORDS = {
+    "a", "an", "and", "at", "does", "edge", "exact", "first", "for", "go", "goes", "high", "how",
+    "in", "is", "it", "low", "many", "me", "number", "of", "on", "please", "signal",
+    "tell", "the", "time", "times", "to", "toggle", "toggles", "value", "values", "what",
+    "when", "which", "with",
+}
+
+
+def name_tokens(question):
+    """
+    Splits the identifier-like words of a question into likely signal names.
+
+    Returns:
+        (precise, plain): tokens containing underscores, hierarchy, wildcards
+        or /regex/ delimiters, and ordinary words that are not stopwords.
+    """
+    precise, plain = [], []
+    for token in _TOKEN_RE.findall(question):
+        token = token.rstrip(".?:")
+        if not token or token.lower() in _STOPWORDS:
+            continue
+        if any(c in token for c in "_.*?[/"):
+            precise.append(token)
+        else:
+            plain.append(token)
+    return precise, plain
+
+
+def width_bounds(text):
+    """
+    Parses a width condition such as "width > 1", "wider than 8" or
+    "multi-bit" into inclusive (min_width, max_width) bounds.
+    """
+    m = _WIDTH_RE.search(text)
+    if m is None:
+        return None, None
+    if m.group(5):
+        return 2, None
+    if m.group(3):
+        n = int(m.group(4))
+        return (n + 1, None) if m.group(3) == "wider" else (None, n - 1)
+    op, n = m.group(1), int(m.group(2))
+    return {">": (n + 1, None), ">=": (n, None), "<": (None, n - 1), "<=": (None, n)}.get(op, (n, n))
+
+
+def match_signals(index, pattern):
+    """
+    Resolves a name pattern to signal ids.
+
+    Args:
+        index (WaveformIndex): Index whose hierarchy is searched.
+        pattern (str): Dotted name, dotted suffix, glob or /regex/. A
+            trailing bit range ("instr_rdata_i[31:0]") must match the
+            declared range of the signal.
+
+    Returns:
+        Sorted list of matching signal ids (aliases collapsed).
+    """
+    names = [(var.name, var.signal_id) for var in index.header.vars]
+    bit_range = _BIT_RANGE_RE.search(pattern)
+    if bit_range and not pattern.startswith("/"):
+        pattern, bit_range = pattern[:bit_range.start()], bit_range.group(0)
+        names = [(var.name, var.signal_id) for var in index.header.vars if var.bit_range == bit_range]
+    if len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/"):
+        regex = re.compile(pattern[1:-1])
+        return sorted({signal_id for name, signal_id in names if regex.search(name)})
+    if any(c in pattern for c in "*?["):
+        globs = [pattern, "*." + pattern]
+        return sorted({signal_id for name, signal_id in names
+                       if any(fnmatch.fnmatchcase(name, g) for g in globs)})
+    return sorted({signal_id for name, signal_id in names
+                   if name == pattern or name.endswith("." + pattern)})
+
+
+class QueryRouter:
+    """Answers exact waveform questions directly from a WaveformIndex."""
+
+    def __init__(self, index):
+        self.index = index
+
+    def route(self, question):
+        """
+        Returns a textual answer for a deterministic question, or None when the
+        question should go to the retrieval chain.
+        """
+        text = question.lower()
+        # Questions about values or activity over time go to the index below
+        if _LIST_RE.search(text) and not _TIME_RE.search(question) and not _TOGGLE_RE.search(text):
+            answer = self._answer_hierarchy(question, text)
+            if answer is not None:
+                return answer
+        signal_ids = self._signals(question)
+        if not signal_ids:
+            return None
+        times, notes = self._times(question)
+
+        edge = _EDGE_RE.search(text)
+        if _TOGGLE_RE.search(text):
+            answer = self._answer_toggles(signal_ids, times)
+        elif edge and _WHEN_RE.search(text):
+            answer = self._answer_edge(signal_ids, edge.group(0), times)
+        elif _VALUE_RE.search(text) and times:
+            answer = self._answer_value(signal_ids, times[0])
+        else:
+            return None
+        return "\n".join([answer] + notes)
+
+    def _times(self, question):
+        """
+        Converts the times mentioned in a question to ticks.
+
+        Returns:
+            (ticks, notes): the times, and a note for each one that falls
+            between two ticks of the dump and was rounded to the nearest.
+        """
+        magnitude, tick_unit = parse_timescale(self.index.header.timescale or "1s")
+        times, notes = [], []
+        for number, unit in _TIME_RE.findall(question):
+            t = self.index.ticks(f"{number}{unit}")
+            exact = Decimal(number).scaleb(UNIT_EXPONENTS[unit] - UNIT_EXPONENTS[tick_unit]) / magnitude
+            if exact != t:
+                notes.append(f"({number}{unit} is not a multiple of the {magnitude}{tick_unit} timescale, "
+                             f"rounded to {self.index.format_time(t)})")
+            times.append(t)
+        return times, notes
+
+    def _signals(self, question):
+        precise, plain = name_tokens(question)
+        # Names with underscores, hierarchy or wildcards are far less likely to
+        # be ordinary words, so prefer them when any resolves.
+        for candidates in (precise, plain):
+            found = []
+            for token in candidates:
+                for signal_id in match_signals(self.index, token):
+                    if signal_id not in found:
+                        found.append(signal_id)
+            if found:
+                return found[:MAX_SIGNALS]
+        return []
+
+    def _name(self, signal_id):
+        return self.index.header.signal_name(signal_id)
+
+    def _answer_value(self, signal_ids, t):
+        values = self.index.value_at_many(signal_ids, [t] * len(signal_ids))
+        lines = []
+        for signal_id, value in zip(signal_ids, values):
+            shown = "no value yet" if value is None else format_value(str(value))
+            lines.append(f"{self._name(signal_id)} = {shown} at {self.index.format_time(t)}")
+        return "\n".join(lines)
+
+    def _answer_edge(self, signal_ids, event, times):
+        event = event.replace("-", "")
+        after = times[0] if times else None
+        lines = []
+        for signal_id in signal_ids:
+            name = self._name(signal_id)
+            if event.startswith(("rise", "rising", "posedge")) or event.endswith("high"):
+                edge = "rise"
+            elif event.startswith(("fall", "negedge")) or event.endswith("low"):
+                edge = "fall"
+            else:
+                # assert/deassert depend on the polarity of the signal
+                active_low = bool(_ACTIVE_LOW_RE.search(name.split("[")[0]))
+                deassert = event.startswith("deassert") or event == "released"
+                edge = "rise" if active_low == deassert else "fall"
+            t = self.index.first_edge(signal_id, after=after, edge=edge)
+            if t is None:
+                suffix = f" after {self.index.format_time(after)}" if after is not None else ""
+                lines.append(f"{name} has no {_EDGE_NAMES[edge]} edge{suffix}")
+            else:
+                lines.append(f"{name} {event} ({_EDGE_NAMES[edge]} edge) at {self.index.format_time(t)}")
+        return "\n".join(lines)
+
+    def _answer_hierarchy(self, question, text):
+        tree = self.index.store.scope_tree
+        precise, plain = name_tokens(question)
+        for token in precise + plain:
+            anywhere = not tree.find_scopes(token)
+            scopes = tree.find_scopes(token, anywhere)
+            if not scopes:
+                continue
+            if _SCOPES_RE.search(text) and "signals" not in text:
+                return tree.listing(token, depth=1, signals=False, anywhere=anywhere)
+            min_width, max_width = width_bounds(text)
+            found = tree.signals(token, min_width, max_width, anywhere=anywhere)
+            if not found:
+                return f"No matching signals under {', '.join(scope.path for scope in scopes)}"
+            lines = [f"{var.name}{var.bit_range} ({var.width} bit{'s' if var.width != 1 else ''})"
+                     for var in found[:MAX_SIGNALS]]
+            if len(found) > MAX_SIGNALS:
+                lines.append(f"... and {len(found) - MAX_SIGNALS} more")
+            return "\n".join(lines)
+        return None
+
+    def _answer_toggles(self, signal_ids, times):
+        t0, t1 = (times + [None, None])[:2]
+        window = ""
+        if t0 is not None:
+            window = f" from {self.index.format_time(t0)}"
+            if t1 is not None:
+                window += f" to {self.index.format_time(t1)}"
+        lines = []
+        for signal_id in signal_ids:
+            count = self.index.toggle_count(signal_id, t0, t1)
+            lines.append(f"{self._name(signal_id)} changes value {count} times{window}")
+        return "\n".join(lines)
@@ -0,0 +1,249 @@
+"""
+Scope tree of a dump's hierarchy.
+
+ScopeTree keeps what the VCD header declares as a tree: every scope with its
+type (module, task, ...), child scopes and the signals declared directly in
+it, as VcdVar entries carrying width, type and identifier code. Signals
+sharing an identifier code are aliases of one signal id.
+
+Scope patterns are dotted paths matched one level per segment, so
+"hw_top.dut.*.cpu_core" matches a cpu_core two levels below hw_top.dut; a
+segment may be a glob and "**" spans any number of levels.
+
+The tree is written next to the waveform store columns (hierarchy.json) and
+available as WaveStore.scope_tree, so tools can list the hierarchy without
+touching the dump.
+
+Usage:
+    python -m vcd_util.scope_tree dump.vcd [hw_top.dut] [--depth 2]
+    python -m vcd_util.scope_tree dump.vcd 'hw_top.dut.*.cpu_core' --signals --min-width 2
+"""
+
+import argparse
+import fnmatch
+
+from vcd_util.vcd_reader import VcdVar
+
+HIERARCHY_FILE = "hierarchy.json"
+
+
+class Scope:
+    """One scope: its type, child scopes by name and the vars declared in it."""
+
+    __slots__ = ("name", "path", "kind", "children", "vars")
+
+    def __init__(self, name, path, kind=""):
+        self.name = name
+        self.path = path
+        self.kind = kind
+        self.children = {}
+        self.vars = []
+
+    def __repr__(self):
+        return f"Scope({self.path!r}, {len(self.children)} scopes, {len(self.vars)} vars)"
+
+
+def _is_glob(part):
+    return any(c in part for c in "*?[")
+
+
+class ScopeTree:
+    """Hierarchy of a dump, see the module docstring."""
+
+    def __init__(self):
+        self.root = Scope("", "")
+        self._scopes = {"": self.root}
+        self._aliases = {}
+
+    @classmethod
+    def from_header(cls, header):
+        tree = cls()
+        for path, kind in header.scopes:
+            tree._add_scope(path, kind)
+        for var in header.vars:
+            tree._add_var(var)
+        return tree
+
+    def _add_scope(self, path, kind=""):
+        scope = self._scopes.get(path)
+        if scope is None:
+            parent_path, _, name = path.rpartition(".")
+            parent = self._add_scope(parent_path)
+            scope = parent.children[name] = self._scopes[path] = Scope(name, path, kind)
+        elif kind and not scope.kind:
+            scope.kind = kind
+        return scope
+
+    def _add_var(self, var):
+        self._add_scope(var.scope).vars.append(var)
+        self._aliases.setdefault(var.signal_id, []).append(var)
+
+    def scope(self, path):
+        """Returns the Scope with this dotted path, or None."""
+        return self._scopes.get(path)
+
+    @property
+    def num_scopes(self):
+        return len(self._scopes) - 1
+
+    def aliases(self, signal_id):
+        """All VcdVars bound to a signal id, in declaration order."""
+        return list(self._aliases.get(signal_id, ()))
+
+    def find_scopes(self, pattern, anywhere=False):
+        """
+        Resolves a scope pattern to scopes.
+
+        Args:
+            pattern (str): Dotted path whose segments may be globs or "**".
+            anywhere (bool): Let the pattern start at any depth, as if it
+                began with "**.".
+
+        Returns:
+            List of matching Scopes, in tree order.
+        """
+        parts = pattern.split(".") if pattern else []
+        if anywhere:
+            parts = ["**"] + parts
+        nodes = [self.root]
+        for part in parts:
+            if part == "**":
+                nodes = [scope for node in nodes for scope, _ in self.walk(node)]
+            elif _is_glob(part):
+                nodes = [child for node in nodes for name, child in node.children.items()
+                         if fnmatch.fnmatchcase(name, part)]
+            else:
+                nodes = [node.children[part] for node in nodes if part in node.children]
+        unique = {}
+        for node in nodes:
+            unique.setdefault(node.path, node)
+        return list(unique.values())
+
+    def walk(self, scope=None, depth=None):
+        """
+        Yields (scope, level) depth first, starting with `scope` itself at level 0.
+
+        Args:
+            scope (Scope): Subtree to walk, the whole tree by default.
+            depth (int): Do not descend more than this many levels.
+        """
+        stack = [(scope or self.root, 0)]
+        while stack:
+            node, level = stack.pop()
+            yield node, level
+            if depth is None or level < depth:
+                stack.extend((child, level + 1) for child in reversed(list(node.children.values())))
+
+    def signals(self, pattern=None, min_width=None, max_width=None, var_type=None, depth=None, anywhere=False):
+        """
+        Returns the vars declared in or below the scopes matching a pattern.
+
+        Args:
+            pattern (str): Scope pattern (see find_scopes), the whole tree
+                when None.
+            min_width, max_width (int): Inclusive width bounds.
+            var_type (str): Only vars of this type, e.g. "reg" or "real".
+            depth (int): Levels below each matched scope to include, 0 for
+                only the vars declared directly in it; unlimited when None.
+            anywhere (bool): See find_scopes.
+
+        Returns:
+            List of VcdVar, aliases included, in tree order.
+        """
+        scopes = [self.root] if pattern is None else self.find_scopes(pattern, anywhere)
+        found = []
+        seen = set()
+        for scope in scopes:
+            for node, _ in self.walk(scope, depth):
+                if node.path in seen:
+                    continue
+                seen.add(node.path)
+                for var in node.vars:
+                    if min_width is not None and var.width < min_width:
+                        continue
+                    if max_width is not None and var.width > max_width:
+                        continue
+                    if var_type is not None and var.var_type != var_type:
+                        continue
+                    found.append(var)
+        return found
+
+    def listing(self, pattern=None, depth=1, signals=True, anywhere=False):
+        """
+        Renders the scopes matching a pattern as an indented outline.
+
+        Args:
+            depth (int): Levels shown below each matched scope; None shows
+                everything.
+            signals (bool): Also list the vars declared in each shown scope.
+
+        Returns:
+            Text, one scope or var per line.
+        """
+        scopes = list(self.root.children.values()) if pattern is None else self.find_scopes(pattern, anywhere)
+        lines = []
+        for scope in scopes:
+            for node, level in self.walk(scope, depth):
+                indent = "  " * level
+                kind = f" ({node.kind})" if node.kind else ""
+                lines.append(f"{indent}{node.path if level == 0 else node.name}{kind}")
+                if signals:
+                    for var in node.vars:
+                        lines.append(f"{indent}  {var.name.rpartition('.')[2]}{var.bit_range} "
+                                     f"[{var.var_type} {var.width}]")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        def scope_dict(scope):
+            return {
+                "name": scope.name,
+                "kind": scope.kind,
+                "vars": [[var.name.rpartition(".")[2], var.var_type, var.width, var.code, var.signal_id,
+                          var.bit_range] for var in scope.vars],
+                "scopes": [scope_dict(child) for child in scope.children.values()],
+            }
+        return scope_dict(self.root)
+
+    @classmethod
+    def from_dict(cls, data):
+        tree = cls()
+        stack = [(data, "")]
+        while stack:
+            node, path = stack.pop()
+            scope = tree._add_scope(path, node["kind"])
+            for reference, var_type, width, code, signal_id, bit_range in node["vars"]:
+                name = f"{path}.{reference}" if path else reference
+                tree._add_var(VcdVar(name, scope.path, var_type, width, code, signal_id, bit_range))
+            for child in reversed(node["scopes"]):
+                stack.append((child, f"{path}.{child['name']}" if path else child["name"]))
+        return tree
+
+
+def main():
+    from vcd_util.wave_store import open_store
+
+    parser = argparse.ArgumentParser(description="List the scope hierarchy of a dump.")
+    parser.add_argument("input", help="Dump or waveform store")
+    parser.add_argument("scope", nargs="?", help="Scope pattern, e.g. hw_top.dut or 'hw_top.*.cpu_core'")
+    parser.add_argument("--depth", type=int,
+                        help="Levels below the scope, -1 for all; default 1 for the outline, all for --signals")
+    parser.add_argument("--signals", action="store_true", help="List matching signals instead of the outline")
+    parser.add_argument("--min-width", type=int, help="Only signals at least this wide")
+    parser.add_argument("--max-width", type=int, help="Only signals at most this wide")
+    parser.add_argument("--type", dest="var_type", help="Only signals of this type, e.g. reg")
+    args = parser.parse_args()
+
+    with open_store(args.input) as store:
+        tree = store.scope_tree
+        depth = None if args.depth is not None and args.depth < 0 else args.depth
+        # Fall back to matching below the top, like the other tools' scope patterns
+        anywhere = bool(args.scope) and not tree.find_scopes(args.scope)
+        if args.signals or args.min_width is not None or args.max_width is not None or args.var_type:
+            for var in tree.signals(args.scope, args.min_width, args.max_width, args.var_type, depth, anywhere):
+                print(f"{var.name}{var.bit_range} [{var.var_type} {var.width}]")
+        else:
+            print(tree.listing(args.scope, 1 if args.depth is None else depth, anywhere=anywhere))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Signal selection by scope prefix, glob or regex.
+
+Patterns are matched against full dotted signal names:
+
+    hw_top.dut.cpu_core     scope prefix, the name itself or anything below it
+    *rst_n*, cpu_core.*     glob, also tried below any scope ("*." + pattern)
+    /instr_(addr|req)_o$/   regex, searched anywhere in the name
+
+A name is selected when it matches any include pattern (or there are none)
+and no exclude pattern.
+"""
+
+import fnmatch
+import re
+
+
+def compile_pattern(pattern):
+    """Returns a predicate name -> bool for one pattern."""
+    if len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/"):
+        return re.compile(pattern[1:-1]).search
+    if any(c in pattern for c in "*?["):
+        globs = [pattern, "*." + pattern]
+        return lambda name: any(fnmatch.fnmatchcase(name, g) for g in globs)
+    prefix = pattern.rstrip(".") + "."
+    return lambda name: name == pattern or name.startswith(prefix)
+
+
+class SignalFilter:
+    """
+    Include/exclude filter over the signal names of a dump.
+
+    Args:
+        include (list): Patterns selecting signals; empty selects everything.
+        exclude (list): Patterns removing signals from the selection.
+    """
+
+    def __init__(self, include=(), exclude=()):
+        self.include = [compile_pattern(p) for p in include]
+        self.exclude = [compile_pattern(p) for p in exclude]
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def matches(self, name):
+        if self.include and not any(match(name) for match in self.include):
+            return False
+        return not any(match(name) for match in self.exclude)
+
+    def select(self, header):
+        """
+        Applies the filter to the $var declarations of a header.
+
+        Returns:
+            dict signal_id -> list of the selected names bound to it, in
+            declaration order. Aliases are selected individually.
+        """
+        selected = {}
+        for var in header.vars:
+            if self.matches(var.name):
+                selected.setdefault(var.signal_id, []).append(var.name)
+        return selected
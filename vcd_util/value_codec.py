@@ -0,0 +1,187 @@
+"""
+Compact 4-state value encodings, chosen per signal by width.
+
+Every bit is one of 0, 1, x, z, with codes 0, 1, 2 (CODE_X) and 3 (CODE_Z).
+Signals are stored with the cheapest encoding for their width:
+
+    scalar   1-bit signals: one 2-bit code per change, packed four to a byte
+             on disk and one code per byte in memory
+    word     2..64 bits: a (value, mask) uint64 pair per change; mask bits
+             flag x/z, value bits then tell z (1) from x (0), so a bit's code
+             is value | mask << 1
+    wide     more than 64 bits: 2-bit codes packed four to a byte, MSB first,
+             ceil(width / 4) bytes per change
+    real     float64
+
+Values are parsed straight into these forms and only turned back into
+'01xz' text (or hex) for output; decode() expands a whole column into
+(count, width) codes with NumPy when a consumer wants per-bit access.
+"""
+
+from array import array
+
+import numpy as np
+
+CODE_X = 2
+CODE_Z = 3
+
+SCALAR = "scalar"
+WORD = "word"
+WIDE = "wide"
+REAL = "real"
+
+# Widest vectors stored as (value, mask) words.
+WORD_BITS = 64
+
+# VCD value characters -> 4-state codes. Anything not 0/1/z (u, w, -, h, l)
+# is folded into x.
+_ENCODE = bytes(
+    {ord("0"): 0, ord("1"): 1, ord("z"): CODE_Z, ord("Z"): CODE_Z}.get(i, CODE_X) for i in range(256)
+)
+_DECODE = np.frombuffer(b"01xz", dtype=np.uint8)
+_DIGITS = bytes.maketrans(bytes(range(4)), b"0123")
+_VALUE_BITS = {ord(c): ("1" if c in "1zZ" else "0") for c in "01xXzZuUwW-hHlL"}
+_MASK_BITS = {ord(c): ("0" if c in "01" else "1") for c in "01xXzZuUwW-hHlL"}
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+def encoding_for(var_type, width):
+    """Returns the encoding used for a signal of this type and width."""
+    if var_type == "real":
+        return REAL
+    if width == 1:
+        return SCALAR
+    if width <= WORD_BITS:
+        return WORD
+    return WIDE
+
+
+def new_column(encoding):
+    """Empty growable buffer collecting one signal's encoded values."""
+    if encoding == REAL:
+        return array("d")
+    if encoding == WORD:
+        return array("Q")
+    return bytearray()
+
+
+def encode_bits(value, width):
+    """
+    Encodes a VCD bit string into `width` 4-state codes, MSB first.
+
+    Shorter values are left-extended following the VCD rules: with x or z when
+    the leftmost bit is x or z, with 0 otherwise.
+    """
+    codes = value.encode().translate(_ENCODE)
+    if len(codes) < width:
+        pad = codes[0] if codes and codes[0] >= CODE_X else 0
+        codes = bytes([pad]) * (width - len(codes)) + codes
+    elif len(codes) > width:
+        codes = codes[-width:]
+    return codes
+
+
+def decode_bits(codes):
+    """Turns an array of 4-state codes back into a '01xz' string."""
+    return _DECODE[codes].tobytes().decode()
+
+
+def decode_rows(codes):
+    """Turns (count, width) 4-state codes into one '01xz' string per row."""
+    count, width = codes.shape
+    text = _DECODE[codes].tobytes().decode()
+    return [text[i:i + width] for i in range(0, count * width, width)] if width else [""] * count
+
+
+def encode_word(value, width):
+    """Encodes a VCD bit string of at most 64 bits into a (value, mask) pair."""
+    full = (1 << width) - 1
+    if value[:1] in ("0", "1"):
+        try:
+            return int(value, 2) & full, 0
+        except ValueError:
+            pass
+    bits = int(value.translate(_VALUE_BITS), 2)
+    mask = int(value.translate(_MASK_BITS), 2)
+    if len(value) < width and value[0] not in "01":
+        extension = full ^ ((1 << len(value)) - 1)
+        mask |= extension
+        if value[0] in "zZ":
+            bits |= extension
+    return bits & full, mask & full
+
+
+def word_text(bits, mask, width):
+    """Formats a (value, mask) pair as a '01xz' string."""
+    if not mask:
+        return format(bits, f"0{width}b")
+    return "".join("01xz"[((bits >> i) & 1) | (((mask >> i) & 1) << 1)] for i in range(width - 1, -1, -1))
+
+
+def wide_size(width):
+    """Bytes per change of a wide signal."""
+    return (width + 3) // 4
+
+
+def encode_wide(value, width):
+    """Encodes a VCD bit string into packed 2-bit codes, MSB first."""
+    digits = encode_bits(value, width).translate(_DIGITS)
+    return int(digits, 4).to_bytes(wide_size(width), "big")
+
+
+def unpack_codes(packed):
+    """Expands bytes of packed 2-bit codes (shape (..., n)) into codes of shape (..., 4n)."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    codes = (packed[..., None] >> _SHIFTS) & 3
+    return codes.reshape(packed.shape[:-1] + (packed.shape[-1] * 4,))
+
+
+def pack_codes(codes):
+    """Packs a 1-D array of 2-bit codes four to a byte, zero-padded at the end."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros((len(codes) + 3) // 4 * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def decode(encoding, column, width):
+    """
+    Expands an encoded column into per-bit 4-state codes.
+
+    Args:
+        column (ndarray): (count,) scalar codes, (count, 2) words or
+            (count, wide_size(width)) packed bytes.
+
+    Returns:
+        (count, width) uint8 array.
+    """
+    if encoding == SCALAR:
+        return np.asarray(column, dtype=np.uint8).reshape(-1, 1)
+    if encoding == WORD:
+        shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+        bits = (column[:, 0:1] >> shifts) & np.uint64(1)
+        mask = (column[:, 1:2] >> shifts) & np.uint64(1)
+        return (bits | (mask << np.uint64(1))).astype(np.uint8)
+    return unpack_codes(column)[:, -width:] if width else np.zeros((len(column), 0), dtype=np.uint8)
+
+
+def lsb_codes(encoding, column):
+    """4-state code of the least significant bit of each value of an encoded (non-real) column."""
+    if encoding == SCALAR:
+        return np.asarray(column, dtype=np.uint8)
+    if encoding == WORD:
+        return ((column[:, 0] & np.uint64(1)) | ((column[:, 1] & np.uint64(1)) << np.uint64(1))).astype(np.uint8)
+    # Wide codes are right-aligned, the last byte ends with bit 0
+    return np.asarray(column[:, -1] & 3, dtype=np.uint8)
+
+
+def text_at(encoding, column, index, width):
+    """Formats the index-th value of an encoded column as '01xz' text (or a float repr)."""
+    if encoding == REAL:
+        return repr(float(column[index]))
+    if encoding == SCALAR:
+        return "01xz"[int(column[index])]
+    if encoding == WORD:
+        return word_text(int(column[index, 0]), int(column[index, 1]), width)
+    return decode_bits(unpack_codes(column[index])[-width:])
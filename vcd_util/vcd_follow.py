@@ -0,0 +1,279 @@
+"""
+Tail-follow ingestion of a VCD that is still being written.
+
+VcdFollower waits for the header of a growing dump, then on every poll()
+parses only the bytes appended since the previous poll and appends them to
+an in-memory LiveStore. The follower's WaveformIndex answers the usual
+queries (value_at, first_edge, toggle_count, ...) over everything dumped so
+far, so tools can inspect a simulation while it runs.
+
+Only complete lines are parsed; a partially written last line, or a
+$comment whose $end has not been written yet, is kept until the next poll.
+Compressed dumps cannot be followed.
+
+Usage:
+    python -m vcd_util.vcd_follow dump.vcd --watch rst_ni --fail-on error_o=1
+
+exits with status 1 as soon as a --fail-on condition is seen, so a wrapper
+can kill the simulation early.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from vcd_util.value_codec import REAL, WIDE, WORD, encoding_for, text_at, wide_size
+from vcd_util.vcd_reader import BLOCK_SIZE, compression, header_end, parse_header_bytes, value_changes
+from vcd_util.wave_index import WaveformIndex
+from vcd_util.wave_store import WaveStore, collect_sparse, compact_bits
+
+
+class LiveStore(WaveStore):
+    """
+    In-memory WaveStore whose per-signal columns grow as changes arrive.
+
+    Columns hold values in their compact encoding (see value_codec) with
+    spare capacity, so times()/packed_values() return views and appending
+    does not copy a signal's history until its capacity doubles.
+    """
+
+    def __init__(self, header, source=""):
+        self.path = None
+        self.source = source
+        self.source_stat = None
+        self.header = header
+        self.current_time = 0
+        self.signals = [{"count": 0, "encoding": encoding_for(header.signal_type(i), header.signal_width(i))}
+                        for i in range(header.num_signals)]
+        self._time_columns = [np.zeros(0, dtype=np.int64) for _ in range(header.num_signals)]
+        self._value_columns = [np.zeros((0,) + self._row_shape(i), dtype=self._dtype(i))
+                               for i in range(header.num_signals)]
+        self._ids = self._name_ids(header)
+        self._scope_tree = None
+
+    def _dtype(self, signal_id):
+        return {REAL: np.float64, WORD: np.uint64}.get(self.signals[signal_id]["encoding"], np.uint8)
+
+    def _row_shape(self, signal_id):
+        encoding = self.signals[signal_id]["encoding"]
+        if encoding == WORD:
+            return (2,)
+        if encoding == WIDE:
+            return (wide_size(self.header.signal_width(signal_id)),)
+        return ()
+
+    def append(self, signal_id, times, values):
+        """Appends change times (array('q')) and values, a column built by wave_store.collect_sparse."""
+        entry = self.signals[signal_id]
+        count, added = entry["count"], len(times)
+        column = self._time_columns[signal_id]
+        value_column = self._value_columns[signal_id]
+        if count + added > len(column):
+            capacity = max(2 * len(column), count + added, 16)
+            grown = np.empty(capacity, dtype=np.int64)
+            grown[:count] = column[:count]
+            self._time_columns[signal_id] = column = grown
+            grown_values = np.empty((capacity,) + value_column.shape[1:], dtype=value_column.dtype)
+            grown_values[:count] = value_column[:count]
+            self._value_columns[signal_id] = value_column = grown_values
+        column[count:count + added] = np.frombuffer(times, dtype=np.int64)
+        value_column[count:count + added] = np.frombuffer(values, dtype=value_column.dtype).reshape(
+            (added,) + value_column.shape[1:])
+        entry["count"] = count + added
+
+    def times(self, signal):
+        signal_id = self.signal_id(signal)
+        return self._time_columns[signal_id][:self.signals[signal_id]["count"]]
+
+    def packed_values(self, signal, start=0, stop=None):
+        signal_id = self.signal_id(signal)
+        return self._value_columns[signal_id][:self.signals[signal_id]["count"]][start:stop]
+
+    def value_text(self, signal, index):
+        signal_id = self.signal_id(signal)
+        return text_at(self.encoding(signal_id), self.packed_values(signal_id), index,
+                       self.header.signal_width(signal_id))
+
+    @property
+    def end_time(self):
+        return self.current_time
+
+    def close(self):
+        pass
+
+
+def _complete(data):
+    """
+    Length of the prefix of data that can be parsed on its own: complete
+    lines, ending before a $comment that is still open.
+
+    $dumpvars, $dumpoff and the like only hold value changes, which parse the
+    same when split; the body of a $comment does not.
+    """
+    cut = data.rfind(b"\n") + 1
+    start = data.rfind(b"$comment", 0, cut)
+    if start >= 0 and not re.search(rb"\$end(?:\s|$)", data[start + len(b"$comment"):cut]):
+        cut = data.rfind(b"\n", 0, start) + 1
+    return cut
+
+
+class VcdFollower:
+    """
+    Incrementally ingests a growing VCD.
+
+    Args:
+        path (str): Dump being written by the simulator.
+        block_size (int): Bytes read per step of a poll.
+
+    Attributes:
+        store (LiveStore): Changes seen so far, None until the header is complete.
+        index (WaveformIndex): Query API over `store`.
+    """
+
+    def __init__(self, path, block_size=BLOCK_SIZE):
+        if os.path.exists(path) and compression(path) is not None:
+            raise ValueError(f"Cannot follow compressed dump {path}")
+        self.path = path
+        self.block_size = block_size
+        self.store = None
+        self.index = None
+        self._offset = 0
+        self._carry = b""
+
+    @property
+    def header(self):
+        return self.store.header if self.store is not None else None
+
+    def _read_header(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "rb") as f:
+            data = f.read()
+        end = header_end(data)
+        if end is None:
+            return False
+        self.store = LiveStore(parse_header_bytes(data[:end]), source=self.path)
+        self.index = WaveformIndex(self.store)
+        self._offset = end
+        return True
+
+    def poll(self):
+        """
+        Parses the bytes appended since the last poll.
+
+        Returns:
+            Set of the signal ids that got new changes.
+        """
+        if self.store is None and not self._read_header():
+            return set()
+        if os.path.getsize(self.path) < self._offset:
+            raise ValueError(f"{self.path} shrank while being followed, was the simulation restarted?")
+        changed = set()
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            while True:
+                block = f.read(self.block_size)
+                if not block:
+                    break
+                self._offset += len(block)
+                data = self._carry + block
+                cut = _complete(data)
+                self._carry = data[cut:]
+                if cut:
+                    changed |= self._ingest(data[:cut])
+        return changed
+
+    def _ingest(self, data):
+        store = self.store
+        tokens = data.split()
+        columns = collect_sparse(store.header, value_changes(iter(tokens), store.header.codes, store.current_time))
+        # Timestamps are the only lines starting with '#'; identifier codes may
+        # contain one but never start a line
+        start = data.rfind(b"\n#") + 1
+        if data[start:start + 1] == b"#":
+            store.current_time = int(data[start + 1:data.index(b"\n", start)])
+        for signal_id, (times, values) in columns.items():
+            store.append(signal_id, times, values)
+        return set(columns)
+
+    def follow(self, interval=0.5, idle_timeout=None):
+        """
+        Polls the dump until it stops growing.
+
+        Args:
+            interval (float): Seconds between polls.
+            idle_timeout (float): Stop after this many seconds without new
+                data; None follows forever.
+
+        Yields:
+            The set of changed signal ids after every poll that found new data.
+        """
+        last_growth = time.monotonic()
+        while True:
+            changed = self.poll()
+            if changed:
+                last_growth = time.monotonic()
+                yield changed
+            elif idle_timeout is not None and time.monotonic() - last_growth > idle_timeout:
+                return
+            time.sleep(interval)
+
+
+def _parse_condition(text):
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"Expected SIGNAL=VALUE, got {text!r}")
+    value = value.strip()
+    if value.lower().startswith("0x"):
+        value = bin(int(value, 16))[2:]
+    return name.strip(), compact_bits(value.lower())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow a VCD while the simulation writes it.")
+    parser.add_argument("vcd", help="Dump being written")
+    parser.add_argument("--watch", action="append", default=[], help="Print the changes of a signal (repeatable)")
+    parser.add_argument("--fail-on", action="append", default=[], type=_parse_condition,
+                        help="SIGNAL=VALUE (binary or 0x hex) that aborts with exit status 1 (repeatable)")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between polls")
+    parser.add_argument("--idle", type=float, default=60.0, help="Stop after this many seconds without new data")
+    args = parser.parse_args()
+
+    follower = VcdFollower(args.vcd)
+    watched = None
+    conditions = None
+    seen = {}
+    for changed in follower.follow(args.interval, args.idle):
+        index = follower.index
+        if watched is None:
+            # Names can only be checked once the header has been read
+            try:
+                watched = [index.resolve(name) for name in args.watch]
+                conditions = [(name, index.resolve(name), value) for name, value in args.fail_on]
+            except KeyError as e:
+                parser.error(f"{e.args[0]} in {args.vcd}")
+        for signal_id in set(watched + [c[1] for c in conditions]) & changed:
+            times = follower.store.times(signal_id)
+            start, seen[signal_id] = seen.get(signal_id, 0), len(times)
+            for i in range(start, len(times)):
+                value = follower.store.value_text(signal_id, i)
+                if not follower.store.is_real(signal_id):
+                    value = compact_bits(value)
+                if signal_id in watched:
+                    print(f"{index.format_time(times[i])}: {follower.header.signal_name(signal_id)} = {value}")
+                for name, condition_id, expected in conditions:
+                    if condition_id == signal_id and value == expected:
+                        print(f"{name} = {value} at {index.format_time(times[i])}, aborting")
+                        sys.exit(1)
+    if follower.store is None:
+        print(f"No complete VCD header in {args.vcd}")
+        sys.exit(2)
+    print(f"{args.vcd} idle for {args.idle}s at {follower.index.format_time(follower.store.current_time)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+Streaming VCD reader shared by parseVcd.py and vcd_to_text.py.
+
+The file is read in large byte blocks and split into whitespace separated
+tokens, so the value change section is walked once without building any
+per-line strings. Identifier codes are mapped to compact integer signal ids
+in order of declaration; several $var lines sharing one identifier code
+(aliases) resolve to the same signal id. gzip, zstd and xz compressed dumps
+are read directly, see open_vcd().
+
+Usage:
+    with VcdReader("dump.vcd") as reader:
+        for time, signal_id, value in reader.changes():
+            print(reader.header.signal_name(signal_id), time, value)
+"""
+
+import gzip
+import lzma
+import queue
+import re
+import threading
+from itertools import chain
+
+# Size of the blocks handed to the tokeniser.
+BLOCK_SIZE = 1 << 22
+
+# Seconds exponent of every unit allowed in $timescale.
+UNIT_EXPONENTS = {"s": 0, "ms": -3, "us": -6, "ns": -9, "ps": -12, "fs": -15}
+
+# Leading bytes of the compressed formats open_vcd() decodes.
+_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"\xfd7zXZ\x00": "xz",
+}
+
+_TIME_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([munpf]?s)?\s*$")
+
+
+class VcdVar:
+    """A single $var declaration."""
+
+    __slots__ = ("name", "scope", "var_type", "width", "code", "signal_id", "bit_range")
+
+    def __init__(self, name, scope, var_type, width, code, signal_id, bit_range=""):
+        self.name = name
+        self.scope = scope
+        self.var_type = var_type
+        self.width = width
+        self.code = code
+        self.signal_id = signal_id
+        self.bit_range = bit_range
+
+    def __repr__(self):
+        return f"VcdVar({self.name!r}, width={self.width}, id={self.signal_id})"
+
+
+class VcdHeader:
+    """Everything declared before $enddefinitions."""
+
+    def __init__(self):
+        self.timescale = ""
+        self.date = ""
+        self.version = ""
+        self.vars = []
+        self.scopes = []         # (dotted path, scope type) in declaration order
+        self.codes = {}          # identifier code (bytes) -> signal id
+        self.signal_vars = []    # signal id -> list of VcdVar aliases
+
+    @property
+    def num_signals(self):
+        return len(self.signal_vars)
+
+    def signal_name(self, signal_id):
+        """Returns the first declared name of a signal id."""
+        return self.signal_vars[signal_id][0].name
+
+    def signal_width(self, signal_id):
+        return self.signal_vars[signal_id][0].width
+
+    def signal_type(self, signal_id):
+        return self.signal_vars[signal_id][0].var_type
+
+    def find(self, name):
+        """Returns the VcdVar with the given dotted name, or None."""
+        for var in self.vars:
+            if var.name == name or var.name + var.bit_range == name:
+                return var
+        return None
+
+    def to_dict(self):
+        return {
+            "timescale": self.timescale,
+            "date": self.date,
+            "version": self.version,
+            "vars": [[var.name, var.scope, var.var_type, var.width, var.code, var.signal_id, var.bit_range]
+                     for var in self.vars],
+            "scopes": [list(scope) for scope in self.scopes],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        header = cls()
+        header.timescale = data["timescale"]
+        header.date = data["date"]
+        header.version = data["version"]
+        header.scopes = [tuple(scope) for scope in data.get("scopes", ())]
+        for fields in data["vars"]:
+            var = VcdVar(*fields)
+            while len(header.signal_vars) <= var.signal_id:
+                header.signal_vars.append([])
+            header.codes[var.code.encode()] = var.signal_id
+            header.vars.append(var)
+            header.signal_vars[var.signal_id].append(var)
+        return header
+
+    def _add_var(self, scopes, tokens):
+        # tokens: [type, width, code, reference, (bit range)]
+        var_type = tokens[0].decode()
+        code = tokens[2]
+        reference = tokens[3].decode()
+        if tokens[1].startswith(b"["):
+            # Extended VCD ports declare a bit range instead of a size
+            msb, _, lsb = tokens[1][1:-1].partition(b":")
+            width = abs(int(msb) - int(lsb or msb)) + 1
+            bit_range = tokens[1].decode()
+        else:
+            width = int(tokens[1])
+            bit_range = "".join(t.decode() for t in tokens[4:])
+        if "[" in reference and not bit_range:
+            reference, _, rest = reference.partition("[")
+            bit_range = "[" + rest
+
+        signal_id = self.codes.get(code)
+        if signal_id is None:
+            signal_id = len(self.signal_vars)
+            self.codes[code] = signal_id
+            self.signal_vars.append([])
+
+        var = VcdVar(".".join(scopes + [reference]), ".".join(scopes), var_type,
+                     width, code.decode(), signal_id, bit_range)
+        self.vars.append(var)
+        self.signal_vars[signal_id].append(var)
+        return var
+
+
+def parse_timescale(text):
+    """
+    Parses a $timescale body such as "1ns", "1 ns" or "100ps".
+
+    Returns:
+        (magnitude, unit) tuple, e.g. (1, "ns").
+    """
+    text = text.replace(" ", "")
+    digits = text.rstrip("abcdefghijklmnopqrstuvwxyz")
+    unit = text[len(digits):] or "s"
+    if unit not in UNIT_EXPONENTS:
+        raise ValueError(f"Unknown timescale unit in {text!r}")
+    return int(digits or 1), unit
+
+
+def parse_time(t, timescale):
+    """
+    Converts a time to simulation ticks of a dump.
+
+    Integers are taken as ticks already; strings such as "4250ns" or
+    "4.25 us" are scaled by `timescale` (e.g. "1ns"), bare numbers are ticks.
+    """
+    if isinstance(t, int):
+        return t
+    match = _TIME_RE.match(str(t))
+    if not match:
+        raise ValueError(f"Cannot parse time {t!r}")
+    number, unit = match.groups()
+    if unit is None:
+        return int(float(number))
+    magnitude, tick_unit = parse_timescale(timescale or "1s")
+    exponent = UNIT_EXPONENTS[unit] - UNIT_EXPONENTS[tick_unit]
+    return int(round(float(number) * 10.0 ** exponent / magnitude))
+
+
+def compression(path):
+    """Returns "gzip", "zstd" or "xz" when a file starts with their magic bytes, None otherwise."""
+    with open(path, "rb") as f:
+        head = f.read(8)
+    for magic, name in _MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def _decompressor(path, kind):
+    if kind == "gzip":
+        return gzip.open(path, "rb")
+    if kind == "xz":
+        return lzma.open(path, "rb")
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"{path} is zstd compressed, install zstandard to read it") from None
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+
+
+class _DecoderThread:
+    """
+    File-like wrapper decompressing ahead of the parser in a background thread.
+
+    read() returns the next decoded block whatever size is asked for, which is
+    all _token_blocks needs. zlib, lzma and zstandard release the GIL while
+    decoding, so decompression overlaps with tokenising.
+    """
+
+    def __init__(self, f, block_size=BLOCK_SIZE, depth=4):
+        self._file = f
+        self._blocks = queue.Queue(depth)
+        self._closed = threading.Event()
+        self._done = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(block_size,), daemon=True)
+        self._thread.start()
+
+    def _run(self, block_size):
+        try:
+            while not self._closed.is_set():
+                block = self._file.read(block_size)
+                self._put(block)
+                if not block:
+                    return
+        except BaseException as e:
+            self._error = e
+            self._put(b"")
+
+    def _put(self, block):
+        while not self._closed.is_set():
+            try:
+                self._blocks.put(block, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(self, size=-1):
+        if self._done:
+            return b""
+        block = self._blocks.get()
+        if not block:
+            self._done = True
+            if self._error is not None:
+                raise self._error
+        return block
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self._file.close()
+
+
+def open_vcd(path):
+    """
+    Opens a VCD file for binary block reads.
+
+    gzip, zstd and xz compressed dumps (detected by their magic bytes, not
+    their extension) are decompressed on the fly by a decoder thread.
+    """
+    kind = compression(path)
+    if kind is None:
+        return open(path, "rb")
+    return _DecoderThread(_decompressor(path, kind))
+
+
+def header_end(data):
+    """Returns the offset just past `$enddefinitions $end` in data, or None if not there yet."""
+    start = data.find(b"$enddefinitions")
+    if start < 0:
+        return None
+    end = data.find(b"$end", start + len(b"$enddefinitions"))
+    if end < 0:
+        return None
+    return end + len(b"$end")
+
+
+def parse_header_bytes(data):
+    """Parses a header from the bytes up to header_end(data)."""
+    return _parse_header(iter(data.split()))
+
+
+def _token_blocks(f, block_size):
+    """Yields lists of whitespace separated tokens, one list per block read."""
+    tail = b""
+    while True:
+        block = f.read(block_size)
+        if not block:
+            if tail:
+                yield [tail]
+            return
+        if tail:
+            block = tail + block
+        tokens = block.split()
+        if block[-1:].isspace() or not tokens:
+            tail = b""
+        else:
+            tail = tokens.pop()
+        yield tokens
+
+
+def _read_until_end(tokens):
+    """Collects the tokens of a section up to (not including) its $end."""
+    body = []
+    for token in tokens:
+        if token == b"$end":
+            break
+        body.append(token)
+    return body
+
+
+def _parse_header(tokens):
+    header = VcdHeader()
+    scopes = []
+    for token in tokens:
+        if token == b"$var":
+            header._add_var(scopes, _read_until_end(tokens))
+        elif token == b"$scope":
+            body = _read_until_end(tokens)
+            scopes.append(body[-1].decode())
+            header.scopes.append((".".join(scopes), body[0].decode() if len(body) > 1 else ""))
+        elif token == b"$upscope":
+            _read_until_end(tokens)
+            scopes.pop()
+        elif token == b"$timescale":
+            magnitude, unit = parse_timescale(b"".join(_read_until_end(tokens)).decode())
+            header.timescale = f"{magnitude}{unit}"
+        elif token == b"$date":
+            header.date = b" ".join(_read_until_end(tokens)).decode()
+        elif token == b"$version":
+            header.version = b" ".join(_read_until_end(tokens)).decode()
+        elif token == b"$enddefinitions":
+            _read_until_end(tokens)
+            return header
+        elif token.startswith(b"$"):
+            # $comment and vendor specific sections
+            _read_until_end(tokens)
+    return header
+
+
+def value_changes(tokens, codes, time=0, declared=None):
+    """
+    Walks value change tokens, yielding (time, signal_id, value).
+
+    Args:
+        tokens (iterator): Tokens following $enddefinitions, or any slice of
+            them starting at a '#<time>' token.
+        codes (dict): Identifier code (bytes) -> signal id; changes of codes
+            missing from it are skipped without decoding the value.
+        time (int): Time in effect before the first '#<time>' token.
+        declared (dict): Every identifier code of the header; when given,
+            changes of codes it lacks are yielded with the code (str) in place
+            of the signal id.
+    """
+    lookup = codes.get
+    vector = None
+    for token in tokens:
+        if vector is not None:
+            signal_id = lookup(token)
+            if signal_id is not None:
+                yield time, signal_id, vector.decode()
+            elif declared is not None and token not in declared:
+                yield time, token.decode(), vector.decode()
+            vector = None
+            continue
+        c = token[0]
+        if c == 35:  # '#'
+            time = int(token[1:])
+        elif c in (98, 66, 114, 82):  # 'b', 'B', 'r', 'R'
+            vector = token[1:]
+        elif c == 36:  # '$'
+            if token == b"$comment":
+                _read_until_end(tokens)
+            # $dumpvars, $dumpall, $dumpon, $dumpoff and $end only bracket changes
+        else:
+            signal_id = lookup(token[1:])
+            if signal_id is not None:
+                yield time, signal_id, chr(c)
+            elif declared is not None and token[1:] not in declared:
+                yield time, token[1:].decode(), chr(c)
+
+
+class WaveformReader:
+    """
+    Interface every waveform source implements, whatever the dump format.
+
+    `header` describes the declarations in VCD terms (a VcdHeader) and
+    changes() streams (time, signal_id, value) tuples in time order, with
+    values spelled as in a VCD: '0', '1', 'x', 'z', bit strings such as
+    '10xz', or a real number for real variables. parseVcd.py, vcd_to_text.py
+    and the waveform store program against this, so VCD, EVCD and FST dumps
+    (see wave_formats.py) and converted stores are interchangeable.
+    """
+
+    header = None
+
+    def changes(self, signal_ids=None):
+        """
+        Streams the value changes.
+
+        Args:
+            signal_ids (set): Only yield changes of these signals.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class VcdReader(WaveformReader):
+    """
+    Single pass VCD reader.
+
+    The header is parsed on construction; changes() then streams the value
+    change section as (time, signal_id, value) tuples. Values are strings
+    without their 'b'/'r' prefix, matching what VCDVCD stores in .tv.
+    """
+
+    # Value change section walker, replaced by readers of VCD dialects
+    _value_changes = staticmethod(value_changes)
+
+    def __init__(self, path, block_size=BLOCK_SIZE):
+        self.path = path
+        self._file = open_vcd(path)
+        self._tokens = chain.from_iterable(_token_blocks(self._file, block_size))
+        self.header = _parse_header(self._tokens)
+
+    def changes(self, signal_ids=None, unknown=False):
+        """
+        Streams the value changes.
+
+        Args:
+            signal_ids (set): Only yield changes of these signals; the values
+                of all other identifier codes are skipped undecoded.
+            unknown (bool): Also yield the changes of identifier codes the
+                header never declared, with the code (str) as signal id.
+        """
+        codes = self.header.codes
+        if signal_ids is not None:
+            codes = {code: signal_id for code, signal_id in codes.items() if signal_id in signal_ids}
+        yield from self._value_changes(self._tokens, codes, declared=self.header.codes if unknown else None)
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+
+def read_header(path):
+    """Parses only the header of a VCD file."""
+    with VcdReader(path) as reader:
+        return reader.header
+
+
+def iter_changes(path, block_size=BLOCK_SIZE):
+    """Yields (time, signal_id, value) for every value change in a VCD file."""
+    with VcdReader(path, block_size) as reader:
+        yield from reader.changes()
+
+
+def load_histories(path):
+    """
+    Collects the full (time, value) history of every signal.
+
+    Returns:
+        (header, histories) where histories[signal_id] is a list of
+        (time, value) tuples in time order.
+    """
+    with VcdReader(path) as reader:
+        histories = [[] for _ in range(reader.header.num_signals)]
+        for time, signal_id, value in reader.changes():
+            histories[signal_id].append((time, value))
+        return reader.header, histories
@@ -1,86 +1,134 @@
-import sys
+import argparse
 
-def vcd_to_text(input_vcd, output_txt):
+from vcd_util.scope_tree import ScopeTree
+from vcd_util.signal_filter import SignalFilter
+from vcd_util.wave_analytics import analyze, format_table
+from vcd_util.vcd_reader import VcdReader, parse_time
+from vcd_util.wave_store import WaveStore, open_store, open_waveform
+
+def vcd_to_text(input_vcd, output_txt, workers=1, include=(), exclude=(), start=None, end=None, cache=False,
+                summary=False, hierarchy_depth=None):
+    """
+    Writes the hierarchy and value changes of a dump as text.
+
+    Args:
+        include (list): Scope prefixes, globs or /regexes/ of the signals to
+            keep (see vcd_util.signal_filter); all signals when empty.
+        exclude (list): Patterns of signals to drop.
+        start, end: Time window, in ticks or with a unit ("4250ns"). Signals
+            changed before `start` are printed with their value at `start`;
+            parsing stops at the first timestamp past `end`.
+        workers (int): Parser processes. Several workers convert the dump
+            into a waveform store in parallel, so workers > 1 implies cache.
+        cache (bool): Read the dump through the waveform cache, converting it
+            on first use so later runs skip parsing (see vcd_util.wave_cache).
+            The first run converts every signal of the whole dump, so it only
+            pays off for dumps queried repeatedly. Changes of identifier
+            codes the header never declared are only reported without it.
+        summary (bool): Add a table of per-signal toggle counts, activity,
+            duty cycle, X/Z time and glitches (see vcd_util.wave_analytics)
+            over the whole dump. Needs the waveform cache.
+        hierarchy_depth (int): Add an outline of the scope tree this many
+            levels deep (see vcd_util.scope_tree), -1 for all of it.
+    """
     try:
-        with open(input_vcd, 'r') as vcd_file, open(output_txt, 'w') as output_file:
-            signals = {}  # Mapping from identifier codes to signal info
-            scopes = []   # Stack to keep track of scopes (module hierarchy)
-            timescale = ''
-            parsing_header = True
+        # Several workers parse in parallel into a waveform store, so they imply the cache
+        reader = open_store(input_vcd, workers) if workers > 1 else open_waveform(input_vcd, cache)
+        with reader, open(output_txt, 'w') as output_file:
+            header = reader.header
+            signal_filter = SignalFilter(include, exclude)
+            # Aliases share one signal id, print every selected name bound to it
+            names = signal_filter.select(header)
+            start = parse_time(start, header.timescale) if start is not None else None
+            end = parse_time(end, header.timescale) if end is not None else None
 
             output_file.write("== VCD Signals and Hierarchy ==\n")
-
-            for line in vcd_file:
-                line = line.strip()
-                if parsing_header:
-                    if line.startswith('$timescale'):
-                        # Extract timescale
-                        timescale_line = line
-                        while not line.endswith('$end'):
-                            line = next(vcd_file).strip()
-                            timescale_line += ' ' + line
-                        timescale = timescale_line.replace('$timescale', '').replace('$end', '').strip()
-                        output_file.write(f"Timescale: {timescale}\n")
-                    elif line.startswith('$scope'):
-                        # Entering a new scope
-                        tokens = line.split()
-                        scope_type = tokens[1]
-                        scope_name = tokens[2]
-                        scopes.append(scope_name)
-                    elif line.startswith('$upscope'):
-                        # Exiting a scope
-                        scopes.pop()
-                    elif line.startswith('$var'):
-                        # Variable definition
-                        tokens = line.split()
-                        var_type = tokens[1]
-                        var_size = tokens[2]
-                        identifier_code = tokens[3]
-                        var_name = tokens[4]
-                        full_name = '.'.join(scopes + [var_name])
-                        signals[identifier_code] = {
-                            'name': full_name,
-                            'size': var_size,
-                            'type': var_type
-                        }
-                        output_file.write(f"Signal: {full_name} (Size: {var_size} bits)\n")
-                    elif line.startswith('$enddefinitions'):
-                        parsing_header = False
-                        output_file.write("\n== Value Changes ==\n")
+            if header.timescale:
+                output_file.write(f"Timescale: {header.timescale}\n")
+            for var in header.vars:
+                if var.signal_id in names and var.name in names[var.signal_id]:
+                    output_file.write(f"Signal: {var.name} (Size: {var.width} bits)\n")
+            if hierarchy_depth is not None:
+                tree = reader.scope_tree if isinstance(reader, WaveStore) else ScopeTree.from_header(header)
+                output_file.write("\n== Scope Tree ==\n")
+                output_file.write(tree.listing(depth=None if hierarchy_depth < 0 else hierarchy_depth) + "\n")
+            if summary:
+                output_file.write("\n== Signal Summary ==\n")
+                if isinstance(reader, WaveStore):
+                    output_file.write(format_table(analyze(reader, sorted(names)), header.timescale) + "\n")
                 else:
-                    # Parsing value changes
-                    if line.startswith('#'):
-                        # Timestamp
-                        timestamp = int(line[1:])
-                        output_file.write(f"\nTime: {timestamp}\n")
-                    elif line == '':
-                        continue  # Skip empty lines
-                    else:
-                        # Value change
-                        if line.startswith('b') or line.startswith('r'):
-                            # Vector value change
-                            tokens = line.split()
-                            value = tokens[0][1:]  # Remove 'b' or 'r'
-                            identifier_code = tokens[1]
-                        else:
-                            # Scalar value change
-                            value = line[0]
-                            identifier_code = line[1:]
-                        if identifier_code in signals:
-                            signal_name = signals[identifier_code]['name']
-                            output_file.write(f"{signal_name}: {value}\n")
-                        else:
-                            output_file.write(f"Unknown signal {identifier_code}: {value}\n")
+                    output_file.write("Not available without the waveform cache (--cache)\n")
+            output_file.write("\n== Value Changes ==\n")
+
+            # A raw dump's values are printed as spelled; a store keeps full-width
+            # bit strings and floats, print the floats the way simulators write them
+            reals = {i for i in names if header.signal_type(i) == "real"} if isinstance(reader, WaveStore) else ()
+
+            def write_change(time, signal_id, value):
+                nonlocal last_time
+                if time != last_time:
+                    output_file.write(f"\nTime: {time}\n")
+                    last_time = time
+                if isinstance(signal_id, str):
+                    output_file.write(f"Unknown signal {signal_id}: {value}\n")
+                    return
+                if signal_id in reals:
+                    value = format(float(value), ".16g")
+                for signal_name in names[signal_id]:
+                    output_file.write(f"{signal_name}: {value}\n")
+
+            last_time = None
+            # Values in effect at `start`, flushed when the window opens
+            initial = {} if start is not None else None
+            signal_ids = set(names) if signal_filter else None
+            if isinstance(reader, VcdReader) and not signal_filter:
+                # Stores drop the changes of undeclared identifier codes, dumps report them
+                changes = reader.changes(signal_ids, unknown=True)
+            else:
+                changes = reader.changes(signal_ids)
+            for time, signal_id, value in changes:
+                if end is not None and time > end:
+                    break
+                if initial is not None:
+                    if time < start:
+                        if isinstance(signal_id, str):
+                            continue
+                        initial[signal_id] = value
+                        continue
+                    for initial_id in sorted(initial):
+                        write_change(start, initial_id, initial[initial_id])
+                    initial = None
+                write_change(time, signal_id, value)
+            if initial:
+                for initial_id in sorted(initial):
+                    write_change(start, initial_id, initial[initial_id])
 
             print(f"Conversion complete. Output written to {output_txt}")
 
     except Exception as e:
         print(f"Error processing VCD file: {e}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Write the value changes of a VCD as text.")
+    parser.add_argument("input", help="input.vcd (optionally gzip, zstd or xz compressed), .evcd, .fst or input.wave")
+    parser.add_argument("output", help="output.txt")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Parse the VCD with this many processes into the waveform cache (implies --cache)")
+    parser.add_argument("-i", "--include", action="append", default=[],
+                        help="Keep signals matching a scope prefix, glob or /regex/ (repeatable)")
+    parser.add_argument("-x", "--exclude", action="append", default=[],
+                        help="Drop signals matching a scope prefix, glob or /regex/ (repeatable)")
+    parser.add_argument("--start", help="Start of the time window, e.g. 1000 or 4250ns")
+    parser.add_argument("--end", help="End of the time window")
+    parser.add_argument("--cache", action="store_true",
+                        help="Read through the waveform cache, converting the whole dump on first use")
+    parser.add_argument("--summary", action="store_true",
+                        help="Add per-signal toggle, activity, duty cycle, X/Z and glitch statistics (with --cache)")
+    parser.add_argument("--hierarchy", type=int, metavar="DEPTH",
+                        help="Add an outline of the scope tree DEPTH levels deep (-1 for all)")
+    args = parser.parse_args()
+    vcd_to_text(args.input, args.output, args.workers, args.include, args.exclude, args.start, args.end,
+                args.cache, args.summary, args.hierarchy)
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python vcd_to_text.py <input.vcd> <output.txt>")
-        sys.exit(1)
-    input_vcd = sys.argv[1]
-    output_txt = sys.argv[2]
-    vcd_to_text(input_vcd, output_txt)
\ No newline at end of file
+    main()
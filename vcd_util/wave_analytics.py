@@ -0,0 +1,187 @@
+"""
+Vectorised per-signal waveform analytics.
+
+Every statistic is computed with NumPy over a signal's time and value
+columns (see wave_store.WaveStore), without walking changes in Python:
+
+    changes          recorded value changes, including re-assignments
+    toggles          changes to a different value
+    first_activity   time of the first / last toggle
+    last_activity
+    high_time        ticks spent at 1 and its share of the signal's lifetime
+    duty_cycle       (1-bit signals only)
+    x_intervals      [start, end) intervals with any bit at x / z, and the
+    z_intervals      total ticks spent there
+    glitches         values held for less than `glitch_width` ticks before
+    first_glitch     changing again, and the time of the first one
+
+Usage:
+    python -m vcd_util.wave_analytics dump.vcd [--glitch-width 2] [--include PATTERN]
+"""
+
+import argparse
+
+import numpy as np
+
+from vcd_util.signal_filter import SignalFilter
+from vcd_util.value_codec import CODE_X, CODE_Z
+from vcd_util.wave_store import open_store
+
+# Values held for less than this many ticks count as glitches; 1 flags only
+# zero-width pulses (several changes in one timestep).
+DEFAULT_GLITCH_WIDTH = 1
+
+_COLUMNS = ("signal", "width", "toggles", "first", "last", "duty", "x_time", "z_time", "glitches")
+
+
+def _intervals(mask, starts, end):
+    """Merges consecutive True entries of mask into [start, end) intervals over segment start times."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    bounds = np.append(starts, end)
+    return np.stack([bounds[np.flatnonzero(edges == 1)], bounds[np.flatnonzero(edges == -1)]], axis=1)
+
+
+def signal_stats(times, values, end_time, glitch_width=DEFAULT_GLITCH_WIDTH):
+    """
+    Computes the analytics of one signal.
+
+    Args:
+        times (ndarray): int64 change times.
+        values (ndarray): (count, width) uint8 4-state codes, or float64
+            values of a real signal.
+        end_time (int): End of the dump; the last value holds until then.
+        glitch_width (int): Pulses shorter than this many ticks are glitches.
+
+    Returns:
+        dict with the fields listed in the module docstring. Intervals are
+        lists of [start, end] pairs.
+    """
+    times = np.asarray(times)
+    values = np.asarray(values)
+    stats = {"changes": len(times), "toggles": 0, "first_activity": None, "last_activity": None,
+             "high_time": None, "duty_cycle": None, "x_intervals": [], "x_time": 0,
+             "z_intervals": [], "z_time": 0, "glitches": 0, "first_glitch": None}
+    if not len(times):
+        return stats
+    end = max(int(end_time), int(times[-1]))
+    real = values.ndim == 1
+
+    # Segments: maximal runs holding one value
+    differs = values[1:] != values[:-1]
+    if not real:
+        differs = np.any(differs, axis=1)
+    kept = np.flatnonzero(np.concatenate(([True], differs)))
+    starts = times[kept]
+    durations = np.diff(np.append(starts, end))
+    stats["toggles"] = len(kept) - 1
+    if len(kept) > 1:
+        stats["first_activity"] = int(starts[1])
+        stats["last_activity"] = int(starts[-1])
+    if len(kept) > 2:
+        # Only segments entered and left by a toggle are pulses
+        short = np.flatnonzero(durations[1:-1] < glitch_width)
+        stats["glitches"] = len(short)
+        if len(short):
+            stats["first_glitch"] = int(starts[1 + short[0]])
+    if real:
+        return stats
+
+    segment_values = values[kept]
+    if segment_values.shape[1] == 1:
+        high = int(durations[segment_values[:, 0] == 1].sum())
+        span = end - int(times[0])
+        stats["high_time"] = high
+        stats["duty_cycle"] = high / span if span > 0 else None
+    for code, key in ((CODE_X, "x"), (CODE_Z, "z")):
+        mask = np.any(segment_values == code, axis=1)
+        if mask.any():
+            intervals = _intervals(mask, starts, end)
+            stats[f"{key}_intervals"] = intervals.tolist()
+            stats[f"{key}_time"] = int((intervals[:, 1] - intervals[:, 0]).sum())
+    return stats
+
+
+def analyze(store, signal_ids=None, glitch_width=DEFAULT_GLITCH_WIDTH, end_time=None):
+    """
+    Computes signal_stats for every signal of a store (or the given ones).
+
+    Returns:
+        List of stats dicts, each with "signal_id", "name" and "width" added.
+    """
+    header = store.header
+    end_time = store.end_time if end_time is None else end_time
+    ids = range(header.num_signals) if signal_ids is None else signal_ids
+    rows = []
+    for signal_id in ids:
+        stats = signal_stats(store.times(signal_id), store.values(signal_id), end_time, glitch_width)
+        stats.update(signal_id=signal_id, name=header.signal_name(signal_id),
+                     width=header.signal_width(signal_id))
+        rows.append(stats)
+    return rows
+
+
+def _cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{100 * value:.1f}%"
+    return str(value)
+
+
+def format_table(rows, timescale=None):
+    """Renders analyze() rows as a fixed-width text table, times in ticks."""
+    lines = [f"Times in ticks of {timescale}" if timescale else "Times in ticks"]
+    table = [_COLUMNS]
+    for row in rows:
+        table.append((row["name"], str(row["width"]), str(row["toggles"]), _cell(row["first_activity"]),
+                      _cell(row["last_activity"]), _cell(row["duty_cycle"]), str(row["x_time"]),
+                      str(row["z_time"]), str(row["glitches"])))
+    widths = [max(len(r[i]) for r in table) for i in range(len(_COLUMNS))]
+    for r in table:
+        cells = [r[0].ljust(widths[0])] + [cell.rjust(w) for cell, w in zip(r[1:], widths[1:])]
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def _count(n, noun, plural=None):
+    """Counts a noun: 1 toggle, 2 toggles, 1 glitch, 3 glitches."""
+    return f"{n} {noun if n == 1 else plural or noun + 's'}"
+
+
+def summary_text(stats):
+    """One-line description of a signal's stats, used in RAG summary chunks."""
+    if not stats["changes"]:
+        return "never assigned"
+    parts = [_count(stats["toggles"], "toggle")]
+    if stats["toggles"]:
+        parts.append(f"active t={stats['first_activity']}..{stats['last_activity']}")
+    if stats["duty_cycle"] is not None:
+        parts.append(f"high {100 * stats['duty_cycle']:.1f}% of the time")
+    for key in ("x", "z"):
+        intervals = stats[f"{key}_intervals"]
+        if intervals:
+            shown = ", ".join(f"{a}..{b}" for a, b in intervals[:3])
+            more = f" (+{len(intervals) - 3} more)" if len(intervals) > 3 else ""
+            parts.append(f"{key} during t={shown}{more}")
+    if stats["glitches"]:
+        parts.append(f"{_count(stats['glitches'], 'glitch', 'glitches')}, first at t={stats['first_glitch']}")
+    return ", ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-signal waveform statistics.")
+    parser.add_argument("input", help="Dump or waveform store")
+    parser.add_argument("-i", "--include", action="append", default=[], help="Scope prefix, glob or /regex/")
+    parser.add_argument("-x", "--exclude", action="append", default=[], help="Scope prefix, glob or /regex/")
+    parser.add_argument("--glitch-width", type=int, default=DEFAULT_GLITCH_WIDTH,
+                        help="Pulses shorter than this many ticks are glitches")
+    args = parser.parse_args()
+    store = open_store(args.input)
+    signal_filter = SignalFilter(args.include, args.exclude)
+    signal_ids = sorted(signal_filter.select(store.header)) if signal_filter else None
+    rows = analyze(store, signal_ids, args.glitch_width)
+    print(format_table(rows, store.header.timescale))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Shared, size-bounded cache of converted waveform stores.
+
+The first time a dump is read through open_store(), it is converted into a
+waveform store under the cache directory. Every later read, from any tool,
+opens that store instead of parsing the VCD again. Entries are named after
+the dump's absolute path plus its size and mtime:
+
+    <cache_dir>/<name>-<path hash>-<stat hash>/
+
+A re-simulated dump therefore gets a new entry. Older entries for the same
+path are dropped when the new one is added. The cache is kept under its size
+limit by evicting the least recently used entries; each hit refreshes the
+entry directory's mtime.
+
+Configuration (environment):
+    WAVE_CACHE_DIR        cache directory, default ~/.cache/wavellm/waves
+    WAVE_CACHE_MAX_BYTES  size limit, default 20 GiB
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+
+from vcd_util.wave_store import WaveStore, convert_vcd, is_wave_store
+
+CACHE_DIR_ENV = "WAVE_CACHE_DIR"
+CACHE_SIZE_ENV = "WAVE_CACHE_MAX_BYTES"
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "wavellm", "waves")
+DEFAULT_MAX_BYTES = 20 << 30
+
+_TMP_MARK = ".tmp-"
+
+
+def cache_dir():
+    return os.path.expanduser(os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR))
+
+
+def max_cache_bytes():
+    return int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_MAX_BYTES))
+
+
+def _path_prefix(path):
+    path = os.path.abspath(path)
+    name = os.path.basename(path).replace(".", "_")[:40]
+    return f"{name}-{hashlib.sha1(path.encode()).hexdigest()[:16]}"
+
+
+def entry_name(path):
+    """Cache entry name of a dump, derived from its absolute path, size and mtime."""
+    st = os.stat(path)
+    stat_hash = hashlib.sha1(f"{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:12]
+    return f"{_path_prefix(path)}-{stat_hash}"
+
+
+def _entry_size(entry_path):
+    total = 0
+    for root, _, files in os.walk(entry_path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _entries(directory):
+    """(path, last_used, size) of every complete entry."""
+    entries = []
+    for name in os.listdir(directory):
+        entry_path = os.path.join(directory, name)
+        if _TMP_MARK in name or not os.path.isdir(entry_path):
+            continue
+        try:
+            entries.append((entry_path, os.stat(entry_path).st_mtime, _entry_size(entry_path)))
+        except OSError:
+            pass
+    return entries
+
+
+def evict(directory=None, max_bytes=None, keep=()):
+    """
+    Deletes least recently used entries until the cache fits in max_bytes.
+
+    Args:
+        keep (iterable): Entry paths never evicted, e.g. the one just written.
+
+    Returns:
+        Number of bytes freed.
+    """
+    directory = directory or cache_dir()
+    max_bytes = max_cache_bytes() if max_bytes is None else max_bytes
+    if not os.path.isdir(directory):
+        return 0
+    keep = {os.path.abspath(p) for p in keep}
+    entries = sorted(_entries(directory), key=lambda e: e[1])
+    total = sum(size for _, _, size in entries)
+    freed = 0
+    for entry_path, _, size in entries:
+        if total <= max_bytes:
+            break
+        if os.path.abspath(entry_path) in keep:
+            continue
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total -= size
+        freed += size
+    return freed
+
+
+def _drop_stale(directory, path, current):
+    """Removes entries of earlier versions of the same dump."""
+    prefix = _path_prefix(path) + "-"
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name != current and _TMP_MARK not in name:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def open_cached(path, workers=1, directory=None):
+    """
+    Opens the cached store of a dump, converting it on a miss.
+
+    Args:
+        path (str): VCD path (optionally compressed).
+        workers (int): Parser processes used for a conversion.
+        directory (str): Cache directory, defaults to cache_dir().
+
+    Returns:
+        WaveStore
+    """
+    directory = directory or cache_dir()
+    name = entry_name(path)
+    entry_path = os.path.join(directory, name)
+    if is_wave_store(entry_path):
+        try:
+            store = WaveStore(entry_path)
+        except ValueError:
+            # Older store format, convert again
+            shutil.rmtree(entry_path, ignore_errors=True)
+        else:
+            os.utime(entry_path)
+            return store
+
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{entry_path}{_TMP_MARK}{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    convert_vcd(path, tmp_path, workers)
+    try:
+        os.rename(tmp_path, entry_path)
+    except OSError:
+        # Another process finished the same conversion first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    _drop_stale(directory, path, name)
+    evict(directory, keep=[entry_path])
+    return WaveStore(entry_path)
+
+
+if __name__ == "__main__":
+    directory = cache_dir()
+    if len(sys.argv) > 1 and sys.argv[1] == "clear":
+        shutil.rmtree(directory, ignore_errors=True)
+        print(f"Removed {directory}")
+    elif os.path.isdir(directory):
+        entries = _entries(directory)
+        for entry_path, _, size in sorted(entries, key=lambda e: -e[1]):
+            print(f"{size / (1 << 20):10.1f} MB  {os.path.basename(entry_path)}")
+        total = sum(size for _, _, size in entries)
+        print(f"{len(entries)} entries, {total / (1 << 20):.1f} MB of {max_cache_bytes() / (1 << 20):.0f} MB in {directory}")
+    else:
+        print(f"{directory} is empty")
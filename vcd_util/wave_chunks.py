@@ -0,0 +1,224 @@
+"""
+Time-windowed chunking of waveform histories for the RAG vector store.
+
+Instead of one document holding a signal's whole JSON history, every signal
+is cut into chunks of at most `max_transitions` changes (and optionally at
+fixed `window` boundaries) rendered as compact run-length text:
+
+    signal_name: hw_top.dut.cpu_core.instr_rdata_i, scope: hw_top.dut.cpu_core, width: 32
+    t=4200..4300: 0x1f→0x20
+    t=4300..4500: 0x20→0x21
+    t=4500..5000: 0x21
+
+Each line is the value held over an interval and, after the arrow, the
+value it changes to. Stretches where a signal keeps alternating between two
+values at a fixed period (clocks, strobes) collapse into one line.
+
+Each signal also gets one summary chunk with its toggle count, activity
+window, duty cycle, X/Z intervals and glitches (see wave_analytics), so
+questions about overall behaviour do not depend on retrieving every chunk:
+
+    signal_name: hw_top.dut.u_hdcom28_top.clk_i, scope: hw_top.dut.u_hdcom28_top, width: 1
+    summary: 74 toggles, active t=100..40500, high 44.7% of the time
+
+Every scope gets a hierarchy chunk (metadata kind="scope") listing its
+child scopes and signals, from the store's scope tree, so questions such as
+"which signals does cpu_core have" retrieve the structure directly:
+
+    scope: hw_top.dut.u_hdcom28_top.cpu_core (module)
+    signals: instr_rdata_i[31:0] (32 bits), instr_req_o (1 bit)
+
+Chunks tile the time axis: a chunk covers [t_start, t_end] from its first
+change up to the first change of the next chunk (or the end of the dump), so
+filtering on t_start <= t <= t_end always finds the chunk holding the value
+at time t.
+"""
+
+from vcd_util.wave_analytics import signal_stats, summary_text
+from vcd_util.wave_store import compact_bits, format_value
+
+# all-MiniLM-L6-v2 truncates at 256 tokens, roughly 1000 characters of this text.
+DEFAULT_MAX_CHARS = 1000
+DEFAULT_MAX_TRANSITIONS = 32
+
+# Minimum number of changes before an alternating run is folded into one line.
+MIN_PERIODIC_RUN = 4
+
+
+def _value_texts(store, signal_id, start=0, stop=None):
+    """
+    Formats the values [start:stop] of a signal, decoding only those: known
+    vectors as hex, others with their x/z (or 0) left extension collapsed.
+    """
+    texts = store.value_texts(signal_id, start, stop)
+    if store.header.signal_type(signal_id) == "real":
+        return texts
+    return [format_value(compact_bits(text)) for text in texts]
+
+
+def _periodic_run(times, texts, start, stop):
+    """Returns the end index of an alternating, fixed period run beginning at start."""
+    if stop - start < MIN_PERIODIC_RUN:
+        return start
+    period = times[start + 1] - times[start]
+    first, second = texts[start], texts[start + 1]
+    if first == second:
+        return start
+    end = start + 1
+    while (end + 1 < stop and times[end + 1] - times[end] == period
+           and texts[end + 1] == (first if (end + 1 - start) % 2 == 0 else second)):
+        end += 1
+    return end if end - start + 1 >= MIN_PERIODIC_RUN else start
+
+
+def _render(times, texts, start, stop, t_end):
+    """Renders changes [start, stop) as (time, line) run-length lines ending at t_end."""
+    lines = []
+    i = start
+    while i < stop:
+        end = _periodic_run(times, texts, i, stop)
+        if end > i:
+            lines.append((times[i], f"t={times[i]}..{times[end]}: {texts[i]}↔{texts[i + 1]} every "
+                                    f"{times[i + 1] - times[i]} ({end - i} changes)"))
+            i = end
+            continue
+        next_time = times[i + 1] if i + 1 < len(times) else t_end
+        arrow = f"→{texts[i + 1]}" if i + 1 < len(times) and i + 1 < stop else ""
+        lines.append((times[i], f"t={times[i]}..{next_time}: {texts[i]}{arrow}"))
+        i += 1
+    return lines
+
+
+def _boundaries(times, window, max_transitions):
+    """Splits change indices into chunks by transition count and time window."""
+    starts = [0]
+    for i in range(1, len(times)):
+        if i - starts[-1] >= max_transitions or (window and times[i] // window != times[starts[-1]] // window):
+            starts.append(i)
+    return starts
+
+
+def signal_chunks(store, signal_id, window=None, max_transitions=DEFAULT_MAX_TRANSITIONS,
+                  max_chars=DEFAULT_MAX_CHARS, end_time=None, summary=True, section=None):
+    """
+    Yields (text, metadata) chunks for one signal.
+
+    Only the summary chunk and the chunks of the last time segment, which
+    run to the end of the dump, depend on end_time; section selects them
+    ("tail") or all the others ("head"), so a dump that only grew longer
+    re-renders the tail alone.
+
+    Args:
+        store (WaveStore): Waveform store holding the signal.
+        signal_id (int): Signal to chunk.
+        window (int): Optional fixed window length in ticks; chunks never span
+            a window boundary.
+        max_transitions (int): Maximum value changes per chunk.
+        max_chars (int): Chunks are split further so their text stays under
+            this size (the embedding model's input limit).
+        end_time (int): End of the dump, defaults to store.end_time.
+        summary (bool): Also yield a summary chunk (metadata kind="summary")
+            spanning the whole signal, before the time-windowed chunks.
+        section (str): "head", "tail", or None for every chunk.
+    """
+    header = store.header
+    times = [int(t) for t in store.times(signal_id)]
+    if not times:
+        return
+    starts = _boundaries(times, window, max_transitions) + [len(times)]
+    segments = list(zip(starts, starts[1:]))
+    if section == "head":
+        segments = segments[:-1]
+        summary = False
+    elif section == "tail":
+        segments = segments[-1:]
+    first, last = (segments[0][0], segments[-1][1]) if segments else (0, 0)
+    # Indexed like times, only the values of the selected segments are decoded
+    texts = [None] * first + _value_texts(store, signal_id, first, last)
+    end_time = store.end_time if end_time is None else end_time
+    aliases = header.signal_vars[signal_id]
+    var = aliases[0]
+    title = f"signal_name: {var.name}, scope: {var.scope}, width: {var.width}"
+    if len(aliases) > 1:
+        title += ", aliases: " + ", ".join(alias.name for alias in aliases[1:])
+
+    if summary:
+        stats = signal_stats(store.times(signal_id), store.values(signal_id), end_time)
+        yield f"{title}\nsummary: {summary_text(stats)}", {
+            "signal_name": var.name,
+            "scope": var.scope,
+            "t_start": times[0],
+            "t_end": max(end_time, times[-1]),
+            "kind": "summary",
+        }
+
+    for start, stop in segments:
+        t_end = times[stop] if stop < len(times) else end_time
+        lines = _render(times, texts, start, stop, t_end)
+        # Split further if the rendered text would be truncated by the embedder
+        while lines:
+            size, count = len(title), 0
+            while count < len(lines) and (count == 0 or size + len(lines[count][1]) + 1 <= max_chars):
+                size += len(lines[count][1]) + 1
+                count += 1
+            part, lines = lines[:count], lines[count:]
+            yield "\n".join([title] + [line for _, line in part]), {
+                "signal_name": var.name,
+                "scope": var.scope,
+                "t_start": part[0][0],
+                "t_end": lines[0][0] if lines else t_end,
+            }
+
+
+def scope_chunks(scope, end_time, max_chars=DEFAULT_MAX_CHARS):
+    """
+    Yields (text, metadata) hierarchy chunks for one Scope of a ScopeTree.
+
+    Long signal lists are split over several chunks with the same title.
+    Metadata spans the whole dump, so time filters never exclude them.
+    """
+    title = f"scope: {scope.path}" + (f" ({scope.kind})" if scope.kind else "")
+    if scope.children:
+        title += "\nsubscopes: " + ", ".join(scope.children)
+    entries = [f"{var.name.rpartition('.')[2]}{var.bit_range} ({var.width} bit{'s' if var.width != 1 else ''})"
+               for var in scope.vars]
+    metadata = {"scope": scope.path, "t_start": 0, "t_end": int(end_time), "kind": "scope"}
+    if not entries:
+        yield title, dict(metadata)
+        return
+    while entries:
+        size, count = len(title) + len("\nsignals: "), 0
+        while count < len(entries) and (count == 0 or size + len(entries[count]) + 2 <= max_chars):
+            size += len(entries[count]) + 2
+            count += 1
+        part, entries = entries[:count], entries[count:]
+        yield f"{title}\nsignals: " + ", ".join(part), dict(metadata)
+
+
+def iter_scope_chunks(store, max_chars=DEFAULT_MAX_CHARS, end_time=None):
+    """Yields (text, metadata) hierarchy chunks for every scope of a store."""
+    tree = store.scope_tree
+    end_time = store.end_time if end_time is None else end_time
+    for scope, _ in tree.walk():
+        if scope is not tree.root:
+            yield from scope_chunks(scope, end_time, max_chars)
+
+
+def iter_chunks(store, window=None, max_transitions=DEFAULT_MAX_TRANSITIONS, max_chars=DEFAULT_MAX_CHARS,
+                summary=True, scopes=True):
+    """Yields (text, metadata) chunks for every signal of a store, after the scope chunks."""
+    end_time = store.end_time
+    if scopes:
+        yield from iter_scope_chunks(store, max_chars, end_time)
+    for signal_id in range(store.header.num_signals):
+        yield from signal_chunks(store, signal_id, window, max_transitions, max_chars, end_time, summary)
+
+
+def time_filter(t0, t1=None):
+    """
+    Builds a Chroma metadata filter selecting chunks that overlap [t0, t1].
+
+    Pass it as search_kwargs={"filter": time_filter(...)} to a retriever.
+    """
+    t1 = t0 if t1 is None else t1
+    return {"$and": [{"t_start": {"$lte": int(t1)}}, {"t_end": {"$gte": int(t0)}}]}
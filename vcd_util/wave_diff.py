@@ -0,0 +1,211 @@
+"""
+Time-aligned comparison of two dumps, e.g. a golden harness run against
+the agent's run.
+
+Both dumps are opened as waveform stores and signals are paired by their
+full dotted name. For every pair the two sorted change-time arrays are
+merged (np.union1d) and each side's value at every merged time is looked
+up with one searchsorted call, so the first divergence is found with a
+handful of vectorised operations per signal, whatever the number of
+transitions. A signal assigned on one side only, or with different widths,
+diverges at its first change. Dumps with different timescales are compared
+in ticks of the finer one, which times are reported in.
+
+Usage:
+    python -m vcd_util.wave_diff golden.vcd candidate.vcd [-i PATTERN] [--limit 20]
+"""
+
+import argparse
+import math
+import sys
+
+import numpy as np
+
+from vcd_util.signal_filter import SignalFilter
+from vcd_util.vcd_reader import UNIT_EXPONENTS, parse_time, parse_timescale
+from vcd_util.wave_index import WaveformIndex
+from vcd_util.wave_store import compact_bits, open_store
+
+
+def common_timescale(reference, candidate):
+    """
+    Finest timescale the ticks of both dumps are whole multiples of.
+
+    Returns:
+        (timescale, scale_a, scale_b): the timescale, e.g. "1ps", and how
+        many of its ticks one reference / candidate tick spans.
+    """
+    femtoseconds = []
+    for timescale in (reference, candidate):
+        magnitude, unit = parse_timescale(timescale or "1s")
+        femtoseconds.append(magnitude * 10 ** (UNIT_EXPONENTS[unit] - UNIT_EXPONENTS["fs"]))
+    tick = math.gcd(*femtoseconds)
+    unit = max((u for u, e in UNIT_EXPONENTS.items() if tick % 10 ** (e - UNIT_EXPONENTS["fs"]) == 0),
+               key=UNIT_EXPONENTS.get)
+    magnitude = tick // 10 ** (UNIT_EXPONENTS[unit] - UNIT_EXPONENTS["fs"])
+    return f"{magnitude}{unit}", femtoseconds[0] // tick, femtoseconds[1] // tick
+
+
+def compared_times(times_a, times_b, t0=None, t1=None):
+    """Change times of both signals within [t0, t1], plus t0 itself for the values in effect there."""
+    times = np.union1d(times_a, times_b)
+    if t0 is not None:
+        times = np.union1d(times[times > t0], [t0])
+    if t1 is not None:
+        times = times[times <= t1]
+    return times
+
+
+def first_divergence(times_a, values_a, times_b, values_b, t0=None, t1=None):
+    """
+    Returns the first time two signal histories hold different values, or None.
+
+    Args:
+        times_a, times_b (ndarray): Sorted int64 change times.
+        values_a, values_b (ndarray): Matching (count, width) 4-state codes,
+            or float64 values of real signals.
+        t0, t1 (int): Only compare within [t0, t1].
+    """
+    times = compared_times(times_a, times_b, t0, t1)
+    if not len(times):
+        return None
+    index_a = np.searchsorted(times_a, times, side="right") - 1
+    index_b = np.searchsorted(times_b, times, side="right") - 1
+    assigned_a, assigned_b = index_a >= 0, index_b >= 0
+    differs = assigned_a != assigned_b
+    both = np.flatnonzero(assigned_a & assigned_b)
+    if len(both):
+        va, vb = values_a[index_a[both]], values_b[index_b[both]]
+        unequal = va != vb if va.ndim == 1 else np.any(va != vb, axis=1)
+        differs[both] = unequal
+    hits = np.flatnonzero(differs)
+    return int(times[hits[0]]) if len(hits) else None
+
+
+class WaveDiff:
+    """
+    Compares the common signals of two waveform stores, in ticks of
+    `timescale`, the finer of their timescales.
+
+    Args:
+        store_a, store_b (WaveStore): Reference and candidate dumps.
+        signal_filter (SignalFilter): Optional subset of signals to compare.
+    """
+
+    def __init__(self, store_a, store_b, signal_filter=None):
+        self.store_a = store_a
+        self.store_b = store_b
+        names_a = self._names(store_a, signal_filter)
+        names_b = self._names(store_b, signal_filter)
+        self.common = sorted(set(names_a) & set(names_b))
+        self.only_a = sorted(set(names_a) - set(names_b))
+        self.only_b = sorted(set(names_b) - set(names_a))
+        self._ids_a = names_a
+        self._ids_b = names_b
+        self.index_a = WaveformIndex(store_a)
+        self.index_b = WaveformIndex(store_b)
+        self.timescale, self.scale_a, self.scale_b = common_timescale(store_a.header.timescale,
+                                                                      store_b.header.timescale)
+
+    @staticmethod
+    def _names(store, signal_filter):
+        names = {}
+        for var in store.header.vars:
+            if signal_filter is None or signal_filter.matches(var.name):
+                names.setdefault(var.name, var.signal_id)
+        return names
+
+    def divergence(self, name, t0=None, t1=None):
+        """First divergence time of one common signal, or None if it matches."""
+        id_a, id_b = self._ids_a[name], self._ids_b[name]
+        times_a, values_a = self.store_a.signal(id_a)
+        times_b, values_b = self.store_b.signal(id_b)
+        times_a = np.asarray(times_a) * self.scale_a
+        times_b = np.asarray(times_b) * self.scale_b
+        if values_a.shape[1:] != values_b.shape[1:] or self.store_a.is_real(id_a) != self.store_b.is_real(id_b):
+            # Never comparable: diverges wherever either side is assigned in the window
+            times = compared_times(times_a, times_b, t0, t1)
+            firsts = [int(t[0]) for t in (times_a, times_b) if len(t)]
+            assigned = times[times >= min(firsts)] if firsts else times[:0]
+            return int(assigned[0]) if len(assigned) else None
+        return first_divergence(times_a, np.asarray(values_a), times_b, np.asarray(values_b), t0, t1)
+
+    def run(self, t0=None, t1=None):
+        """
+        Compares every common signal.
+
+        Returns:
+            List of (time, name) of the diverging signals, earliest first.
+        """
+        diverging = []
+        for name in self.common:
+            time = self.divergence(name, t0, t1)
+            if time is not None:
+                diverging.append((time, name))
+        diverging.sort()
+        return diverging
+
+    def _value(self, index, name, t):
+        # The value in effect at t is the one of the tick t falls in
+        value = index.value_at(name, t // (self.scale_a if index is self.index_a else self.scale_b))
+        if value is None:
+            return "-"
+        return compact_bits(value) if isinstance(value, str) else repr(value)
+
+    def snapshot(self, names, t):
+        """Values of signals at time t in both dumps, as (name, value_a, value_b) tuples."""
+        return [(name, self._value(self.index_a, name, t), self._value(self.index_b, name, t)) for name in names]
+
+
+def format_report(diff, diverging, limit=None):
+    lines = [f"Times in ticks of {diff.timescale}",
+             f"{len(diff.common)} common signals, {len(diverging)} diverging, "
+             f"{len(diff.only_a)} only in the reference, {len(diff.only_b)} only in the candidate"]
+    if diverging:
+        shown = diverging if limit is None else diverging[:limit]
+        width = max(len(name) for _, name in shown)
+        lines.append("")
+        lines.append(f"{'signal'.ljust(width)}  {'first divergence':>16}  reference -> candidate")
+        for time, name in shown:
+            _, value_a, value_b = diff.snapshot([name], time)[0]
+            lines.append(f"{name.ljust(width)}  {time:>16}  {value_a} -> {value_b}")
+        if len(shown) < len(diverging):
+            lines.append(f"... {len(diverging) - len(shown)} more")
+        first_time = diverging[0][0]
+        lines.append("")
+        lines.append(f"Snapshot of the diverging signals at t={first_time}:")
+        for name, value_a, value_b in diff.snapshot([name for _, name in shown], first_time):
+            marker = "  " if value_a == value_b else "!="
+            lines.append(f"  {marker} {name}: {value_a} / {value_b}")
+    for label, names in (("Only in the reference", diff.only_a), ("Only in the candidate", diff.only_b)):
+        if names:
+            lines.append("")
+            lines.append(f"{label}: " + ", ".join(names[:limit] if limit else names))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report where two dumps first diverge, per signal.")
+    parser.add_argument("reference", help="Golden dump or waveform store")
+    parser.add_argument("candidate", help="Dump or waveform store to compare")
+    parser.add_argument("-i", "--include", action="append", default=[], help="Scope prefix, glob or /regex/")
+    parser.add_argument("-x", "--exclude", action="append", default=[], help="Scope prefix, glob or /regex/")
+    parser.add_argument("--start", help="Only compare from this time, e.g. 4250ns, or ticks of the finer timescale")
+    parser.add_argument("--end", help="Only compare up to this time")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum diverging signals listed")
+    args = parser.parse_args()
+
+    signal_filter = SignalFilter(args.include, args.exclude)
+    try:
+        diff = WaveDiff(open_store(args.reference), open_store(args.candidate), signal_filter or None)
+        t0 = parse_time(args.start, diff.timescale) if args.start else None
+        t1 = parse_time(args.end, diff.timescale) if args.end else None
+    except ValueError as e:
+        parser.error(str(e))
+    diverging = diff.run(t0, t1)
+    print(format_report(diff, diverging, args.limit))
+    sys.exit(1 if diverging or diff.only_a or diff.only_b else 0)
+
+
+if __name__ == "__main__":
+    main()
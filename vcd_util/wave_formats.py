@@ -0,0 +1,201 @@
+"""
+Readers for the dump formats besides plain VCD, behind WaveformReader.
+
+    vcd    VcdReader, optionally gzip, zstd or xz compressed
+    evcd   Extended VCD ($dumpports) as written for port-level dumps; every
+           port becomes a signal whose value is the 4-state reduction of
+           its EVCD state characters
+    fst    GTKWave's FST, decoded by the fst2vcd utility shipped with GTKWave
+           (or the executable named by $FST2VCD) and streamed through the VCD
+           tokeniser, without a temporary VCD on disk
+
+open_reader() picks the reader from the file contents: FST by its leading
+header block, EVCD by its $var port declarations (the whole header is
+scanned) or $dumpports, anything else is read as VCD. Further formats plug
+in with register_format().
+
+Usage:
+    with open_reader("dump.fst") as reader:
+        for time, signal_id, value in reader.changes():
+            ...
+"""
+
+import math
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+from itertools import chain
+
+from vcd_util.vcd_reader import BLOCK_SIZE, VcdReader, _parse_header, _read_until_end, _token_blocks, open_vcd
+
+FST2VCD_ENV = "FST2VCD"
+
+# EVCD state characters -> VCD value characters. Driven and sensed low/high
+# levels map to 0/1, tri-state to z, unknown and conflicting states to x.
+_EVCD_STATES = bytes.maketrans(b"0DdLl1UuHhZzTFf", b"000001111zzzzzz")
+_EVCD_VALUES = bytes(c if c in b"01z" else ord("x") for c in bytes(range(256)).translate(_EVCD_STATES))
+
+# Bytes read to recognise a format.
+_SNIFF_SIZE = 1 << 16
+
+# FST header block: type 0, a big-endian section length of 329 bytes, start
+# and end time, then the constant e in the writer's byte order.
+_FST_HEADER_LENGTH = 329
+_FST_ENDIAN_OFFSET = 25
+_FST_SNIFF_SIZE = _FST_ENDIAN_OFFSET + 8
+
+_EVCD_MARKERS = (b"$var port", b"$dumpports")
+
+_FORMATS = []
+
+
+def evcd_changes(tokens, codes, time=0, declared=None):
+    """
+    Walks an EVCD value change section, yielding (time, signal_id, value).
+
+    Port changes read `p<states> <strength0> <strength1> <identifier>`; the
+    strengths are dropped. `declared` works as in vcd_reader.value_changes.
+    """
+    lookup = codes.get
+    for token in tokens:
+        c = token[0]
+        if c == 35:  # '#'
+            time = int(token[1:])
+        elif c == 112:  # 'p'
+            next(tokens)
+            next(tokens)
+            code = next(tokens)
+            signal_id = lookup(code)
+            if signal_id is not None:
+                yield time, signal_id, token[1:].translate(_EVCD_VALUES).decode()
+            elif declared is not None and code not in declared:
+                yield time, code.decode(), token[1:].translate(_EVCD_VALUES).decode()
+        elif token == b"$comment":
+            _read_until_end(tokens)
+        # $dumpports, $dumpportsoff, $vcdclose and $end only bracket changes
+
+
+class EvcdReader(VcdReader):
+    """Single pass reader of Extended VCD dumps, see evcd_changes()."""
+
+    _value_changes = staticmethod(evcd_changes)
+
+
+class FstReader(VcdReader):
+    """
+    Reads an FST dump through fst2vcd.
+
+    Raises:
+        FileNotFoundError: fst2vcd is not installed.
+    """
+
+    def __init__(self, path, block_size=BLOCK_SIZE):
+        executable = os.environ.get(FST2VCD_ENV) or shutil.which("fst2vcd")
+        if not executable:
+            raise FileNotFoundError(f"{path} is an FST dump, install GTKWave's fst2vcd "
+                                    f"or set {FST2VCD_ENV} to read it")
+        self.path = path
+        # A file, not a pipe: nothing drains stderr while stdout is read, and a
+        # full pipe would block fst2vcd
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen([executable, path], stdout=subprocess.PIPE, stderr=self._stderr)
+        self._file = self._process.stdout
+        self._tokens = chain.from_iterable(_token_blocks(self._file, block_size))
+        self.header = _parse_header(self._tokens)
+        if not self.header.vars and self._process.wait() != 0:
+            self._stderr.seek(0)
+            error = self._stderr.read().decode(errors="replace").strip()
+            self.close()
+            raise ValueError(f"fst2vcd failed on {path}: {error}")
+
+    def close(self):
+        self._file.close()
+        if self._process.poll() is None:
+            self._process.terminate()
+        self._process.wait()
+        self._stderr.close()
+
+
+def _head(path):
+    f = open_vcd(path)
+    try:
+        return f.read(_SNIFF_SIZE)
+    finally:
+        f.close()
+
+
+def _is_fst(path, head):
+    if len(head) < _FST_SNIFF_SIZE or head[0] != 0:
+        return False
+    if int.from_bytes(head[1:9], "big") != _FST_HEADER_LENGTH:
+        return False
+    endian_test = head[_FST_ENDIAN_OFFSET:_FST_SNIFF_SIZE]
+    return any(math.isclose(struct.unpack(order, endian_test)[0], math.e) for order in ("<d", ">d"))
+
+
+def _is_evcd(path, head):
+    if any(marker in head for marker in _EVCD_MARKERS):
+        return True
+    if len(head) < _SNIFF_SIZE:
+        return False
+    # head does not hold the whole header when a dump declares many ports,
+    # scan up to $enddefinitions and the $dumpports that follows it
+    overlap = len(b"$enddefinitions") - 1
+    f = open_vcd(path)
+    try:
+        window = b""
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return False
+            window = window[-overlap:] + block
+            end = window.find(b"$enddefinitions")
+            if end >= 0:
+                rest = window[end:]
+                if len(rest) < _SNIFF_SIZE:
+                    rest += f.read(_SNIFF_SIZE)
+                return any(marker in window[:end] + rest[:_SNIFF_SIZE] for marker in _EVCD_MARKERS)
+            if any(marker in window for marker in _EVCD_MARKERS):
+                return True
+    finally:
+        f.close()
+
+
+def register_format(name, reader, detect):
+    """
+    Adds a dump format to open_reader().
+
+    Args:
+        name (str): Format name.
+        reader (type): WaveformReader subclass constructed with the path.
+        detect (callable): detect(path, head) -> bool, where head holds the
+            first bytes of the file (decompressed).
+    """
+    _FORMATS.insert(0, (name, reader, detect))
+
+
+def detect_format(path):
+    """Returns the name of the format of a dump, "vcd" when nothing else matches."""
+    with open(path, "rb") as f:
+        raw = f.read(_FST_SNIFF_SIZE)
+    # FST is never wrapped in a stream compressor, check it before decompressing
+    head = raw if _is_fst(path, raw) else _head(path)
+    for name, _, detect in _FORMATS:
+        if detect(path, head):
+            return name
+    return "vcd"
+
+
+def open_reader(path, block_size=BLOCK_SIZE):
+    """Opens a dump of any registered format as a WaveformReader."""
+    name = detect_format(path)
+    for format_name, reader, _ in _FORMATS:
+        if format_name == name:
+            return reader(path, block_size)
+    return VcdReader(path, block_size)
+
+
+register_format("evcd", EvcdReader, _is_evcd)
+register_format("fst", FstReader, _is_fst)
@@ -0,0 +1,203 @@
+"""
+Value-at-time queries over a waveform store.
+
+Every signal's change times are sorted, so each query is a binary search
+(numpy.searchsorted) over that signal's time column; only the values at the
+rows found are decoded, the rest stay in their compact encoding in the
+store. Signals can be named by
+their full dotted path or by any unambiguous trailing part of it, e.g.
+"instr_rdata_i" or "cpu_core.instr_rdata_i".
+
+Usage:
+    index = WaveformIndex.open("dump.vcd")
+    index.value_at("instr_rdata_i", "4250ns")
+    index.first_edge("rst_ni", edge="rise")
+"""
+
+import numpy as np
+
+from vcd_util.value_codec import REAL, decode, decode_rows, lsb_codes
+from vcd_util.vcd_reader import UNIT_EXPONENTS, parse_time, parse_timescale
+from vcd_util.wave_store import open_store
+
+CODE_0 = 0
+CODE_1 = 1
+
+
+def _changed(prev, cur):
+    """Rows of two encoded value columns that differ; encodings are canonical, so no decoding is needed."""
+    return prev != cur if prev.ndim == 1 else np.any(prev != cur, axis=1)
+
+
+class WaveformIndex:
+    """Binary-search query API over the per-signal columns of a WaveStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.header = store.header
+        magnitude, unit = parse_timescale(self.header.timescale or "1s")
+        self._tick_exponent = UNIT_EXPONENTS[unit]
+        self._tick_magnitude = magnitude
+        self._suffixes = None
+
+    @classmethod
+    def open(cls, path):
+        """Opens a waveform store, converting a raw VCD through the waveform cache if needed."""
+        return cls(open_store(path))
+
+    # ------------------------------------------------------------------
+    # Name and time resolution
+    # ------------------------------------------------------------------
+
+    def resolve(self, signal):
+        """
+        Resolves a signal name to its id.
+
+        Accepts an id, a full dotted name, or a dotted suffix that matches
+        exactly one signal.
+        """
+        if isinstance(signal, (int, np.integer)):
+            return int(signal)
+        try:
+            return self.store.signal_id(signal)
+        except KeyError:
+            pass
+        if self._suffixes is None:
+            self._suffixes = {}
+            for var in self.header.vars:
+                parts = var.name.split(".")
+                for i in range(1, len(parts)):
+                    self._suffixes.setdefault(".".join(parts[i:]), set()).add(var.signal_id)
+        matches = self._suffixes.get(signal, ())
+        if len(matches) == 1:
+            return next(iter(matches))
+        if not matches:
+            raise KeyError(f"Unknown signal {signal!r}")
+        names = sorted(self.header.signal_name(i) for i in matches)
+        raise KeyError(f"Ambiguous signal {signal!r}: matches {', '.join(names)}")
+
+    def ticks(self, t):
+        """
+        Converts a time to simulation ticks.
+
+        Integers are taken as ticks already; strings such as "4250ns" or
+        "4.25 us" are scaled by the dump's timescale.
+        """
+        if isinstance(t, np.integer):
+            return int(t)
+        return parse_time(t, self.header.timescale)
+
+    def format_time(self, ticks):
+        """Formats ticks in the dump's timescale unit, e.g. 4250 -> "4250ns"."""
+        unit = next(u for u, e in UNIT_EXPONENTS.items() if e == self._tick_exponent)
+        return f"{int(ticks) * self._tick_magnitude}{unit}"
+
+    def _values(self, signal_id, rows):
+        """Decodes the values at `rows` of a signal: floats for reals, '01xz' strings otherwise."""
+        store = self.store
+        encoding = store.encoding(signal_id)
+        packed = store.packed_values(signal_id)[rows]
+        if encoding == REAL:
+            return [float(value) for value in packed]
+        return decode_rows(decode(encoding, packed, self.header.signal_width(signal_id)))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def value_at(self, signal, t):
+        """Returns the value of a signal at time t, or None before its first change."""
+        signal_id = self.resolve(signal)
+        i = np.searchsorted(self.store.times(signal_id), self.ticks(t), side="right") - 1
+        if i < 0:
+            return None
+        return self._values(signal_id, [i])[0]
+
+    def values_in(self, signal, t0, t1):
+        """
+        Returns the (time, value) pairs of a signal over [t0, t1].
+
+        The first pair is the value already in effect at t0 (stamped t0) when
+        the signal last changed before the window.
+        """
+        signal_id = self.resolve(signal)
+        times = self.store.times(signal_id)
+        t0, t1 = self.ticks(t0), self.ticks(t1)
+        start = max(np.searchsorted(times, t0, side="right") - 1, 0)
+        stop = np.searchsorted(times, t1, side="right")
+        if stop <= start:
+            return []
+        values = self._values(signal_id, slice(start, stop))
+        return [(max(int(t), t0), value) for t, value in zip(times[start:stop], values)]
+
+    def first_edge(self, signal, after=None, edge="rise"):
+        """
+        Returns the time of the first rising or falling edge after a time.
+
+        A rising edge is any change into 1 and a falling edge any change into
+        0; for vectors the least significant bit is used. edge="any" returns
+        the first change of value.
+
+        Args:
+            signal: Signal name or id.
+            after: Only edges strictly later than this time are considered.
+            edge (str): 'rise', 'fall' or 'any'.
+
+        Returns:
+            The edge time in ticks, or None if there is no such edge.
+        """
+        signal_id = self.resolve(signal)
+        times = self.store.times(signal_id)
+        if len(times) < 2:
+            return None
+        start = 1 if after is None else max(np.searchsorted(times, self.ticks(after), side="right"), 1)
+        if start >= len(times):
+            return None
+        encoding = self.store.encoding(signal_id)
+        values = self.store.packed_values(signal_id, start - 1)
+        if encoding == REAL or edge == "any":
+            changed = _changed(values[:-1], values[1:])
+        else:
+            bits = lsb_codes(encoding, values)
+            if edge == "rise":
+                changed = (bits[1:] == CODE_1) & (bits[:-1] != CODE_1)
+            elif edge == "fall":
+                changed = (bits[1:] == CODE_0) & (bits[:-1] != CODE_0)
+            else:
+                raise ValueError(f"Unknown edge type {edge!r}")
+        hit = np.argmax(changed)
+        if not changed[hit]:
+            return None
+        return int(times[start + hit])
+
+    def toggle_count(self, signal, t0=None, t1=None):
+        """Counts the changes of value of a signal, optionally within [t0, t1]."""
+        signal_id = self.resolve(signal)
+        times = self.store.times(signal_id)
+        start = 1 if t0 is None else max(np.searchsorted(times, self.ticks(t0), side="left"), 1)
+        stop = len(times) if t1 is None else np.searchsorted(times, self.ticks(t1), side="right")
+        if stop <= start:
+            return 0
+        values = self.store.packed_values(signal_id, start - 1, stop)
+        return int(np.count_nonzero(_changed(values[:-1], values[1:])))
+
+    def value_at_many(self, signals, times):
+        """
+        Batched value_at over many (signal, time) pairs.
+
+        Pairs are grouped by signal and each group is answered with a single
+        searchsorted call and one batch decode of the rows found.
+
+        Returns:
+            List of values (None before a signal's first change), in input order.
+        """
+        signal_ids = np.array([self.resolve(s) for s in signals], dtype=np.int64)
+        ticks = np.array([self.ticks(t) for t in times], dtype=np.int64)
+        result = [None] * len(signal_ids)
+        for signal_id in np.unique(signal_ids):
+            positions = np.flatnonzero(signal_ids == signal_id)
+            found = np.searchsorted(self.store.times(int(signal_id)), ticks[positions], side="right") - 1
+            known = found >= 0
+            for position, value in zip(positions[known], self._values(int(signal_id), found[known])):
+                result[position] = value
+        return result
@@ -0,0 +1,448 @@
+"""
+Columnar, memory-mapped waveform store.
+
+A VCD is converted once into a directory holding:
+
+    header.json     timescale, declarations, per-signal encodings and offsets
+    hierarchy.json  scope tree of the dump (see scope_tree.py)
+    times.bin       int64 change times, one contiguous run per signal
+    scalars.bin     2-bit codes of 1-bit signals, four per byte, each signal
+                    starting on a byte boundary
+    words.bin       (value, mask) uint64 pairs of 2..64-bit vectors
+    wide.bin        packed 2-bit codes of wider vectors
+    reals.bin       float64 values of real signals
+
+See value_codec.py for the encodings. values() still hands out per-bit
+4-state codes (0, 1, x=2, z=3) of shape (count, width), expanded from the
+compact column on demand; packed_values() returns the compact form.
+
+Readers open the data files with numpy.memmap, so fetching a signal returns
+views into the mapping and only the pages backing that signal are read.
+Tools normally get stores through open_store(), which keeps converted dumps
+in a shared cache (see wave_cache.py).
+
+Usage:
+    python -m vcd_util.wave_store dump.vcd [dump.wave] [-j WORKERS]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import shutil
+from array import array
+from itertools import repeat
+
+import numpy as np
+
+from vcd_util.value_codec import (REAL, SCALAR, WIDE, WORD, _ENCODE, decode, decode_rows, encode_wide,
+                                  encode_word, encoding_for, new_column, pack_codes, text_at, unpack_codes, wide_size)
+from vcd_util.scope_tree import HIERARCHY_FILE, ScopeTree
+from vcd_util.vcd_reader import VcdHeader, WaveformReader
+from vcd_util.wave_formats import open_reader
+
+STORE_FORMAT = 2
+HEADER_FILE = "header.json"
+
+# Values decoded at a time per signal by WaveStore.changes(): the first batch,
+# and the size batches double up to.
+_MERGE_BATCH = 16
+_MAX_MERGE_BATCH = 4096
+
+# Encoding -> (data file, dtype, elements per change)
+_COLUMN_FILES = {
+    SCALAR: ("scalars.bin", np.uint8, None),
+    WORD: ("words.bin", np.uint64, 2),
+    WIDE: ("wide.bin", np.uint8, None),
+    REAL: ("reals.bin", np.float64, 1),
+}
+
+
+def compact_bits(text):
+    """
+    Drops the redundant left extension of a bit string, the way VCD writers
+    spell vectors: "00000101" -> "101", "xxxx01" -> "x01", "0x1" unchanged.
+    """
+    if len(text) < 2:
+        return text
+    first = text[0]
+    if first == "0":
+        rest = text.lstrip("0")
+        if not rest:
+            return "0"
+        return "0" + rest if rest[0] in "xXzZ" else rest
+    if first in "xXzZ":
+        return first + text.lstrip(first)
+    return text
+
+
+def format_value(text):
+    """Shows fully known multi-bit values as hex, everything else unchanged."""
+    if len(text) > 1 and not text.strip("01"):
+        return hex(int(text, 2))
+    return text
+
+
+def is_wave_store(path):
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def collect_sparse(header, changes):
+    """
+    Accumulates (time, signal_id, value) changes into compact per-signal
+    columns, only for the signals that actually change.
+
+    Returns:
+        dict signal_id -> (times, values), in order of first change: times is
+        an array('q'), values the growable column of the signal's encoding
+        (see value_codec.new_column).
+    """
+    columns = {}
+    encodings = {}
+    for time, signal_id, value in changes:
+        column = columns.get(signal_id)
+        if column is None:
+            encoding = encodings[signal_id] = encoding_for(header.signal_type(signal_id),
+                                                           header.signal_width(signal_id))
+            column = columns[signal_id] = (array("q"), new_column(encoding))
+        column[0].append(time)
+        encoding = encodings[signal_id]
+        if encoding == SCALAR:
+            column[1].append(_ENCODE[ord(value[-1])])
+        elif encoding == WORD:
+            column[1].extend(encode_word(value, header.signal_width(signal_id)))
+        elif encoding == WIDE:
+            column[1].extend(encode_wide(value, header.signal_width(signal_id)))
+        else:
+            column[1].append(float(value))
+    return columns
+
+
+def collect_changes(header, changes):
+    """
+    Like collect_sparse, but returns columns for every signal.
+
+    Returns:
+        (times, values) lists indexed by signal id.
+    """
+    columns = collect_sparse(header, changes)
+    times, values = [], []
+    for signal_id in range(header.num_signals):
+        column = columns.get(signal_id)
+        if column is None:
+            column = (array("q"), new_column(encoding_for(header.signal_type(signal_id),
+                                                          header.signal_width(signal_id))))
+        times.append(column[0])
+        values.append(column[1])
+    return times, values
+
+
+def convert_vcd(vcd_path, store_path=None, workers=1):
+    """
+    Converts a dump into a waveform store.
+
+    Changes are accumulated per signal in compact arrays while the dump is
+    streamed, then written out column by column.
+
+    Args:
+        vcd_path (str): Input VCD, or EVCD / FST dump (see wave_formats).
+        store_path (str): Output directory, defaults to `<vcd_path>.wave`.
+        workers (int): Processes parsing the value change section in
+            parallel, see vcd_util.parallel_parse.
+
+    Returns:
+        The store directory path.
+    """
+    store_path = store_path or vcd_path + ".wave"
+    if workers > 1:
+        from vcd_util.parallel_parse import parse_parallel
+        header, times, values = parse_parallel(vcd_path, workers)
+    else:
+        with open_reader(vcd_path) as reader:
+            header = reader.header
+            times, values = collect_changes(header, reader.changes())
+    write_store(store_path, header, times, values, source=vcd_path)
+    return store_path
+
+
+def _source_stat(path):
+    """(size, mtime_ns) of the dump a store was built from, used to detect stale stores."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def write_store(store_path, header, times, values, source=""):
+    """
+    Writes per-signal time and value columns to `store_path`.
+
+    Args:
+        header (VcdHeader): Hierarchy and timescale of the dump.
+        times (list): Per-signal sequences of int64 change times.
+        values (list): Per-signal columns as built by collect_changes: one
+            4-state code per byte for 1-bit signals, flat (value, mask) uint64
+            pairs, packed bytes of wide vectors or float64 reals.
+        source (str): Path of the dump the columns came from.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    signals = []
+    time_offset = 0
+    offsets = dict.fromkeys(_COLUMN_FILES, 0)
+    files = {encoding: open(os.path.join(store_path, name), "wb")
+             for encoding, (name, _, _) in _COLUMN_FILES.items()}
+    try:
+        with open(os.path.join(store_path, "times.bin"), "wb") as times_file:
+            for signal_id in range(header.num_signals):
+                signal_times = np.asarray(times[signal_id], dtype=np.int64)
+                times_file.write(signal_times.tobytes())
+                encoding = encoding_for(header.signal_type(signal_id), header.signal_width(signal_id))
+                dtype = _COLUMN_FILES[encoding][1]
+                if encoding == SCALAR:
+                    column = pack_codes(np.frombuffer(bytes(values[signal_id]), dtype=np.uint8))
+                else:
+                    column = np.frombuffer(bytes(values[signal_id]), dtype=dtype)
+                files[encoding].write(column.tobytes())
+                signals.append({"count": len(signal_times), "encoding": encoding, "time_offset": time_offset,
+                                "value_offset": offsets[encoding]})
+                time_offset += len(signal_times)
+                offsets[encoding] += len(column)
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(store_path, HIERARCHY_FILE), "w") as f:
+        json.dump(ScopeTree.from_header(header).to_dict(), f)
+    # The header goes last, its presence marks a complete store
+    with open(os.path.join(store_path, HEADER_FILE), "w") as f:
+        json.dump({"format": STORE_FORMAT, "source": source, "source_stat": _source_stat(source),
+                   "header": header.to_dict(), "signals": signals}, f)
+
+
+def _memmap(path, dtype):
+    # numpy refuses to map empty files
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class WaveStore(WaveformReader):
+    """
+    Read-only view of a waveform store.
+
+    Implements WaveformReader like the dump readers, so tools can consume
+    either a raw dump or a converted store.
+    """
+
+    def __init__(self, store_path):
+        self.path = store_path
+        with open(os.path.join(store_path, HEADER_FILE)) as f:
+            meta = json.load(f)
+        if meta["format"] != STORE_FORMAT:
+            raise ValueError(f"Unsupported waveform store format {meta['format']} in {store_path}")
+        self.source = meta["source"]
+        self.source_stat = meta.get("source_stat")
+        self.header = VcdHeader.from_dict(meta["header"])
+        self.signals = meta["signals"]
+        self._times = _memmap(os.path.join(store_path, "times.bin"), np.int64)
+        self._columns = {encoding: _memmap(os.path.join(store_path, name), dtype)
+                         for encoding, (name, dtype, _) in _COLUMN_FILES.items()}
+        self._ids = self._name_ids(self.header)
+        self._scope_tree = None
+
+    @property
+    def scope_tree(self):
+        """ScopeTree of the dump, loaded from hierarchy.json on first use."""
+        if self._scope_tree is None:
+            path = os.path.join(self.path, HIERARCHY_FILE) if self.path else None
+            if path and os.path.exists(path):
+                with open(path) as f:
+                    self._scope_tree = ScopeTree.from_dict(json.load(f))
+            else:
+                self._scope_tree = ScopeTree.from_header(self.header)
+        return self._scope_tree
+
+    @staticmethod
+    def _name_ids(header):
+        ids = {}
+        for var in header.vars:
+            ids.setdefault(var.name, var.signal_id)
+            ids.setdefault(var.name + var.bit_range, var.signal_id)
+        return ids
+
+    def signal_id(self, signal):
+        """Resolves a dotted name (or an id) to a signal id."""
+        if isinstance(signal, (int, np.integer)):
+            return int(signal)
+        try:
+            return self._ids[signal]
+        except KeyError:
+            raise KeyError(f"Unknown signal {signal!r}") from None
+
+    def is_real(self, signal):
+        return self.header.signal_type(self.signal_id(signal)) == "real"
+
+    def times(self, signal):
+        """Returns the int64 change times of a signal as a memmap view."""
+        entry = self.signals[self.signal_id(signal)]
+        return self._times[entry["time_offset"]:entry["time_offset"] + entry["count"]]
+
+    def encoding(self, signal):
+        """Compact encoding of a signal's values, see value_codec."""
+        signal_id = self.signal_id(signal)
+        return self.signals[signal_id].get("encoding") or encoding_for(
+            self.header.signal_type(signal_id), self.header.signal_width(signal_id))
+
+    def packed_values(self, signal, start=0, stop=None):
+        """
+        Returns the values [start:stop] of a signal in their compact
+        encoding: (count,) uint8 codes of a 1-bit signal, (count, 2) uint64
+        (value, mask) words, (count, ceil(width / 4)) packed bytes of a wide
+        vector, or (count,) float64 reals. All but scalars are memmap views.
+        """
+        signal_id = self.signal_id(signal)
+        entry = self.signals[signal_id]
+        encoding = self.encoding(signal_id)
+        offset, count = entry["value_offset"], entry["count"]
+        start, stop, _ = slice(start, stop).indices(count)
+        stop = max(start, stop)
+        column = self._columns[encoding]
+        if encoding == SCALAR:
+            # Four codes per byte: unpack only the bytes covering the range
+            first = start // 4
+            codes = unpack_codes(column[offset + first:offset + (stop + 3) // 4])
+            return codes[start - 4 * first:stop - 4 * first]
+        if encoding == WORD:
+            return column[offset + 2 * start:offset + 2 * stop].reshape(stop - start, 2)
+        if encoding == WIDE:
+            size = wide_size(self.header.signal_width(signal_id))
+            return column[offset + start * size:offset + stop * size].reshape(stop - start, size)
+        return column[offset + start:offset + stop]
+
+    def values(self, signal):
+        """
+        Returns the values of a signal: float64 of shape (count,) for real
+        signals, uint8 4-state codes of shape (count, width) otherwise.
+        """
+        signal_id = self.signal_id(signal)
+        encoding = self.encoding(signal_id)
+        packed = self.packed_values(signal_id)
+        if encoding == REAL:
+            return packed
+        return decode(encoding, packed, self.header.signal_width(signal_id))
+
+    def signal(self, signal):
+        return self.times(signal), self.values(signal)
+
+    def value_text(self, signal, index):
+        """Formats the index-th value of a signal the way the VCD spelled it."""
+        signal_id = self.signal_id(signal)
+        encoding = self.encoding(signal_id)
+        entry = self.signals[signal_id]
+        if encoding == SCALAR:
+            byte = self._columns[SCALAR][entry["value_offset"] + index // 4]
+            return "01xz"[(int(byte) >> (6 - 2 * (index % 4))) & 3]
+        return text_at(encoding, self.packed_values(signal_id), index, self.header.signal_width(signal_id))
+
+    def value_texts(self, signal, start=0, stop=None):
+        """Formats the values [start:stop] of a signal like value_text(), decoding them in one batch."""
+        signal_id = self.signal_id(signal)
+        encoding = self.encoding(signal_id)
+        packed = self.packed_values(signal_id, start, stop)
+        if encoding == REAL:
+            return [repr(value) for value in packed.tolist()]
+        return decode_rows(decode(encoding, packed, self.header.signal_width(signal_id)))
+
+    @property
+    def end_time(self):
+        """Time of the last value change in the store."""
+        ends = [self._times[e["time_offset"] + e["count"] - 1] for e in self.signals if e["count"]]
+        return int(max(ends)) if ends else 0
+
+    def changes(self, signal_ids=None):
+        """
+        Yields (time, signal_id, value) merged in time order, changes at the
+        same time in signal id order.
+
+        The per-signal columns are already sorted, so they are merged k ways
+        (heapq.merge) and each signal's values are decoded in batches.
+
+        Args:
+            signal_ids (set): Only merge these signals instead of all of them.
+        """
+        selected = range(len(self.signals)) if signal_ids is None else sorted(signal_ids)
+        return heapq.merge(*(self._signal_changes(signal_id) for signal_id in selected
+                             if self.signals[signal_id]["count"]))
+
+    def _signal_changes(self, signal_id):
+        times = self.times(signal_id)
+        start, size = 0, _MERGE_BATCH
+        while start < len(times):
+            stop = start + size
+            yield from zip(times[start:stop].tolist(), repeat(signal_id), self.value_texts(signal_id, start, stop))
+            # Small first batches keep the memory of a merge over many signals low
+            start, size = stop, min(2 * size, _MAX_MERGE_BATCH)
+
+    def close(self):
+        self._times = self._columns = None
+
+
+def open_store(path, workers=1):
+    """
+    Opens a waveform store for a store directory or a raw VCD.
+
+    A VCD with a `<path>.wave` sidecar (written by this script) uses it,
+    re-converting it if the VCD changed since or the sidecar has an older
+    store format. Any other VCD goes through the
+    shared cache of vcd_util.wave_cache, which converts it on first use.
+
+    Args:
+        workers (int): Parser processes used when a conversion is needed.
+    """
+    if is_wave_store(path):
+        return WaveStore(path)
+    store_path = path + ".wave"
+    if is_wave_store(store_path):
+        try:
+            store = WaveStore(store_path)
+        except ValueError:
+            # Written by an older version of this script
+            shutil.rmtree(store_path)
+            store = None
+        if store is not None:
+            if store.source_stat == _source_stat(path):
+                return store
+            store.close()
+        convert_vcd(path, store_path, workers)
+        return WaveStore(store_path)
+    from vcd_util.wave_cache import open_cached
+    return open_cached(path, workers)
+
+
+def open_waveform(path, cache=True):
+    """
+    Opens either a waveform store directory or a raw VCD file.
+
+    With cache, a dump is opened through open_store(); without it, or when
+    the cache directory is not writable, it is streamed with the reader of
+    its format (see wave_formats.open_reader).
+    """
+    if is_wave_store(path):
+        return WaveStore(path)
+    if cache:
+        try:
+            return open_store(path)
+        except OSError as e:
+            print(f"Waveform cache unavailable ({e}), streaming {path}")
+    return open_reader(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a VCD into a columnar waveform store.")
+    parser.add_argument("vcd", help="Input VCD")
+    parser.add_argument("store", nargs="?", help="Output directory, defaults to <vcd>.wave")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Parser processes")
+    args = parser.parse_args()
+    out = convert_vcd(args.vcd, args.store, args.workers)
+    print(f"Waveform store written to {out}")